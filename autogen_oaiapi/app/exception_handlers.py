@@ -1,32 +1,53 @@
 from fastapi import Request, FastAPI
-from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 import logging
+import math
+from autogen_oaiapi.app.responses import FastJSONResponse
+from autogen_oaiapi.base.types import ChatCompletionErrorResponse, ChatCompletionErrorDetail
+from autogen_oaiapi.upstream import is_upstream_overloaded
 
 logger = logging.getLogger(__name__)
 
-async def http_exception_handler(request: Request, exc: Exception) -> JSONResponse:
+def _log_context(request: Request) -> dict[str, str | None]:
+    # the error handlers can run outside the request context, take the correlation ids from the request state
+    return {"request_id": getattr(request.state, "request_id", None), "model": getattr(request.state, "model", None)}
+
+async def http_exception_handler(request: Request, exc: Exception) -> FastJSONResponse:
     if not isinstance(exc, StarletteHTTPException):
         raise TypeError(f"Exception must be of type StarletteHTTPException but got {type(exc)}")
-    logger.warning(f"HTTPException: {exc.detail} (status code: {exc.status_code})")
-    return JSONResponse(
+    logger.warning("HTTPException: %s (status code: %s)", exc.detail, exc.status_code, extra=_log_context(request))
+    return FastJSONResponse(
         status_code=exc.status_code,
         content={"error": "HTTPException", "detail": exc.detail},
     )
 
-async def validation_exception_handler(request: Request, exc: Exception) -> JSONResponse:
+async def validation_exception_handler(request: Request, exc: Exception) -> FastJSONResponse:
     if not isinstance(exc, RequestValidationError):
         raise TypeError(f"Exception must be of type RequestValidationError but got {type(exc)}")
-    logger.warning(f"Validation error: {exc.errors()}")
-    return JSONResponse(
+    logger.warning("Validation error: %s", exc.errors(), extra=_log_context(request))
+    return FastJSONResponse(
         status_code=422,
         content={"error": "ValidationError", "detail": exc.errors()},
     )
 
-async def generic_exception_handler(request: Request, exc: Exception) -> JSONResponse:
-    logger.error(f"Unhandled exception: {str(exc)}", exc_info=True)
-    return JSONResponse(
+async def generic_exception_handler(request: Request, exc: Exception) -> FastJSONResponse:
+    if is_upstream_overloaded(exc):
+        logger.warning("Upstream overloaded: %s", exc, extra=_log_context(request))
+        return FastJSONResponse(
+            status_code=503,
+            content=ChatCompletionErrorResponse(
+                error=ChatCompletionErrorDetail(
+                    message="The upstream model endpoint is overloaded, please retry later",
+                    type="server_error",
+                    param=None,
+                    code="overloaded",
+                )
+            ),
+            headers={"Retry-After": str(math.ceil(getattr(exc, "retry_after", 1.0)))},
+        )
+    logger.error("Unhandled exception: %s", exc, exc_info=True, extra=_log_context(request))
+    return FastJSONResponse(
         status_code=500,
         content={"error": "InternalServerError", "detail": "An unexpected error occurred."},
     )
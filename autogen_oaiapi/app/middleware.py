@@ -1,18 +1,29 @@
 
 from fastapi import Request
-from fastapi.responses import JSONResponse, Response
+from fastapi.responses import Response
 from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+import math
 import time
 import uuid
 import logging
+from typing import AsyncIterator
 
+from autogen_oaiapi.app.responses import FastJSONResponse
+from autogen_oaiapi.app.request_decoder import read_body, loads, ChatRequestError, RequestTooLargeError
+from autogen_oaiapi.observability import request_id_var, model_var, PROFILE_HEADER
 from autogen_oaiapi.base.types import (
     ChatCompletionErrorResponse,
     ChatCompletionErrorDetail,
+    TOTAL_MODELS_NAME,
 )
 
 logger = logging.getLogger(__name__)
 
+# health probes are answered without an API key
+PUBLIC_PATHS = frozenset(("/healthz", "/readyz"))
+# POSTs to these paths run a model and must name it, other POSTs, e.g. admin actions, may have an empty body
+MODEL_PATHS = ("/chat/completions", "/responses")
+
 class RequestContextMiddleware(BaseHTTPMiddleware):
     """
     Middleware to add a unique request ID and process time to each request.
@@ -20,16 +31,31 @@ class RequestContextMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
         request_id = request.headers.get("x-request-id", str(uuid.uuid4()))
         request.state.request_id = request_id
+        # the context is copied into the tasks running the request, so their records carry the request id
+        token = request_id_var.set(request_id)
+        try:
+            start_time = time.time()
+            response = await call_next(request)
+            duration = time.time() - start_time
 
-        start_time = time.time()
-        response = await call_next(request)
-        duration = time.time() - start_time
-
-        response.headers["x-request-id"] = request_id
-        response.headers["x-process-time"] = f"{duration:.4f}s"
+            response.headers["x-request-id"] = request_id
+            response.headers["x-process-time"] = f"{duration:.4f}s"
 
-        logger.info(f"[{request_id}] {request.method} {request.url.path} ({duration:.2f}s)")
-        return response
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(
+                    "[%s] %s %s (%.2fs)", request_id, request.method, request.url.path, duration,
+                    extra={
+                        "access": True,
+                        "model": getattr(request.state, "model", None),
+                        "method": request.method,
+                        "path": request.url.path,
+                        "status_code": response.status_code,
+                        "duration_ms": round(duration * 1000, 2),
+                    },
+                )
+            return response
+        finally:
+            request_id_var.reset(token)
     
 
 class APIKeyModelMiddleware(BaseHTTPMiddleware):
@@ -40,20 +66,40 @@ class APIKeyModelMiddleware(BaseHTTPMiddleware):
         if request.method == "OPTIONS":
             # CORS preflight does not auth test!
             pass
+        elif request.url.path in PUBLIC_PATHS:
+            pass
         else:        
+            loop_monitor = request.app.state.server.loop_monitor
+            if (
+                loop_monitor is not None
+                and request.method == "POST"
+                and request.url.path.endswith(MODEL_PATHS)
+                and loop_monitor.should_shed()
+            ):
+                # shed before the body is read, new runs would only add to the lag
+                content = ChatCompletionErrorResponse(
+                    error=ChatCompletionErrorDetail(
+                        message="The server is overloaded, please retry later",
+                        type="server_error",
+                        param=None,
+                        code="overloaded"
+                    )
+                )
+                return FastJSONResponse(status_code=503, content=content, headers={"Retry-After": "1"})
+
             auth_header = request.headers.get("Authorization")
             if not auth_header:
                 auth_header = request.headers.get("authorization")  # for lowercase header
 
             if not auth_header or not auth_header.startswith("Bearer "):
                 api_key = "BASE_API_KEY"
-                # return JSONResponse(status_code=404, content={"detail": "Authorization header missing or invalid"})
+                # return FastJSONResponse(status_code=404, content={"detail": "Authorization header missing or invalid"})
             else: 
                 api_key = auth_header[len("Bearer "):]
             
-            allowed_models = request.app.state.server.key_manager.get_allow_models(api_key)
+            verified_key = await request.app.state.server.key_manager.aget_verified_key(api_key)
 
-            if not allowed_models:
+            if verified_key is None or not verified_key.allowed_models:
                 content = ChatCompletionErrorResponse(
                     error=ChatCompletionErrorDetail(
                         message="Invalid API Key",
@@ -62,13 +108,51 @@ class APIKeyModelMiddleware(BaseHTTPMiddleware):
                         code="invalid_api_key"
                     )
                 )
-                return JSONResponse(status_code=403, content=content.model_dump(exclude_none=False))
+                return FastJSONResponse(status_code=403, content=content)
                 
             if request.method == "POST":
-                body = await request.json()
+                # the body is read and parsed once here, routes use request.state.json_body
+                model_path = request.url.path.endswith(MODEL_PATHS)
+                try:
+                    raw_body = await read_body(request, request.app.state.server.max_request_bytes)
+                    body = loads(raw_body) if raw_body or model_path else {}
+                except RequestTooLargeError as e:
+                    content = ChatCompletionErrorResponse(
+                        error=ChatCompletionErrorDetail(
+                            message=str(e),
+                            type="invalid_request_error",
+                            param=None,
+                            code="request_too_large"
+                        )
+                    )
+                    return FastJSONResponse(status_code=413, content=content)
+                except ChatRequestError as e:
+                    content = ChatCompletionErrorResponse(
+                        error=ChatCompletionErrorDetail(
+                            message=str(e),
+                            type="invalid_request_error",
+                            param=None,
+                            code="invalid_request"
+                        )
+                    )
+                    return FastJSONResponse(status_code=400, content=content)
+                if not isinstance(body, dict):
+                    content = ChatCompletionErrorResponse(
+                        error=ChatCompletionErrorDetail(
+                            message="Request body must be a JSON object",
+                            type="invalid_request_error",
+                            param=None,
+                            code="invalid_request"
+                        )
+                    )
+                    return FastJSONResponse(status_code=400, content=content)
+                request.state.json_body = body
                 requested_model = body.get("model")
                 if requested_model:
-                    if "*" not in allowed_models and requested_model not in allowed_models:
+                    request.state.model = requested_model
+                    model_var.set(requested_model)
+                    allowed_models = verified_key.allowed_models
+                    if TOTAL_MODELS_NAME not in allowed_models and requested_model not in allowed_models:
                         content = ChatCompletionErrorResponse(
                             error=ChatCompletionErrorDetail(
                                 message=f"Model '{requested_model}' not allowed for this API Key",
@@ -77,8 +161,21 @@ class APIKeyModelMiddleware(BaseHTTPMiddleware):
                                 code="model_not_found"
                             )
                         )
-                        return JSONResponse(status_code=403, content=content.model_dump(exclude_none=False))
-                else:
+                        return FastJSONResponse(status_code=403, content=content)
+                    upstream_guard = request.app.state.server.upstream_guard
+                    retry_after = upstream_guard.retry_after(requested_model) if upstream_guard is not None else None
+                    if retry_after is not None:
+                        # the team would only fail on its first model call
+                        content = ChatCompletionErrorResponse(
+                            error=ChatCompletionErrorDetail(
+                                message=f"The upstream of model '{requested_model}' is failing, please retry later",
+                                type="server_error",
+                                param="model",
+                                code="overloaded"
+                            )
+                        )
+                        return FastJSONResponse(status_code=503, content=content, headers={"Retry-After": str(math.ceil(retry_after))})
+                elif model_path:
                     content = ChatCompletionErrorResponse(
                         error=ChatCompletionErrorDetail(
                             message="Model not specified in request body",
@@ -87,7 +184,51 @@ class APIKeyModelMiddleware(BaseHTTPMiddleware):
                             code="model_not_found"
                         )
                     )
-                    return JSONResponse(status_code=400, content=content.model_dump(exclude_none=False))
+                    return FastJSONResponse(status_code=400, content=content)
 
             request.state.api_key = api_key
-        return await call_next(request)
\ No newline at end of file
+            request.state.verified_key = verified_key
+        return await call_next(request)
+
+
+class ProfilingMiddleware(BaseHTTPMiddleware):
+    """
+    Middleware to profile the requests sent with the `x-profile` header by keys allowed to use every model.
+    Only installed when the server has a profiler. The id of the report is returned in the `x-profile-id` header.
+    """
+    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
+        verified_key = getattr(request.state, "verified_key", None)
+        if (
+            PROFILE_HEADER not in request.headers
+            or verified_key is None
+            or TOTAL_MODELS_NAME not in verified_key.allowed_models
+        ):
+            return await call_next(request)
+
+        profiler = request.app.state.server.profiler
+        started = time.perf_counter()
+        profile = profiler.begin()
+        if profile is None:
+            response = await call_next(request)
+            response.headers["x-profile-status"] = "busy"
+            return response
+        request_id = getattr(request.state, "request_id", None) or str(uuid.uuid4())
+        try:
+            response = await call_next(request)
+        except BaseException:
+            profiler.finish(profile, request_id, request.url.path, started)
+            raise
+
+        body_iterator = response.body_iterator  # type: ignore[attr-defined]
+
+        async def profiled_body() -> AsyncIterator[bytes]:
+            # streamed responses run the team while the body is sent, the profile ends with the body
+            try:
+                async for chunk in body_iterator:
+                    yield chunk
+            finally:
+                profiler.finish(profile, request_id, request.url.path, started)
+
+        response.body_iterator = profiled_body()  # type: ignore[attr-defined]
+        response.headers["x-profile-id"] = request_id
+        return response
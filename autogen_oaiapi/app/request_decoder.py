@@ -0,0 +1,155 @@
+import json
+from dataclasses import dataclass
+from typing import Any, List, Optional
+from fastapi import Request
+from autogen_agentchat.messages import ChatMessage, TextMessage
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional dependency
+    orjson = None  # type: ignore[assignment]
+
+_ROLES = frozenset(("user", "assistant", "system"))
+
+
+class RequestTooLargeError(ValueError):
+    """
+    Raised when a request body is larger than the allowed size.
+    """
+
+
+class ChatRequestError(ValueError):
+    """
+    Raised when a chat completion request is not valid.
+
+    Args:
+        message (str): The error message.
+        param (Optional[str]): The request parameter that caused the error.
+    """
+    def __init__(self, message: str, param: Optional[str] = None) -> None:
+        super().__init__(message)
+        self.param = param
+
+
+@dataclass
+class DecodedChatRequest:
+    """
+    A chat completion request decoded straight into AutoGen messages.
+
+    Args:
+        messages (List[ChatMessage]): The non-empty messages, one TextMessage per text part.
+        model (Optional[str]): The requested model name.
+        stream (bool): Whether to stream the response.
+        session_id (Optional[str]): Session identifier.
+    """
+    messages: List[ChatMessage]
+    model: Optional[str] = None
+    stream: bool = False
+    session_id: Optional[str] = None
+
+
+async def read_body(request: Request, max_bytes: int) -> bytes:
+    """
+    Read the request body, failing as soon as it grows larger than the limit.
+    The body stays available to the route handlers.
+
+    Args:
+        request (Request): The request to read.
+        max_bytes (int): The maximum body size in bytes.
+
+    Returns:
+        bytes: The request body.
+
+    Raises:
+        RequestTooLargeError: If the declared or actual body size is larger than max_bytes.
+    """
+    content_length = request.headers.get("content-length")
+    if content_length is not None and content_length.isdigit() and int(content_length) > max_bytes:
+        raise RequestTooLargeError(f"Request body is larger than {max_bytes} bytes")
+    chunks: List[bytes] = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > max_bytes:
+            raise RequestTooLargeError(f"Request body is larger than {max_bytes} bytes")
+        chunks.append(chunk)
+    body = b"".join(chunks)
+    # the same cache `Request.body()` fills, so handlers behind the middleware can read the body again
+    request._body = body
+    return body
+
+
+def loads(body: bytes) -> Any:
+    """
+    Parse a JSON request body, with orjson when installed.
+
+    Args:
+        body (bytes): The request body.
+
+    Returns:
+        Any: The parsed JSON.
+
+    Raises:
+        ChatRequestError: If the body is not valid JSON.
+    """
+    try:
+        if orjson is not None:
+            return orjson.loads(body)
+        return json.loads(body)
+    except ValueError as e:
+        raise ChatRequestError(f"Request body is not valid JSON: {e}") from e
+
+
+def _optional(payload: dict[str, Any], name: str, kind: type) -> Any:
+    value = payload.get(name)
+    if value is not None and not isinstance(value, kind):
+        raise ChatRequestError(f"'{name}' must be of type {kind.__name__}", param=name)
+    return value
+
+
+def decode_chat_request(payload: Any) -> DecodedChatRequest:
+    """
+    Decode a parsed chat completion request into AutoGen messages in one pass.
+    Accepts the same requests as `ChatCompletionRequest` followed by `convert_to_llm_messages`,
+    without building the intermediate message models.
+
+    Args:
+        payload (Any): The parsed JSON request body.
+
+    Returns:
+        DecodedChatRequest: The decoded request.
+
+    Raises:
+        ChatRequestError: If the request is not valid.
+    """
+    if not isinstance(payload, dict):
+        raise ChatRequestError("Request body must be a JSON object")
+    raw_messages = payload.get("messages")
+    if not isinstance(raw_messages, list):
+        raise ChatRequestError("'messages' must be a list", param="messages")
+
+    messages: List[ChatMessage] = []
+    for raw_message in raw_messages:
+        if not isinstance(raw_message, dict):
+            raise ChatRequestError("every message must be an object", param="messages")
+        role = raw_message.get("role")
+        if role not in _ROLES:
+            raise ChatRequestError(f"message role must be one of {sorted(_ROLES)}", param="messages")
+        content = raw_message.get("content")
+        if isinstance(content, str):
+            if content:
+                messages.append(TextMessage(content=content, source=role))
+        elif isinstance(content, list):
+            for part in content:
+                if not isinstance(part, dict) or not isinstance(part.get("text"), str) or not isinstance(part.get("type"), str):
+                    raise ChatRequestError("every content part must have a 'type' and a 'text'", param="messages")
+                messages.append(TextMessage(content=part["text"], source=role))
+        elif content is not None:
+            raise ChatRequestError("message content must be a string, a list of parts or null", param="messages")
+
+    return DecodedChatRequest(
+        messages=messages,
+        model=_optional(payload, "model", str),
+        stream=bool(_optional(payload, "stream", bool)),
+        session_id=_optional(payload, "session_id", str),
+    )
@@ -0,0 +1,36 @@
+import json
+from typing import Any
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional dependency
+    orjson = None  # type: ignore[assignment]
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Encode content to compact JSON bytes.
+    Pydantic models are serialized by pydantic-core without revalidation, other content uses orjson when installed.
+
+    Args:
+        content (Any): A pydantic model or JSON compatible content.
+
+    Returns:
+        bytes: The encoded JSON.
+    """
+    if isinstance(content, BaseModel):
+        return content.__pydantic_serializer__.to_json(content)
+    if orjson is not None:
+        return orjson.dumps(content, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=str, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response encoded by `dumps`.
+    Returning it from a route skips the response model revalidation of FastAPI for objects built by the server.
+    """
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -2,13 +2,26 @@ from fastapi import APIRouter, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from autogen_oaiapi.app.routes.v1.chat import router as chat_router
 from autogen_oaiapi.app.routes.v1.models import router as models_router
+from autogen_oaiapi.app.routes.v1.usage import router as usage_router
+from autogen_oaiapi.app.routes.v1.metrics import router as metrics_router
+from autogen_oaiapi.app.routes.v1.profiling import router as profiling_router
+from autogen_oaiapi.app.routes.v1.memory import router as memory_router
+from autogen_oaiapi.app.routes.v1.responses import router as responses_router
+from autogen_oaiapi.app.routes.health import router as health_router
 
 def register_routes(app: FastAPI, prefix: str = "/v1") -> None:
     """Register API routes for the FastAPI application."""
     api_router = APIRouter()
     api_router.include_router(chat_router)
     api_router.include_router(models_router)
+    api_router.include_router(usage_router)
+    api_router.include_router(metrics_router)
+    api_router.include_router(profiling_router)
+    api_router.include_router(memory_router)
+    api_router.include_router(responses_router)
     app.include_router(api_router, prefix=prefix)
+    # probes are served outside the API prefix
+    app.include_router(health_router)
 
     app.add_middleware(
         CORSMiddleware,
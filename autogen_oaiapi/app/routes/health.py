@@ -0,0 +1,35 @@
+from typing import Dict
+from fastapi import APIRouter, Request
+from autogen_oaiapi.app.responses import FastJSONResponse
+
+
+router = APIRouter()
+
+@router.get("/healthz")
+async def healthz(request: Request) -> Dict[str, str]:
+    """
+    Handle the GET request for the /healthz endpoint (liveness).
+    Answers as long as the event loop serves requests, without an API key.
+
+    Args:
+        request (Request): The FastAPI request object.
+
+    Returns:
+        Dict[str, str]: The liveness status.
+    """
+    return {"status": "ok"}
+
+@router.get("/readyz")
+async def readyz(request: Request) -> FastJSONResponse:
+    """
+    Handle the GET request for the /readyz endpoint (readiness).
+    Answers 200 once the warm-up is done and the load is below the configured limits, 503 otherwise, without an API key.
+
+    Args:
+        request (Request): The FastAPI request object.
+
+    Returns:
+        FastJSONResponse: The readiness of the server and the reasons it is not ready.
+    """
+    readiness = request.app.state.server.readiness()
+    return FastJSONResponse(status_code=200 if readiness["ready"] else 503, content=readiness)
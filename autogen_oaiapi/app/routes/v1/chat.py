@@ -1,88 +1,457 @@
-from typing import AsyncGenerator, Coroutine, Any
-from fastapi import APIRouter, Request
+import asyncio
+import logging
+import uuid
+from typing import AsyncGenerator, Coroutine, Any, List
+from fastapi import APIRouter, Request, WebSocket, WebSocketDisconnect, status
 from fastapi.responses import StreamingResponse
+from autogen_agentchat.messages import ChatMessage
+from autogen_oaiapi.app.responses import FastJSONResponse
 from autogen_oaiapi.base.types import (
-    ChatCompletionRequest,
     ChatCompletionResponse,
     ChatCompletionErrorResponse,
     ChatCompletionErrorDetail,
 )
-from autogen_oaiapi.message.message_converter import convert_to_llm_messages
-from autogen_oaiapi.message.response_builder import build_openai_response
-from autogen_oaiapi.model import Model
-from ....base.types import ReturnMessage
+from autogen_oaiapi.app.request_decoder import decode_chat_request, loads, ChatRequestError
+from autogen_oaiapi.message.response_builder import build_openai_response, build_stream_chunks
+from autogen_oaiapi.model import Model, parse_last_event_id
+from autogen_oaiapi.usage import UsageLedger
+from autogen_oaiapi.scheduler import FairScheduler
+from autogen_oaiapi.observability import MemoryTracker, request_id_var, model_var
+from autogen_oaiapi.upstream import is_upstream_overloaded
+from ....base import VerifiedKey
+from ....base.types import ReturnMessage, TOTAL_MODELS_NAME
+from ....base.types._chat_message import ErrorCode, ErrorType
 
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+async def _record_stream_usage(
+        ledger: UsageLedger,
+        key_name: str,
+        model_name: str,
+        stream: AsyncGenerator[ReturnMessage, None],
+    ) -> AsyncGenerator[ReturnMessage, None]:
+    """
+    Pass the streamed messages through and record the usage of the last message.
+    Every message carries the usage so far, so a stream the client drops still records what the run used.
+
+    Args:
+        ledger (UsageLedger): The usage ledger of the server.
+        key_name (str): The name of the API key of the request.
+        model_name (str): The requested model name.
+        stream (AsyncGenerator[ReturnMessage, None]): The streamed results from the model.
+
+    Yields:
+        ReturnMessage: The streamed results from the model.
+    """
+    message: ReturnMessage | None = None
+    try:
+        async for message in stream:
+            yield message
+    finally:
+        if message is not None:
+            ledger.record(
+                key_name,
+                model_name,
+                message.total_prompt_tokens or 0,
+                message.total_completion_tokens or 0,
+                message.total_tokens or 0,
+            )
+
+
+async def _run_in_slot(
+        scheduler: FairScheduler,
+        verified_key: VerifiedKey,
+        run: Coroutine[Any, Any, ReturnMessage],
+    ) -> ReturnMessage:
+    """
+    Run the model once the scheduler grants an execution slot to the API key.
+
+    Args:
+        scheduler (FairScheduler): The scheduler of the server.
+        verified_key (VerifiedKey): The API key of the request.
+        run (Coroutine[Any, Any, ReturnMessage]): The model run.
+
+    Returns:
+        ReturnMessage: The result from the model.
+    """
+    async with scheduler.slot(verified_key.key_name, verified_key.weight, verified_key.priority):
+        return await run
+
+
+async def _stream_in_slot(
+        scheduler: FairScheduler,
+        verified_key: VerifiedKey,
+        stream: AsyncGenerator[ReturnMessage, None],
+    ) -> AsyncGenerator[ReturnMessage, None]:
+    """
+    Stream the model results once the scheduler grants an execution slot, holding it until the stream ends.
+
+    Args:
+        scheduler (FairScheduler): The scheduler of the server.
+        verified_key (VerifiedKey): The API key of the request.
+        stream (AsyncGenerator[ReturnMessage, None]): The streamed results from the model.
+
+    Yields:
+        ReturnMessage: The streamed results from the model.
+    """
+    async with scheduler.slot(verified_key.key_name, verified_key.weight, verified_key.priority):
+        async for message in stream:
+            yield message
+
+
+async def _run_tracked(
+        tracker: MemoryTracker,
+        model_name: str,
+        run: Coroutine[Any, Any, ReturnMessage],
+    ) -> ReturnMessage:
+    """
+    Run the model and attribute the traced memory of the run to the model.
+
+    Args:
+        tracker (MemoryTracker): The memory tracker of the server.
+        model_name (str): The requested model name.
+        run (Coroutine[Any, Any, ReturnMessage]): The model run.
+
+    Returns:
+        ReturnMessage: The result from the model.
+    """
+    with tracker.track(model_name):
+        return await run
+
+
+async def _stream_tracked(
+        tracker: MemoryTracker,
+        model_name: str,
+        stream: AsyncGenerator[ReturnMessage, None],
+    ) -> AsyncGenerator[ReturnMessage, None]:
+    """
+    Stream the model results and attribute the traced memory of the run to the model.
+
+    Args:
+        tracker (MemoryTracker): The memory tracker of the server.
+        model_name (str): The requested model name.
+        stream (AsyncGenerator[ReturnMessage, None]): The streamed results from the model.
+
+    Yields:
+        ReturnMessage: The streamed results from the model.
+    """
+    with tracker.track(model_name):
+        async for message in stream:
+            yield message
+
 
 @router.post("/chat/completions", response_model=ChatCompletionResponse)
-async def chat_completions(
-    request: Request,
-    body: ChatCompletionRequest
-) -> ChatCompletionResponse | StreamingResponse | ChatCompletionErrorResponse:
+async def chat_completions(request: Request) -> FastJSONResponse | StreamingResponse:
     """
     Handle chat completion requests for the OpenAI-compatible API.
+    The body parsed by the middleware is decoded straight into AutoGen messages, see `decode_chat_request`.
+    Responses built by the server are encoded directly, without response model revalidation.
 
     Args:
         request (Request): The FastAPI request object.
-        body (ChatCompletionRequest): The chat completion request payload.
 
     Returns:
-        ChatCompletionResponse | StreamingResponse | ChatCompletionErrorResponse: The chat completion response, streaming response, or error dict.
+        FastJSONResponse | StreamingResponse: The chat completion response, streaming response, or error response.
 
     Raises:
         500: If the completion or stream generation fails.
     """
     server = request.app.state.server
-    llm_messages = convert_to_llm_messages(body.messages)
+    try:
+        body = decode_chat_request(request.state.json_body)
+    except ChatRequestError as e:
+        return FastJSONResponse(
+            status_code=400,
+            content=ChatCompletionErrorResponse(
+                error=ChatCompletionErrorDetail(
+                    message=str(e),
+                    type="invalid_request_error",
+                    param=e.param,
+                    code="invalid_request"
+                )
+            ),
+        )
+    llm_messages = body.messages
     request_model = body.model
-    is_stream: bool = body.stream or False
+    is_stream: bool = body.stream
     
     if request_model is None:
         request_model = "autogen-baseteam"
     
     model: Model|None  = server.model
     if model is None:
-        return ChatCompletionErrorResponse(
-            error=ChatCompletionErrorDetail(
-                message="Model not found",
-                type="invalid_request_error",
-                param="model",
-                code="model_not_found"
-            )
+        return FastJSONResponse(
+            status_code=404,
+            content=ChatCompletionErrorResponse(
+                error=ChatCompletionErrorDetail(
+                    message="Model not found",
+                    type="invalid_request_error",
+                    param="model",
+                    code="model_not_found"
+                )
+            ),
         )
 
+    verified_key: VerifiedKey = request.state.verified_key
+    scheduler: FairScheduler | None = server.scheduler
+    memory_tracker: MemoryTracker | None = server.memory_tracker
     result: AsyncGenerator[ReturnMessage, None] | Coroutine[Any, Any, ReturnMessage]
     if is_stream:
-        result = model.run_stream(name=request_model, messages=llm_messages)
+        # a reconnecting client resumes the run it was reading, see `Model.run_stream`
+        last_event = parse_last_event_id(request.headers.get("last-event-id", ""))
+        if last_event is not None and not await model.resumable(request_model, last_event[0], verified_key.key_name):
+            last_event = None
+        result = model.run_stream(
+            name=request_model,
+            messages=llm_messages,
+            # a new run gets a server id, the client controls the request id
+            run_id=last_event[0] if last_event is not None else uuid.uuid4().hex,
+            owner=verified_key.key_name,
+            resume_after=last_event[1] if last_event is not None else None,
+        )
+        if memory_tracker is not None:
+            result = _stream_tracked(memory_tracker, request_model, result)
+        if scheduler is not None:
+            result = _stream_in_slot(scheduler, verified_key, result)
+        result = _record_stream_usage(
+            server.usage_ledger,
+            verified_key.key_name,
+            request_model,
+            result,
+        )
+        # the team run keeps producing into the buffer while the client reads
+        result = server.stream_buffer.stream(result)
         response = await build_openai_response(request_model, result, is_stream=is_stream)
         if isinstance(response, AsyncGenerator):
              # server.cleanup_team(body.session_id, team)
              return StreamingResponse(response, media_type="text/event-stream")
         else:
              # server.cleanup_team(body.session_id, team)
-             return ChatCompletionErrorResponse(
-                error=ChatCompletionErrorDetail(
-                    message="Failed to generate completion",
-                    type="server_error",
-                    param=None,
-                    code="server_error"
-                )
+             return FastJSONResponse(
+                status_code=500,
+                content=ChatCompletionErrorResponse(
+                    error=ChatCompletionErrorDetail(
+                        message="Failed to generate completion",
+                        type="server_error",
+                        param=None,
+                        code="server_error"
+                    )
+                ),
              )
     else:
         # Non-streaming response: returning the response directly
-        result = model.run(name=request_model, messages=llm_messages)
+        result = model.run(name=request_model, messages=llm_messages, owner=verified_key.key_name)
+        if memory_tracker is not None:
+            result = _run_tracked(memory_tracker, request_model, result)
+        if scheduler is not None:
+            result = _run_in_slot(scheduler, verified_key, result)
         response = await build_openai_response(request_model, result, is_stream=is_stream)
         if isinstance(response, ChatCompletionResponse):
             # server.cleanup_team(body.session_id, team)
-            return response
+            server.usage_ledger.record(
+                verified_key.key_name,
+                request_model,
+                response.usage.prompt_tokens,
+                response.usage.completion_tokens,
+                response.usage.total_tokens,
+            )
+            return FastJSONResponse(response)
         else:
             # server.cleanup_team(body.session_id, team)
-            return ChatCompletionErrorResponse(
-                error=ChatCompletionErrorDetail(
-                    message="Failed to generate completion",
-                    type="server_error",
-                    param=None,
-                    code="server_error"
-                )
-            )
\ No newline at end of file
+            return FastJSONResponse(
+                status_code=500,
+                content=ChatCompletionErrorResponse(
+                    error=ChatCompletionErrorDetail(
+                        message="Failed to generate completion",
+                        type="server_error",
+                        param=None,
+                        code="server_error"
+                    )
+                ),
+            )
+
+
+def _error_frame(message: str, code: ErrorCode, type: ErrorType = "invalid_request_error", param: str | None = None) -> str:
+    return ChatCompletionErrorResponse(
+        error=ChatCompletionErrorDetail(message=message, type=type, param=param, code=code)
+    ).model_dump_json()
+
+
+def _decode_frame(data: str | bytes, max_bytes: int) -> List[ChatMessage]:
+    """
+    Decode a chat socket frame, either `{"messages": [...]}` or a single `{"role": ..., "content": ...}` message.
+
+    Args:
+        data (str | bytes): The frame payload.
+        max_bytes (int): The largest accepted frame.
+
+    Returns:
+        List[ChatMessage]: The new messages of the turn.
+
+    Raises:
+        ChatRequestError: If the frame is too large, not valid or has no message content.
+    """
+    # text frames are measured encoded, a character can take several bytes
+    raw = data.encode() if isinstance(data, str) else data
+    if len(raw) > max_bytes:
+        raise ChatRequestError(f"Frame is larger than {max_bytes} bytes")
+    payload = loads(raw)
+    if isinstance(payload, dict) and "messages" not in payload:
+        payload = {"messages": [payload]}
+    messages = decode_chat_request(payload).messages
+    if not messages:
+        raise ChatRequestError("the frame has no message content", param="messages")
+    return messages
+
+
+async def _authenticate_socket(websocket: WebSocket) -> VerifiedKey | None:
+    """
+    Verify the API key of a chat socket, sent in the `Authorization` header or, for browsers, in the `api_key` query parameter.
+
+    Args:
+        websocket (WebSocket): The connecting socket.
+
+    Returns:
+        VerifiedKey | None: The verified key, None if the key is not valid.
+    """
+    auth_header = websocket.headers.get("authorization")
+    if auth_header and auth_header.startswith("Bearer "):
+        api_key = auth_header[len("Bearer "):]
+    else:
+        api_key = websocket.query_params.get("api_key", "BASE_API_KEY")
+    verified_key: VerifiedKey | None = await websocket.app.state.server.key_manager.aget_verified_key(api_key)
+    if verified_key is None or not verified_key.allowed_models:
+        return None
+    return verified_key
+
+
+@router.websocket("/chat/ws")
+async def chat_socket(websocket: WebSocket) -> None:
+    """
+    Persistent chat completion connection bound to one model.
+
+    The key and the model are checked once, at the handshake, and the actor of the model is built once and kept
+    for the whole connection, so every frame only carries the new messages of a turn. Each turn is answered with
+    `ChatCompletionStreamResponse` frames, the last one with the finish reason and usage, followed by a `[DONE]` frame.
+    With the `session_id` query parameter the actor state is saved after every turn and restored by the next
+    connection of the same key to the same session.
+
+    Flow control is per connection: frames sent during a turn are queued, up to `socket_max_pending` turns, and
+    rejected with an error frame beyond that. Results flow through the stream buffer of the server, so a slow
+    reader slows down its own run. The connection is closed after `socket_idle_timeout` seconds without a turn.
+
+    Args:
+        websocket (WebSocket): The connecting socket, with the `model` query parameter and optionally `session_id`.
+    """
+    server = websocket.app.state.server
+    model: Model = server.model
+    model_name = websocket.query_params.get("model")
+    session_id = websocket.query_params.get("session_id")
+
+    loop_monitor = server.loop_monitor
+    if loop_monitor is not None and loop_monitor.should_shed():
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason="The server is overloaded, please retry later")
+        return
+    verified_key = await _authenticate_socket(websocket)
+    if verified_key is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Invalid API Key")
+        return
+    if not model_name or model_name not in model.model_list:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Model not found")
+        return
+    if TOTAL_MODELS_NAME not in verified_key.allowed_models and model_name not in verified_key.allowed_models:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=f"Model '{model_name}' not allowed for this API Key")
+        return
+    if not model.can_open(model_name):
+        await websocket.close(
+            code=status.WS_1003_UNSUPPORTED_DATA,
+            reason=f"Model '{model_name}' builds a new team for every run and can not be used over a socket",
+        )
+        return
+    actor = await model.open_actor(model_name, owner=verified_key.key_name, session_id=session_id)
+
+    connection_id = websocket.headers.get("x-request-id", f"ws-{uuid.uuid4().hex}")
+    request_id_token = request_id_var.set(connection_id)
+    model_token = model_var.set(model_name)
+    await websocket.accept(headers=[(b"x-request-id", connection_id.encode())])
+    logger.info("Chat socket opened for model %s", model_name, extra={"model": model_name, "path": websocket.url.path})
+
+    pending: asyncio.Queue[List[ChatMessage]] = asyncio.Queue(maxsize=server.socket_max_pending)
+    send_lock = asyncio.Lock()
+
+    async def send(frame: str) -> None:
+        # the reader answers invalid frames while a turn is streaming
+        async with send_lock:
+            await websocket.send_text(frame)
+
+    async def read_frames() -> None:
+        while True:
+            frame = await websocket.receive()
+            if frame["type"] == "websocket.disconnect":
+                return
+            try:
+                messages = _decode_frame(frame.get("text") or frame.get("bytes") or b"", server.max_request_bytes)
+            except ChatRequestError as e:
+                await send(_error_frame(str(e), "invalid_request", param=e.param))
+                continue
+            try:
+                pending.put_nowait(messages)
+            except asyncio.QueueFull:
+                await send(_error_frame(
+                    f"More than {server.socket_max_pending} turns are pending, wait for the running turn",
+                    "rate_limit_exceeded",
+                    type="rate_limit_error",
+                ))
+
+    async def run_turn(messages: List[ChatMessage]) -> None:
+        result: AsyncGenerator[ReturnMessage, None] = model.run_actor_stream(model_name, actor, messages)
+        if server.memory_tracker is not None:
+            result = _stream_tracked(server.memory_tracker, model_name, result)
+        if server.scheduler is not None:
+            result = _stream_in_slot(server.scheduler, verified_key, result)
+        result = _record_stream_usage(server.usage_ledger, verified_key.key_name, model_name, result)
+        result = server.stream_buffer.stream(result)
+        async for chunk, _ in build_stream_chunks(model_name, result):
+            await send(chunk.model_dump_json())
+        await send("[DONE]")
+        if session_id is not None:
+            await model.save_actor(model_name, actor, verified_key.key_name, session_id)
+
+    reader = asyncio.create_task(read_frames())
+    try:
+        while True:
+            next_turn = asyncio.ensure_future(pending.get())
+            done, _ = await asyncio.wait(
+                {next_turn, reader}, timeout=server.socket_idle_timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            if next_turn not in done:
+                next_turn.cancel()
+                if reader not in done:
+                    await websocket.close(code=status.WS_1000_NORMAL_CLOSURE, reason="idle timeout")
+                break
+            turn = asyncio.create_task(run_turn(next_turn.result()))
+            await asyncio.wait({turn, reader}, return_when=asyncio.FIRST_COMPLETED)
+            if not turn.done():
+                # the client went away, the run is not worth finishing
+                turn.cancel()
+                break
+            error = turn.exception()
+            if isinstance(error, WebSocketDisconnect):
+                break
+            if error is not None and is_upstream_overloaded(error):
+                await send(_error_frame("The upstream model endpoint is overloaded, please retry later", "overloaded", type="server_error"))
+            elif error is not None:
+                logger.error("Chat socket turn failed: %s", error)
+                await send(_error_frame("Failed to generate completion", "server_error", type="server_error"))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if reader.done() and not reader.cancelled() and reader.exception() is not None:
+            logger.error("Chat socket reader failed: %s", reader.exception())
+        reader.cancel()
+        logger.info("Chat socket closed for model %s", model_name, extra={"model": model_name, "path": websocket.url.path})
+        model_var.reset(model_token)
+        request_id_var.reset(request_id_token)
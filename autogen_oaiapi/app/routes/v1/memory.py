@@ -0,0 +1,71 @@
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, HTTPException, Request
+from autogen_oaiapi.base.types import TOTAL_MODELS_NAME
+from autogen_oaiapi.observability import MemoryTracker
+
+
+router = APIRouter()
+
+def _tracker(request: Request) -> MemoryTracker:
+    if TOTAL_MODELS_NAME not in request.state.verified_key.allowed_models:
+        raise HTTPException(status_code=403, detail="Memory snapshots are not allowed for this API Key")
+    tracker: MemoryTracker | None = request.app.state.server.memory_tracker
+    if tracker is None:
+        raise HTTPException(status_code=404, detail="Memory tracking is not enabled on this server")
+    return tracker
+
+@router.get("/memory/snapshots")
+async def snapshots(request: Request) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Handle the GET request for the /memory/snapshots endpoint.
+    Lists the kept heap snapshots.
+
+    Args:
+        request (Request): The FastAPI request object.
+
+    Returns:
+        Dict[str, List[Dict[str, Any]]]: The id and creation time of every snapshot.
+    """
+    return {"data": _tracker(request).snapshots()}
+
+@router.post("/memory/snapshot")
+async def snapshot(request: Request, limit: int = 20) -> Dict[str, Any]:
+    """
+    Handle the POST request for the /memory/snapshot endpoint.
+    Takes and keeps a heap snapshot, to be compared with /memory/diff.
+
+    Args:
+        request (Request): The FastAPI request object.
+        limit (int): The number of source lines with the most allocated memory to return.
+
+    Returns:
+        Dict[str, Any]: The snapshot id, the traced memory and the source lines with the most allocated memory.
+    """
+    tracker = _tracker(request)
+    try:
+        return await tracker.snapshot(limit)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e)) from e
+
+@router.get("/memory/diff")
+async def diff(request: Request, base: str, target: Optional[str] = None, limit: int = 20) -> Dict[str, Any]:
+    """
+    Handle the GET request for the /memory/diff endpoint.
+    Compares a kept heap snapshot with a later one, or with a new snapshot.
+
+    Args:
+        request (Request): The FastAPI request object.
+        base (str): The id of the older snapshot.
+        target (Optional[str]): The id of the newer snapshot, a new snapshot is taken when missing.
+        limit (int): The number of source lines with the largest change to return.
+
+    Returns:
+        Dict[str, Any]: The ids of both snapshots and the source lines whose allocated memory changed the most.
+    """
+    tracker = _tracker(request)
+    try:
+        return await tracker.diff(base, target, limit)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0])) from e
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e)) from e
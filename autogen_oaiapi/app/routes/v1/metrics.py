@@ -0,0 +1,24 @@
+from typing import Any, Dict
+from fastapi import APIRouter, HTTPException, Request
+from autogen_oaiapi.base.types import TOTAL_MODELS_NAME
+
+
+router = APIRouter()
+
+@router.get("/metrics")
+async def metrics(request: Request) -> Dict[str, Any]:
+    """
+    Handle the GET request for the /metrics endpoint.
+    Returns the runtime statistics of the server components.
+    Only keys allowed to use every model may read the metrics.
+
+    Args:
+        request (Request): The FastAPI request object.
+
+    Returns:
+        Dict[str, Any]: The statistics per server component.
+    """
+    if TOTAL_MODELS_NAME not in request.state.verified_key.allowed_models:
+        raise HTTPException(status_code=403, detail="Metrics are not allowed for this API Key")
+    metrics: Dict[str, Any] = request.app.state.server.metrics()
+    return metrics
@@ -0,0 +1,72 @@
+from typing import Any, Dict, List
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+from autogen_oaiapi.base.types import TOTAL_MODELS_NAME
+from autogen_oaiapi.observability import Profiler
+
+
+router = APIRouter()
+
+def _profiler(request: Request) -> Profiler:
+    if TOTAL_MODELS_NAME not in request.state.verified_key.allowed_models:
+        raise HTTPException(status_code=403, detail="Profiling is not allowed for this API Key")
+    profiler: Profiler | None = request.app.state.server.profiler
+    if profiler is None:
+        raise HTTPException(status_code=404, detail="Profiling is not enabled on this server")
+    return profiler
+
+@router.get("/profiles")
+async def profiles(request: Request) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Handle the GET request for the /profiles endpoint.
+    Lists the kept reports of requests profiled with the `x-profile` header.
+
+    Args:
+        request (Request): The FastAPI request object.
+
+    Returns:
+        Dict[str, List[Dict[str, Any]]]: The id, path, creation time and duration of every report.
+    """
+    return {"data": _profiler(request).reports()}
+
+@router.get("/profiles/sample")
+async def sample(request: Request, seconds: float = 10.0, interval_ms: float = 5.0) -> PlainTextResponse:
+    """
+    Handle the GET request for the /profiles/sample endpoint.
+    Samples the event loop for `seconds` across all requests and returns the collapsed stacks,
+    the input format of flamegraph.pl and speedscope.
+
+    Args:
+        request (Request): The FastAPI request object.
+        seconds (float): How long to sample.
+        interval_ms (float): The time between two samples in milliseconds.
+
+    Returns:
+        PlainTextResponse: One "frame;frame;frame count" line per distinct stack.
+    """
+    profiler = _profiler(request)
+    if seconds <= 0 or interval_ms <= 0:
+        raise HTTPException(status_code=400, detail="seconds and interval_ms must be positive")
+    try:
+        stacks = await profiler.sample(seconds, interval_ms / 1000)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e)) from e
+    return PlainTextResponse(stacks)
+
+@router.get("/profiles/{profile_id}")
+async def profile(request: Request, profile_id: str) -> PlainTextResponse:
+    """
+    Handle the GET request for the /profiles/{profile_id} endpoint.
+    Downloads the pstats report of a profiled request.
+
+    Args:
+        request (Request): The FastAPI request object.
+        profile_id (str): The request id of the profiled request, returned in its `x-profile-id` header.
+
+    Returns:
+        PlainTextResponse: The pstats report.
+    """
+    report = _profiler(request).report(profile_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail=f"Profile '{profile_id}' not found")
+    return PlainTextResponse(report.report)
@@ -0,0 +1,237 @@
+import time
+import uuid
+from typing import Any, AsyncGenerator, Coroutine, Dict, List
+from fastapi import APIRouter, HTTPException, Request
+from autogen_agentchat.messages import ChatMessage, TextMessage
+from autogen_oaiapi.app.responses import FastJSONResponse
+from autogen_oaiapi.app.request_decoder import decode_chat_request, ChatRequestError
+from autogen_oaiapi.app.routes.v1.chat import _run_in_slot, _run_tracked
+from autogen_oaiapi.base.types import (
+    ChatCompletionErrorResponse,
+    ChatCompletionErrorDetail,
+    ResponseObject,
+    ResponseOutputMessage,
+    ResponseOutputText,
+    ResponseUsage,
+    ReturnMessage,
+)
+from autogen_oaiapi.model import Model
+from autogen_oaiapi.session_manager.response_store import ResponseStore, StoredResponse
+from ....base import VerifiedKey
+
+
+router = APIRouter()
+
+def _error(status_code: int, message: str, code: Any, param: str | None = None) -> FastJSONResponse:
+    return FastJSONResponse(
+        status_code=status_code,
+        content=ChatCompletionErrorResponse(
+            error=ChatCompletionErrorDetail(
+                message=message,
+                type="invalid_request_error",
+                param=param,
+                code=code,
+            )
+        ),
+    )
+
+def _decode_input(payload: Dict[str, Any]) -> List[ChatMessage]:
+    """
+    Decode the `input` and `instructions` of a responses request into AutoGen messages.
+
+    Args:
+        payload (Dict[str, Any]): The parsed request body.
+
+    Returns:
+        List[ChatMessage]: The instructions as a system message, followed by the input messages.
+
+    Raises:
+        ChatRequestError: If the input is not valid or empty.
+    """
+    raw_input = payload.get("input")
+    if isinstance(raw_input, str):
+        raw_input = [{"role": "user", "content": raw_input}]
+    if not isinstance(raw_input, list):
+        raise ChatRequestError("'input' must be a string or a list of messages", param="input")
+    instructions = payload.get("instructions")
+    if instructions is not None and not isinstance(instructions, str):
+        raise ChatRequestError("'instructions' must be a string", param="instructions")
+    if instructions:
+        raw_input = [{"role": "system", "content": instructions}, *raw_input]
+    messages = decode_chat_request({"messages": raw_input}).messages
+    if not messages:
+        raise ChatRequestError("'input' has no message content", param="input")
+    return messages
+
+def _replay(store: ResponseStore, response: StoredResponse) -> List[ChatMessage] | None:
+    """
+    Rebuild the conversation up to a stored response from the inputs and outputs of its chain.
+    Used for models whose actor state is not kept.
+
+    Args:
+        store (ResponseStore): The response store.
+        response (StoredResponse): The last response of the conversation.
+
+    Returns:
+        List[ChatMessage] | None: The messages of the conversation, None if a response of the chain expired.
+    """
+    chain = [response]
+    while chain[-1].previous_response_id is not None:
+        previous = store.get(chain[-1].previous_response_id)
+        if previous is None:
+            return None
+        chain.append(previous)
+    messages: List[ChatMessage] = []
+    for turn in reversed(chain):
+        messages.extend(TextMessage(content=content, source=role) for role, content in turn.input)
+        messages.append(TextMessage(content=turn.output, source="assistant"))
+    return messages
+
+async def _run_actor(model: Model, model_name: str, actor: Any, messages: List[ChatMessage]) -> ReturnMessage:
+    last = ReturnMessage(content="Something went wrong, please try again.")
+    stream: AsyncGenerator[ReturnMessage, None] = model.run_actor_stream(model_name, actor, messages)
+    async for message in stream:
+        last = message
+    return last
+
+@router.post("/responses", response_model=ResponseObject)
+async def create_response(request: Request) -> FastJSONResponse:
+    """
+    Handle the POST request for the /responses endpoint.
+    Runs one turn and stores it under a new response id. A request with `previous_response_id` only sends
+    its new input: the actor continues from the state stored with the previous response, or, for team managers
+    whose state is not kept, from the inputs and outputs of the stored chain.
+
+    Args:
+        request (Request): The FastAPI request object.
+
+    Returns:
+        FastJSONResponse: The response object, or an error response.
+    """
+    server = request.app.state.server
+    store: ResponseStore | None = server.response_store
+    if store is None:
+        return _error(404, "The responses endpoint is not enabled on this server", "invalid_request")
+    payload: Dict[str, Any] = request.state.json_body
+    model: Model = server.model
+    model_name: str = payload["model"]
+    if model_name not in model.model_list:
+        return _error(404, "Model not found", "model_not_found", param="model")
+    if payload.get("stream"):
+        return _error(400, "Streaming is not supported by the responses endpoint, use /chat/completions", "invalid_request", param="stream")
+    try:
+        messages = _decode_input(payload)
+    except ChatRequestError as e:
+        return _error(400, str(e), "invalid_request", param=e.param)
+
+    verified_key: VerifiedKey = request.state.verified_key
+    previous_id = payload.get("previous_response_id")
+    previous: StoredResponse | None = None
+    if previous_id is not None:
+        previous = store.get(previous_id) if isinstance(previous_id, str) else None
+        if previous is None or previous.owner != verified_key.key_name or previous.model != model_name:
+            return _error(400, f"Previous response '{previous_id}' not found", "invalid_request", param="previous_response_id")
+
+    actor: Any = None
+    result: Coroutine[Any, Any, ReturnMessage]
+    if model.can_open(model_name):
+        actor = await model.open_actor(
+            model_name, owner=verified_key.key_name, state=previous.team_state if previous is not None else None
+        )
+        result = _run_actor(model, model_name, actor, messages)
+    else:
+        # team managers build a new team for every run, the stored chain is replayed instead
+        history = _replay(store, previous) if previous is not None else []
+        if history is None:
+            return _error(400, f"A response before '{previous_id}' expired", "invalid_request", param="previous_response_id")
+        result = model.run(name=model_name, messages=history + messages, owner=verified_key.key_name)
+    if server.memory_tracker is not None:
+        result = _run_tracked(server.memory_tracker, model_name, result)
+    if server.scheduler is not None:
+        result = _run_in_slot(server.scheduler, verified_key, result)
+    message = await result
+
+    usage = ResponseUsage(
+        input_tokens=message.total_prompt_tokens or 0,
+        output_tokens=message.total_completion_tokens or 0,
+        total_tokens=message.total_tokens or 0,
+    )
+    server.usage_ledger.record(
+        verified_key.key_name, model_name, usage.input_tokens, usage.output_tokens, usage.total_tokens
+    )
+    stored = payload.get("store", True) is not False
+    response_hex = uuid.uuid4().hex
+    response = ResponseObject(
+        id=f"resp_{response_hex}",
+        created_at=int(time.time()),
+        model=model_name,
+        output=[ResponseOutputMessage(id=f"msg_{response_hex}", content=[ResponseOutputText(text=message.content)])],
+        output_text=message.content,
+        previous_response_id=previous_id,
+        store=stored,
+        usage=usage,
+    )
+    if stored:
+        store.put(StoredResponse(
+            id=response.id,
+            model=model_name,
+            owner=verified_key.key_name,
+            input=[(m.source, m.content) for m in messages if isinstance(m, TextMessage)],
+            output=message.content,
+            team_state=await actor.save_state() if actor is not None else None,
+            previous_response_id=previous_id,
+            created_at=response.created_at,
+            usage=(usage.input_tokens, usage.output_tokens, usage.total_tokens),
+        ))
+    return FastJSONResponse(response)
+
+def _stored(request: Request, response_id: str) -> StoredResponse:
+    store: ResponseStore | None = request.app.state.server.response_store
+    if store is None:
+        raise HTTPException(status_code=404, detail="The responses endpoint is not enabled on this server")
+    response = store.get(response_id)
+    if response is None or response.owner != request.state.verified_key.key_name:
+        raise HTTPException(status_code=404, detail=f"Response '{response_id}' not found")
+    return response
+
+@router.get("/responses/{response_id}", response_model=ResponseObject)
+async def get_response(request: Request, response_id: str) -> FastJSONResponse:
+    """
+    Handle the GET request for the /responses/{response_id} endpoint.
+    Returns a stored response of the API key.
+
+    Args:
+        request (Request): The FastAPI request object.
+        response_id (str): The response id.
+
+    Returns:
+        FastJSONResponse: The response object.
+    """
+    stored = _stored(request, response_id)
+    input_tokens, output_tokens, total_tokens = stored.usage
+    return FastJSONResponse(ResponseObject(
+        id=stored.id,
+        created_at=stored.created_at,
+        model=stored.model,
+        output=[ResponseOutputMessage(id=f"msg_{stored.id[len('resp_'):]}", content=[ResponseOutputText(text=stored.output)])],
+        output_text=stored.output,
+        previous_response_id=stored.previous_response_id,
+        usage=ResponseUsage(input_tokens=input_tokens, output_tokens=output_tokens, total_tokens=total_tokens),
+    ))
+
+@router.delete("/responses/{response_id}")
+async def delete_response(request: Request, response_id: str) -> Dict[str, Any]:
+    """
+    Handle the DELETE request for the /responses/{response_id} endpoint.
+    Deletes a stored response of the API key.
+
+    Args:
+        request (Request): The FastAPI request object.
+        response_id (str): The response id.
+
+    Returns:
+        Dict[str, Any]: The deleted response id.
+    """
+    _stored(request, response_id)
+    request.app.state.server.response_store.delete(response_id)
+    return {"id": response_id, "object": "response", "deleted": True}
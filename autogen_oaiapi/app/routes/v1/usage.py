@@ -0,0 +1,40 @@
+from typing import Optional
+from fastapi import APIRouter, Request
+from autogen_oaiapi.app.responses import FastJSONResponse
+from autogen_oaiapi.base.types import UsageResponse, UsageListResponse, TOTAL_MODELS_NAME
+
+
+router = APIRouter()
+
+@router.get("/usage", response_model=UsageListResponse)
+async def usage(request: Request, key_name: Optional[str] = None, model: Optional[str] = None) -> FastJSONResponse:
+    """
+    Handle the GET request for the /usage endpoint.
+    Returns the token usage recorded by this server per API key and model.
+    Keys allowed to use every model may query any key, other keys only see their own usage.
+
+    Args:
+        request (Request): The FastAPI request object.
+        key_name (Optional[str]): Only return usage of this API key.
+        model (Optional[str]): Only return usage of this model.
+
+    Returns:
+        FastJSONResponse: The response containing the usage per API key and model.
+    """
+    server = request.app.state.server
+    verified_key = request.state.verified_key
+    if TOTAL_MODELS_NAME not in verified_key.allowed_models:
+        key_name = verified_key.key_name
+    return FastJSONResponse(UsageListResponse(
+        data=[
+            UsageResponse(
+                key_name=record.key_name,
+                model=record.model,
+                requests=record.requests,
+                prompt_tokens=record.prompt_tokens,
+                completion_tokens=record.completion_tokens,
+                total_tokens=record.total_tokens,
+            )
+            for record in server.usage_ledger.query(key_name=key_name, model=model)
+        ]
+    ))
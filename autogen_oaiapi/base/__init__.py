@@ -1,8 +1,15 @@
-from ._key_manager import BaseKeyManager, APIKeyStore, DefaultAPIKeyStore
+from ._key_manager import BaseKeyManager, BaseAPIKeyStore, APIKeyEntry, APIKeyStore, VerifiedKey, DefaultAPIKeyStore
+from ._model_client import DelegatingChatCompletionClient, iter_actor_parts, iter_model_client_owners
 
 
 __all__ = [
     "BaseKeyManager",
+    "BaseAPIKeyStore",
+    "APIKeyEntry",
     "APIKeyStore",
+    "VerifiedKey",
     "DefaultAPIKeyStore",
+    "DelegatingChatCompletionClient",
+    "iter_actor_parts",
+    "iter_model_client_owners",
 ]
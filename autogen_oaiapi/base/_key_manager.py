@@ -1,13 +1,33 @@
+import secrets
+import warnings
 from abc import ABC, abstractmethod
-from pydantic import BaseModel, Field
-from typing import List, Dict, Optional
-from .utils import generate_key
+from collections import OrderedDict
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Dict, Literal, Optional, FrozenSet, NamedTuple
+from .utils import generate_key, hash_key
 
 class APIKeyEntry(BaseModel):
-    api_key: str = Field(..., description="API Key")
+    api_key: str | None = Field(default=None, description="API Key (plaintext), hashed and dropped when stored")
+    api_key_hash: str | None = Field(default=None, description="Peppered SHA-256 hash of the API Key")
     allowed_models: List[str] = Field(default_factory=list, description="allowed models for this key, '*' for all models")
     is_active: bool = Field(default=True, description="API Key active status")
     description: str | None = Field(default=None, description="Key description optional")
+    weight: float = Field(default=1.0, gt=0, description="Share of the execution slots relative to the other keys")
+    priority: Literal["interactive", "batch"] = Field(default="interactive", description="Priority class, interactive requests are scheduled before batch requests")
+    key_name: str | None = Field(default=None, exclude=True, description="Name of the key, filled in by the key store")
+
+    @model_validator(mode="after")
+    def _check_key(self) -> "APIKeyEntry":
+        if self.api_key is None and self.api_key_hash is None:
+            raise ValueError("either api_key or api_key_hash must be set")
+        return self
+
+
+class VerifiedKey(NamedTuple):
+    key_name: str
+    allowed_models: FrozenSet[str]
+    weight: float = 1.0
+    priority: str = "interactive"
 
 
 class APIKeyStore(BaseModel):
@@ -15,6 +35,9 @@ class APIKeyStore(BaseModel):
 
 
 class BaseAPIKeyStore(ABC):
+    # bumped by every change of the stored keys, also changes made on the store directly or by another worker
+    generation: int = 0
+
     @abstractmethod
     def get_api_key_entry(self, api_key: str) -> Optional[APIKeyEntry]:
         """
@@ -71,18 +94,72 @@ class BaseAPIKeyStore(ABC):
         """
         ...
 
+    async def aget_api_key_entry(self, api_key: str) -> Optional[APIKeyEntry]:
+        """
+        Get the API key without blocking the event loop.
+        Stores backed by I/O should override this, the default delegates to `get_api_key_entry`.
+        Args:
+            api_key (str): The API key to look up.
+        Returns:
+            Optional[APIKeyEntry]: The API key entry if found, None otherwise.
+        """
+        return self.get_api_key_entry(api_key)
+
+    async def start(self) -> None:  # noqa: B027, optional hook, most stores have no background work
+        """
+        Start background work of the key store. Called by the key manager when the server starts.
+        """
+        pass
+
+    async def stop(self) -> None:  # noqa: B027, optional hook, most stores have no background work
+        """
+        Stop background work of the key store. Called by the key manager when the server shuts down.
+        """
+        pass
+
 
 class DefaultAPIKeyStore(BaseAPIKeyStore):
     """
     Default implementation of the API key store.
     This class manages API keys and their associated metadata.
+    Keys are kept only as peppered SHA-256 hashes, plaintext keys are never stored.
     """
-    def __init__(self) -> None:
+    def __init__(self, pepper: str | bytes | None = None) -> None:
         """
         Initialize the API key store.
+        Args:
+            pepper (str | bytes | None): The secret mixed into every key hash.
+                A random pepper is generated when omitted, so pre-hashed keys can only be loaded with an explicit pepper.
         """
+        if pepper is None:
+            pepper = secrets.token_bytes(32)
+        self._pepper: bytes = pepper.encode("utf-8") if isinstance(pepper, str) else pepper
         self._api_keys: Dict[str, APIKeyEntry] = {}
-        self._key2name: Dict[str, str] = {}
+        self._hash2name: Dict[str, str] = {}
+        self.generation = 0
+
+    def hash_api_key(self, api_key: str) -> str:
+        """
+        Hash an API key with the pepper of this store.
+        Args:
+            api_key (str): The plaintext API key.
+        Returns:
+            str: The hex digest stored for the API key.
+        """
+        return hash_key(api_key, self._pepper)
+
+    def _store_entry(self, key_name: str, key_entry: APIKeyEntry) -> APIKeyEntry:
+        update: Dict[str, str | None] = {"key_name": key_name}
+        if key_entry.api_key is not None:
+            update.update(api_key=None, api_key_hash=self.hash_api_key(key_entry.api_key))
+        key_entry = key_entry.model_copy(update=update)
+        previous = self._api_keys.get(key_name)
+        if previous is not None and previous.api_key_hash is not None:
+            self._hash2name.pop(previous.api_key_hash, None)
+        self._api_keys[key_name] = key_entry
+        self._hash2name[key_entry.api_key_hash or ""] = key_name
+        self.generation += 1
+        return key_entry
 
     def set_api_key_entry_batch(self, key_entries: Dict[str, APIKeyEntry]) -> None:
         """
@@ -90,9 +167,8 @@ class DefaultAPIKeyStore(BaseAPIKeyStore):
         Args:
             key_entries (Dict[str, APIKeyEntry]): A dictionary of API key entries.
         """
-        self._api_keys.update(key_entries)
         for key_name, entry in key_entries.items():
-            self._key2name[entry.api_key] = key_name
+            self._store_entry(key_name, entry)
 
     def set_api_key_entry(self, key_name: str, key_entry: APIKeyEntry) -> None:
         """
@@ -101,8 +177,7 @@ class DefaultAPIKeyStore(BaseAPIKeyStore):
             key_name (str): The name of the API key.
             key_entry (APIKeyEntry): The API key entry to set.
         """
-        self._api_keys[key_name] = key_entry
-        self._key2name[key_entry.api_key] = key_name
+        self._store_entry(key_name, key_entry)
 
     def get_api_key_entry(self, api_key: str) -> Optional[APIKeyEntry]:
         """
@@ -112,7 +187,10 @@ class DefaultAPIKeyStore(BaseAPIKeyStore):
         Returns:
             Optional[APIKeyEntry]: The API key entry if found, None otherwise.
         """
-        return self._api_keys.get(self._key2name.get(api_key, ""), None)
+        key_name = self._hash2name.get(self.hash_api_key(api_key))
+        if key_name is None:
+            return None
+        return self._api_keys.get(key_name)
 
     def set_api_key(self, key_name: str, api_key: str, description: str|None=None) -> APIKeyEntry:
         """
@@ -129,9 +207,7 @@ class DefaultAPIKeyStore(BaseAPIKeyStore):
             allowed_models=[],
             description=description,
         )
-        self._api_keys[key_name] = entry
-        self._key2name[api_key] = key_name
-        return entry
+        return self._store_entry(key_name, entry)
 
     def set_model_to_api_key(self, key_name: str, model: str) -> bool:
         """
@@ -147,6 +223,7 @@ class DefaultAPIKeyStore(BaseAPIKeyStore):
         entry = self._api_keys[key_name]
         if model not in entry.allowed_models:
             entry.allowed_models.append(model)
+            self.generation += 1
             return True
         return False
 
@@ -159,6 +236,7 @@ class DefaultAPIKeyStore(BaseAPIKeyStore):
         """
         if key_name in self._api_keys:
             self._api_keys[key_name].is_active = is_active
+            self.generation += 1
 
     def get_all_api_key_entries(self) -> List[tuple[str,APIKeyEntry]]:
         """
@@ -169,20 +247,111 @@ class DefaultAPIKeyStore(BaseAPIKeyStore):
         return list(self._api_keys.items())
 
 
-class BaseKeyManager(ABC):
-    def __init__(self, key_store: BaseAPIKeyStore) -> None:
+class BaseKeyManager(ABC):  # noqa: B024, a base for the key managers, every method has a working default
+    def __init__(self, key_store: BaseAPIKeyStore, cache_size: int = 1024) -> None:
+        """
+        Initialize the key manager.
+        Args:
+            key_store (BaseAPIKeyStore): The store holding the API key entries.
+            cache_size (int): The maximum number of verified API keys kept in the LRU cache.
+        """
         self._key_store: BaseAPIKeyStore = key_store
+        self._cache_size = cache_size
+        self._verified_keys: OrderedDict[str, VerifiedKey] = OrderedDict()
+        self._cache_generation = key_store.generation
+
+    def _get_cached_key(self, api_key: str) -> Optional[VerifiedKey]:
+        if self._cache_generation != self._key_store.generation:
+            self.invalidate_cache()
+        verified_key = self._verified_keys.get(api_key)
+        if verified_key is not None:
+            self._verified_keys.move_to_end(api_key)
+        return verified_key
+
+    def _cache_key(self, api_key: str, key_entry: Optional[APIKeyEntry]) -> Optional[VerifiedKey]:
+        if key_entry is None or not key_entry.is_active:
+            # unknown keys are not cached, so they can not evict the hot keys
+            return None
+        verified_key = VerifiedKey(
+            key_name=key_entry.key_name or "",
+            allowed_models=frozenset(key_entry.allowed_models),
+            weight=key_entry.weight,
+            priority=key_entry.priority,
+        )
+        self._verified_keys[api_key] = verified_key
+        if len(self._verified_keys) > self._cache_size:
+            self._verified_keys.popitem(last=False)
+        return verified_key
+
+    def get_verified_key(self, api_key: str) -> Optional[VerifiedKey]:
+        """
+        Verify an API key.
+        Hot keys are served from an LRU cache, so only the first lookup of a key pays for hashing.
+        Args:
+            api_key (str): The API key to look up.
+        Returns:
+            Optional[VerifiedKey]: The key name and allowed models, None if the key is unknown or inactive.
+        """
+        verified_key = self._get_cached_key(api_key)
+        if verified_key is not None:
+            return verified_key
+        return self._cache_key(api_key, self._key_store.get_api_key_entry(api_key))
 
-    def get_allow_models(self, api_key: str) -> List[str]:
+    async def aget_verified_key(self, api_key: str) -> Optional[VerifiedKey]:
         """
-        Get the list of allowed models.
+        Verify an API key without blocking the event loop on a cache miss.
         Args:
             api_key (str): The API key to look up.
         Returns:
-            List[str]: A list of allowed models for the API key.
+            Optional[VerifiedKey]: The key name and allowed models, None if the key is unknown or inactive.
+        """
+        verified_key = self._get_cached_key(api_key)
+        if verified_key is not None:
+            return verified_key
+        key_entry = await self._key_store.aget_api_key_entry(api_key)
+        return self._cache_key(api_key, key_entry)
+
+    def get_allow_models(self, api_key: str) -> FrozenSet[str]:
+        """
+        Get the set of allowed models.
+        Args:
+            api_key (str): The API key to look up.
+        Returns:
+            FrozenSet[str]: The allowed models for the API key, empty if the key is unknown or inactive.
+        """
+        verified_key = self.get_verified_key(api_key)
+        return verified_key.allowed_models if verified_key else frozenset()
+
+    async def aget_allow_models(self, api_key: str) -> FrozenSet[str]:
+        """
+        Get the set of allowed models without blocking the event loop on a cache miss.
+        Args:
+            api_key (str): The API key to look up.
+        Returns:
+            FrozenSet[str]: The allowed models for the API key, empty if the key is unknown or inactive.
+        """
+        verified_key = await self.aget_verified_key(api_key)
+        return verified_key.allowed_models if verified_key else frozenset()
+
+    async def start(self) -> None:
+        """
+        Start background work of the key manager. Called once when the server starts.
+        """
+        await self._key_store.start()
+
+    async def stop(self) -> None:
+        """
+        Stop background work of the key manager. Called once when the server shuts down.
         """
-        key_entry = self._key_store.get_api_key_entry(api_key)
-        return key_entry.allowed_models if key_entry else []
+        await self._key_store.stop()
+
+    def invalidate_cache(self) -> None:
+        """
+        Drop every verified API key from the cache.
+        Must be called whenever the key store is changed outside of this manager.
+        """
+        self._verified_keys.clear()
+        self._cache_generation = self._key_store.generation
 
     def set_allow_model(self, key_name: str, model: str) -> bool:
         """
@@ -193,7 +362,20 @@ class BaseKeyManager(ABC):
         Returns:
             bool: True if the model was added, False if it was already present.
         """
-        return self._key_store.set_model_to_api_key(key_name, model)
+        added = self._key_store.set_model_to_api_key(key_name, model)
+        if added:
+            self.invalidate_cache()
+        return added
+
+    def set_api_key_active_status(self, key_name: str, is_active: bool) -> None:
+        """
+        Activate or deactivate an API key, a deactivated key stops verifying at once.
+        Args:
+            key_name (str): The name of the API key.
+            is_active (bool): The active status to set.
+        """
+        self._key_store.set_api_key_active_status(key_name, is_active)
+        self.invalidate_cache()
 
     def set_api_key(self, key_name: str) -> str:
         """
@@ -205,18 +387,29 @@ class BaseKeyManager(ABC):
         """
         api_key = generate_key()
         self._key_store.set_api_key(key_name, api_key)
+        self.invalidate_cache()
         return api_key
 
     def get_api_key(self, key_name: str) -> str:
         """
         Get the API key.
+        Deprecated: plaintext keys are not kept by hashing stores, they are only returned once by `set_api_key`.
         Args:
             key_name (str): The name of the API key.
         Returns:
-            str: The API key if found, otherwise a default value.
-        """
-        key_entry = self._key_store.get_api_key_entry(key_name)
-        if key_entry:
+            str: The API key, for entries that still hold their plaintext.
+        Raises:
+            KeyError: If no API key has this name.
+            ValueError: If only the hash of the API key is stored.
+        """
+        warnings.warn(
+            "get_api_key is deprecated, keep the key returned by set_api_key instead",
+            DeprecationWarning,
+            stacklevel=2,
+        )
+        key_entry = dict(self._key_store.get_all_api_key_entries()).get(key_name)
+        if key_entry is None:
+            raise KeyError(f"API key '{key_name}' not found")
+        if key_entry.api_key:
             return key_entry.api_key
-        else:
-            return "BASE_API_KEY"
\ No newline at end of file
+        raise ValueError(f"API key '{key_name}' is stored as a hash, its plaintext is only returned by set_api_key")
@@ -0,0 +1,135 @@
+from typing import Any, AsyncGenerator, Iterator, Mapping, Optional, Sequence, Tuple, Union
+from autogen_agentchat.agents import BaseChatAgent, SocietyOfMindAgent
+from autogen_agentchat.teams import BaseGroupChat
+from autogen_core import CancellationToken, ComponentModel
+from autogen_core.models import (
+    ChatCompletionClient,
+    CreateResult,
+    LLMMessage,
+    ModelCapabilities,  # type: ignore
+    ModelInfo,
+    RequestUsage,
+)
+from autogen_core.tools import Tool, ToolSchema
+from pydantic import BaseModel
+
+
+def iter_actor_parts(actor: Any) -> Iterator[Any]:
+    """
+    Walk a loaded team or agent depth-first.
+
+    Args:
+        actor (Any): The team or agent.
+
+    Yields:
+        Any: The actor and every team and agent inside it, the participants of nested teams
+            and the inner team of a `SocietyOfMindAgent` included.
+    """
+    yield actor
+    if isinstance(actor, BaseGroupChat):
+        for participant in actor._participants:
+            yield from iter_actor_parts(participant)
+    elif isinstance(actor, SocietyOfMindAgent):
+        yield from iter_actor_parts(actor._team)
+
+
+def iter_model_client_owners(actor: Any) -> Iterator[Tuple[Any, str]]:
+    """
+    Find the model clients of a loaded team or agent, so they can be wrapped in place.
+
+    Args:
+        actor (Any): The team or agent.
+
+    Yields:
+        Tuple[Any, str]: Every team or agent holding a model client in `_model_client`, with its name,
+            "selector" for the speaker selection of a `SelectorGroupChat`.
+    """
+    for part in iter_actor_parts(actor):
+        if isinstance(part, BaseGroupChat):
+            if hasattr(part, "_model_client"):
+                yield part, "selector"
+        elif isinstance(part, BaseChatAgent) and hasattr(part, "_model_client"):
+            yield part, part.name
+
+
+class DelegatingChatCompletionClient(ChatCompletionClient):
+    """
+    Model client delegating every call to a wrapped client, the base of the clients that wrap the clients of the actors.
+    Subclasses override `create` and `create_stream`, everything else, including `dump_component`, reaches the wrapped client.
+
+    Args:
+        client (ChatCompletionClient): The wrapped model client.
+    """
+    def __init__(self, client: ChatCompletionClient) -> None:
+        self._client = client
+
+    @property
+    def wrapped(self) -> ChatCompletionClient:
+        """
+        Get the wrapped model client.
+
+        Returns:
+            ChatCompletionClient: The wrapped client.
+        """
+        return self._client
+
+    async def create(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = [],
+        json_output: Optional[bool | type[BaseModel]] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> CreateResult:
+        return await self._client.create(
+            messages,
+            tools=tools,
+            json_output=json_output,
+            extra_create_args=extra_create_args,
+            cancellation_token=cancellation_token,
+        )
+
+    async def create_stream(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = [],
+        json_output: Optional[bool | type[BaseModel]] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> AsyncGenerator[Union[str, CreateResult], None]:
+        async for chunk in self._client.create_stream(
+            messages,
+            tools=tools,
+            json_output=json_output,
+            extra_create_args=extra_create_args,
+            cancellation_token=cancellation_token,
+        ):
+            yield chunk
+
+    async def close(self) -> None:
+        await self._client.close()
+
+    def actual_usage(self) -> RequestUsage:
+        return self._client.actual_usage()
+
+    def total_usage(self) -> RequestUsage:
+        return self._client.total_usage()
+
+    def count_tokens(self, messages: Sequence[LLMMessage], *, tools: Sequence[Tool | ToolSchema] = []) -> int:
+        return self._client.count_tokens(messages, tools=tools)
+
+    def remaining_tokens(self, messages: Sequence[LLMMessage], *, tools: Sequence[Tool | ToolSchema] = []) -> int:
+        return self._client.remaining_tokens(messages, tools=tools)
+
+    @property
+    def capabilities(self) -> ModelCapabilities:  # type: ignore
+        return self._client.capabilities  # type: ignore
+
+    @property
+    def model_info(self) -> ModelInfo:
+        return self._client.model_info
+
+    def dump_component(self) -> ComponentModel:
+        return self._client.dump_component()
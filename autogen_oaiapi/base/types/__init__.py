@@ -15,6 +15,12 @@ from ._response_and_resquset import (
     ModelResponse,
     ModelListResponse,
     ModelListRequest,
+    UsageResponse,
+    UsageListResponse,
+    ResponseObject,
+    ResponseOutputMessage,
+    ResponseOutputText,
+    ResponseUsage,
 )
 from ._session import (
     SessionContext,
@@ -39,6 +45,12 @@ __all__ = [
     "ModelResponse",
     "ModelListResponse",
     "ModelListRequest",
+    "UsageResponse",
+    "UsageListResponse",
+    "ResponseObject",
+    "ResponseOutputMessage",
+    "ResponseOutputText",
+    "ResponseUsage",
     "SessionContext",
     "Registry",
     "TOTAL_MODELS_NAME",
@@ -96,7 +96,9 @@ ErrorCode = Literal[
     "billing_not_active",
     "server_error",
     "timeout",
-    "overloaded"
+    "overloaded",
+    "request_too_large",
+    "invalid_request"
 ]
 
 class ChatCompletionErrorDetail(BaseModel):
@@ -175,4 +177,6 @@ class ReturnMessage(BaseModel):
     content: str
     total_prompt_tokens: int | None = None
     total_completion_tokens: int | None = None
-    total_tokens: int | None = None
\ No newline at end of file
+    total_tokens: int | None = None
+    # server-sent event id of a checkpointed run, see `Model.run_stream`
+    event_id: str | None = None
\ No newline at end of file
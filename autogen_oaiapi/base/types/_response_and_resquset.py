@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from autogen_oaiapi.base.types._chat_message import ChatCompletionMessage
 
 
@@ -50,4 +50,104 @@ class ModelListRequest(BaseModel):
     top_p: Optional[float] = 1.0
     n: Optional[int] = 1
     stop: Optional[List[str]] = None
-    max_tokens: Optional[int] = 1000
\ No newline at end of file
+    max_tokens: Optional[int] = 1000
+
+class UsageResponse(BaseModel):
+    """
+    Represents the token usage of one API key on one model.
+
+    Args:
+        key_name (str): Name of the API key.
+        model (str): Model name.
+        requests (int): Number of completed requests.
+        prompt_tokens (int): Number of prompt tokens used.
+        completion_tokens (int): Number of completion tokens used.
+        total_tokens (int): Total tokens used.
+    """
+    key_name: str
+    model: str
+    requests: int
+    prompt_tokens: int
+    completion_tokens: int
+    total_tokens: int
+
+class UsageListResponse(BaseModel):
+    """
+    Response model for the usage query.
+
+    Args:
+        data (List[UsageResponse]): List of usage per API key and model.
+        object (str): Object type.
+    """
+    data: List[UsageResponse]
+    object: str = "list"
+
+class ResponseOutputText(BaseModel):
+    """
+    Text part of a response output message.
+
+    Args:
+        type (str): Part type.
+        text (str): The generated text.
+        annotations (List[Dict[str, Any]]): Annotations of the text, always empty.
+    """
+    type: str = "output_text"
+    text: str
+    annotations: List[Dict[str, Any]] = []
+
+class ResponseOutputMessage(BaseModel):
+    """
+    Output message of a response.
+
+    Args:
+        id (str): Message identifier.
+        type (str): Output item type.
+        status (str): Message status.
+        role (str): Message role.
+        content (List[ResponseOutputText]): The message parts.
+    """
+    id: str
+    type: str = "message"
+    status: str = "completed"
+    role: str = "assistant"
+    content: List[ResponseOutputText]
+
+class ResponseUsage(BaseModel):
+    """
+    Token usage of a response.
+
+    Args:
+        input_tokens (int): Number of input tokens used.
+        output_tokens (int): Number of output tokens used.
+        total_tokens (int): Total tokens used.
+    """
+    input_tokens: int
+    output_tokens: int
+    total_tokens: int
+
+class ResponseObject(BaseModel):
+    """
+    Response of the `/v1/responses` endpoint.
+
+    Args:
+        id (str): Response identifier, pass it as `previous_response_id` to continue the conversation.
+        object (str): Object type.
+        created_at (int): Creation timestamp.
+        status (str): Response status.
+        model (str): Model name.
+        output (List[ResponseOutputMessage]): The output messages.
+        output_text (str): The text of the output messages.
+        previous_response_id (str, optional): The response this one continues.
+        store (bool): Whether the response is stored.
+        usage (ResponseUsage): Token usage of the turn.
+    """
+    id: str
+    object: str = "response"
+    created_at: int
+    status: str = "completed"
+    model: str
+    output: List[ResponseOutputMessage]
+    output_text: str
+    previous_response_id: Optional[str] = None
+    store: bool = True
+    usage: ResponseUsage
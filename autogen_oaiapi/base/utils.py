@@ -1,7 +1,12 @@
+import hashlib
+import hmac
 import uuid
 
 def generate_session_id() -> str:
     return str(uuid.uuid4())
 
 def generate_key() -> str:
-    return f"autogen-oaiapi-key-{str(uuid.uuid4())}"
\ No newline at end of file
+    return f"autogen-oaiapi-key-{str(uuid.uuid4())}"
+
+def hash_key(api_key: str, pepper: bytes) -> str:
+    return hmac.new(pepper, api_key.encode("utf-8"), hashlib.sha256).hexdigest()
@@ -0,0 +1,14 @@
+from .base import BaseHistoryPolicy, HistoryStats, Tokenizer, approx_token_count
+from .window import LastNPolicy, TokenBudgetPolicy
+from .summary import SummarizePolicy, SummaryStats
+
+__all__ = [
+    "BaseHistoryPolicy",
+    "HistoryStats",
+    "Tokenizer",
+    "approx_token_count",
+    "LastNPolicy",
+    "TokenBudgetPolicy",
+    "SummarizePolicy",
+    "SummaryStats",
+]
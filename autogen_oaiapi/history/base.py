@@ -0,0 +1,180 @@
+import dataclasses
+import math
+from abc import ABC, abstractmethod
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence
+from autogen_agentchat.messages import ChatMessage
+
+# counts the tokens of a text, e.g. `lambda text: len(tiktoken_encoding.encode(text))`
+Tokenizer = Callable[[str], int]
+
+
+def approx_token_count(text: str) -> int:
+    """
+    Estimate the number of tokens of a text at about four characters per token.
+
+    Args:
+        text (str): The text to count.
+
+    Returns:
+        int: The estimated number of tokens.
+    """
+    return math.ceil(len(text) / 4)
+
+
+@dataclass
+class HistoryStats:
+    """
+    Token statistics of a history policy for one model.
+
+    Args:
+        requests (int): Number of histories the policy was applied to.
+        tokens_in (int): Tokens of the histories sent by the clients.
+        tokens_out (int): Tokens of the histories passed on to the teams.
+    """
+    requests: int = 0
+    tokens_in: int = 0
+    tokens_out: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_in - self.tokens_out
+
+    def as_dict(self) -> Dict[str, int]:
+        """
+        Get the statistics with the saved tokens.
+
+        Returns:
+            Dict[str, int]: Every counter, and the tokens saved.
+        """
+        return {**dataclasses.asdict(self), "tokens_saved": self.tokens_saved}
+
+
+# the statistics of the model whose history is being shortened, set by `BaseHistoryPolicy.apply`
+_current_stats: ContextVar[Optional[HistoryStats]] = ContextVar("history_stats", default=None)
+
+
+class BaseHistoryPolicy(ABC):
+    """
+    Abstract base class for history policies.
+    A policy shortens the message history of a request before it reaches the team.
+    One policy can serve several models, its statistics are kept per model name.
+
+    Subclasses must implement `_apply`.
+
+    Args:
+        tokenizer (Tokenizer): Counts the tokens of a message text. Defaults to `approx_token_count`.
+    """
+    def __init__(self, tokenizer: Tokenizer = approx_token_count) -> None:
+        self._tokenizer = tokenizer
+        self._stats: Dict[str, HistoryStats] = {}
+
+    def _new_stats(self) -> HistoryStats:
+        """
+        Build the statistics of a model, subclasses with more counters return a subclass of `HistoryStats`.
+        """
+        return HistoryStats()
+
+    def _model_stats(self, model_name: str) -> HistoryStats:
+        stats = self._stats.get(model_name)
+        if stats is None:
+            stats = self._stats[model_name] = self._new_stats()
+        return stats
+
+    def _current_stats(self) -> HistoryStats:
+        """
+        Get the statistics of the model whose history `_apply` is shortening.
+        """
+        return _current_stats.get() or self._model_stats("")
+
+    def count_tokens(self, messages: Sequence[ChatMessage]) -> int:
+        """
+        Count the tokens of the messages.
+
+        Args:
+            messages (Sequence[ChatMessage]): The messages to count.
+
+        Returns:
+            int: The number of tokens.
+        """
+        return sum(self._tokenizer(message.to_text()) for message in messages)
+
+    @abstractmethod
+    async def _apply(self, messages: List[ChatMessage]) -> List[ChatMessage]:
+        """
+        Shorten the message history.
+
+        Args:
+            messages (List[ChatMessage]): The messages of the request, oldest first.
+
+        Returns:
+            List[ChatMessage]: The messages passed on to the team, oldest first.
+        """
+        ...
+
+    async def apply(self, messages: Sequence[ChatMessage], model_name: str = "") -> List[ChatMessage]:
+        """
+        Shorten the message history and record how many tokens were saved.
+
+        Args:
+            messages (Sequence[ChatMessage]): The messages of the request, oldest first.
+            model_name (str): The model the history is sent to, the statistics are recorded under it.
+
+        Returns:
+            List[ChatMessage]: The messages passed on to the team, oldest first.
+        """
+        stats = self._model_stats(model_name)
+        token = _current_stats.set(stats)
+        try:
+            windowed = await self._apply(list(messages))
+        finally:
+            _current_stats.reset(token)
+        stats.requests += 1
+        stats.tokens_in += self.count_tokens(messages)
+        stats.tokens_out += self.count_tokens(windowed)
+        return windowed
+
+    def model_stats(self, model_name: str) -> Dict[str, int]:
+        """
+        Get the token statistics of the policy for one model.
+
+        Args:
+            model_name (str): The model name given to `apply`.
+
+        Returns:
+            Dict[str, int]: Number of requests, tokens received, tokens passed on and tokens saved.
+        """
+        stats = self._stats.get(model_name)
+        return (stats if stats is not None else self._new_stats()).as_dict()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the token statistics of the policy, summed over its models.
+
+        Returns:
+            Dict[str, int]: Number of requests, tokens received, tokens passed on and tokens saved.
+        """
+        totals = self._new_stats().as_dict()
+        for stats in self._stats.values():
+            for name, value in stats.as_dict().items():
+                totals[name] += value
+        return totals
+
+
+def split_system(messages: Sequence[ChatMessage]) -> tuple[List[ChatMessage], List[ChatMessage]]:
+    """
+    Split the messages into the system messages and the conversation.
+
+    Args:
+        messages (Sequence[ChatMessage]): The messages, oldest first.
+
+    Returns:
+        tuple[List[ChatMessage], List[ChatMessage]]: The system messages and the other messages, both in order.
+    """
+    system: List[ChatMessage] = []
+    conversation: List[ChatMessage] = []
+    for message in messages:
+        (system if message.source == "system" else conversation).append(message)
+    return system, conversation
@@ -0,0 +1,165 @@
+import hashlib
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, cast
+from autogen_agentchat.messages import ChatMessage, TextMessage
+from autogen_core.models import ChatCompletionClient, SystemMessage, UserMessage
+from autogen_oaiapi.history.base import BaseHistoryPolicy, HistoryStats, Tokenizer, approx_token_count, split_system
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SUMMARY_PROMPT = (
+    "Summarize the following conversation in a few sentences. "
+    "Keep every fact, decision and open question needed to continue it."
+)
+
+
+def prefix_hashes(messages: Sequence[ChatMessage]) -> List[str]:
+    """
+    Hash the sources and texts of every prefix of the messages in one pass.
+
+    Args:
+        messages (Sequence[ChatMessage]): The messages, oldest first.
+
+    Returns:
+        List[str]: The hex digests identifying the prefixes, the one at index i covers the first i + 1 messages.
+    """
+    digest = hashlib.sha256()
+    hashes: List[str] = []
+    for message in messages:
+        digest.update(message.source.encode("utf-8"))
+        digest.update(b"\x00")
+        digest.update(message.to_text().encode("utf-8"))
+        digest.update(b"\x01")
+        hashes.append(digest.copy().hexdigest())
+    return hashes
+
+
+@dataclass
+class SummaryStats(HistoryStats):
+    """
+    Token statistics of a summarizing policy for one model.
+
+    Args:
+        summary_tokens (int): Tokens used to write the summaries, subtracted from the saved tokens.
+        cache_hits (int): Number of histories whose summary was cached.
+        folds (int): Number of summaries folded from the cached summary of a shorter prefix.
+    """
+    summary_tokens: int = 0
+    cache_hits: int = 0
+    folds: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_in - self.tokens_out - self.summary_tokens
+
+
+class SummarizePolicy(BaseHistoryPolicy):
+    """
+    Keeps the system messages and the last N other messages, and replaces the older ones by a summary.
+    Summaries are cached by the hash of the summarized prefix. As a session goes on, its prefix grows by the
+    messages that aged out of the last N, and the summary of the longest cached prefix is folded together with
+    only those messages into the new one, so each turn summarizes a few messages instead of the whole history.
+    A failed summary falls back to dropping the older messages.
+    The tokens used to summarize are not counted in the usage of the request, they are subtracted from
+    `tokens_saved` in the statistics. The summary cache is shared by the models of the policy.
+
+    Args:
+        model_client (ChatCompletionClient): The client writing the summaries.
+        keep_last (int): The number of latest conversation messages kept verbatim.
+        tokenizer (Tokenizer): Counts the tokens for the statistics. Defaults to `approx_token_count`.
+        cache_size (int): The maximum number of cached summaries.
+        prompt (str): The instruction given to the summarizing model.
+    """
+    def __init__(
+        self,
+        model_client: ChatCompletionClient,
+        keep_last: int = 6,
+        tokenizer: Tokenizer = approx_token_count,
+        cache_size: int = 1024,
+        prompt: str = DEFAULT_SUMMARY_PROMPT,
+    ) -> None:
+        if keep_last < 1:
+            raise ValueError("keep_last must be at least 1")
+        super().__init__(tokenizer)
+        self._model_client = model_client
+        self._keep_last = keep_last
+        self._cache_size = cache_size
+        self._prompt = prompt
+        self._summaries: OrderedDict[str, str] = OrderedDict()
+
+    def _new_stats(self) -> SummaryStats:
+        return SummaryStats()
+
+    async def _summarize(self, messages: Sequence[ChatMessage], previous: str, stats: SummaryStats) -> str:
+        transcript = "\n".join(f"{message.source}: {message.to_text()}" for message in messages)
+        if previous:
+            transcript = f"Summary of the earlier conversation:\n{previous}\n\n{transcript}"
+        result = await self._model_client.create(
+            [SystemMessage(content=self._prompt), UserMessage(content=transcript, source="user")]
+        )
+        stats.summary_tokens += result.usage.prompt_tokens + result.usage.completion_tokens
+        return result.content if isinstance(result.content, str) else ""
+
+    def _cached(self, key: str) -> str | None:
+        summary = self._summaries.get(key)
+        if summary is not None:
+            self._summaries.move_to_end(key)
+        return summary
+
+    async def _apply(self, messages: List[ChatMessage]) -> List[ChatMessage]:
+        system, conversation = split_system(messages)
+        if len(conversation) <= self._keep_last:
+            return messages
+        older, recent = conversation[:-self._keep_last], conversation[-self._keep_last:]
+        stats = cast(SummaryStats, self._current_stats())
+        hashes = prefix_hashes(older)
+        key = hashes[-1]
+        summary = self._cached(key)
+        if summary is not None:
+            stats.cache_hits += 1
+        else:
+            # fold the summary of the longest cached prefix, usually the one of the previous turn
+            start, previous = 0, ""
+            for length in range(len(hashes) - 1, 0, -1):
+                cached = self._cached(hashes[length - 1])
+                if cached is not None:
+                    start, previous = length, cached
+                    stats.folds += 1
+                    break
+            try:
+                summary = await self._summarize(older[start:], previous, stats)
+            except Exception as e:
+                logger.warning("Failed to summarize history, dropping %s older messages: %s", len(older), e)
+                return system + recent
+            self._summaries[key] = summary
+            if len(self._summaries) > self._cache_size:
+                self._summaries.popitem(last=False)
+        if not summary:
+            return system + recent
+        return system + [TextMessage(content=f"Summary of the earlier conversation:\n{summary}", source="system")] + recent
+
+    def model_stats(self, model_name: str) -> Dict[str, int]:
+        """
+        Get the token statistics of the policy for one model.
+
+        Args:
+            model_name (str): The model name given to `apply`.
+
+        Returns:
+            Dict[str, int]: The token statistics, with the tokens used to summarize subtracted from the saved tokens,
+                the summary cache hits, the summaries folded from a cached one, and the number of cached summaries
+                of all the models of the policy.
+        """
+        return {**super().model_stats(model_name), "cached_summaries": len(self._summaries)}
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the token statistics of the policy, summed over its models.
+
+        Returns:
+            Dict[str, int]: The token statistics as in `model_stats`.
+        """
+        return {**super().stats, "cached_summaries": len(self._summaries)}
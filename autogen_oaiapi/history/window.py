@@ -0,0 +1,50 @@
+from typing import List
+from autogen_agentchat.messages import ChatMessage
+from autogen_oaiapi.history.base import BaseHistoryPolicy, Tokenizer, approx_token_count, split_system
+
+
+class LastNPolicy(BaseHistoryPolicy):
+    """
+    Keeps the system messages and the last N other messages.
+
+    Args:
+        last_n (int): The number of conversation messages to keep.
+        tokenizer (Tokenizer): Counts the tokens for the statistics. Defaults to `approx_token_count`.
+    """
+    def __init__(self, last_n: int, tokenizer: Tokenizer = approx_token_count) -> None:
+        if last_n < 1:
+            raise ValueError("last_n must be at least 1")
+        super().__init__(tokenizer)
+        self._last_n = last_n
+
+    async def _apply(self, messages: List[ChatMessage]) -> List[ChatMessage]:
+        system, conversation = split_system(messages)
+        return system + conversation[-self._last_n:]
+
+
+class TokenBudgetPolicy(BaseHistoryPolicy):
+    """
+    Keeps the system messages and as many of the latest other messages as fit in a token budget.
+    The last message is always kept, even when it alone is over the budget.
+
+    Args:
+        max_tokens (int): The token budget of the history, system messages included.
+        tokenizer (Tokenizer): Counts the tokens of a message. Defaults to `approx_token_count`.
+    """
+    def __init__(self, max_tokens: int, tokenizer: Tokenizer = approx_token_count) -> None:
+        if max_tokens < 1:
+            raise ValueError("max_tokens must be at least 1")
+        super().__init__(tokenizer)
+        self._max_tokens = max_tokens
+
+    async def _apply(self, messages: List[ChatMessage]) -> List[ChatMessage]:
+        system, conversation = split_system(messages)
+        budget = self._max_tokens - self.count_tokens(system)
+        start = len(conversation)
+        while start > 0:
+            tokens = self._tokenizer(conversation[start - 1].to_text())
+            if tokens > budget and start < len(conversation):
+                break
+            budget -= tokens
+            start -= 1
+        return system + conversation[start:]
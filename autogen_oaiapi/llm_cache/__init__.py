@@ -0,0 +1,13 @@
+from .base import BaseLLMCacheStore, CacheStats
+from .memory import InMemoryLLMCacheStore
+from .disk import DiskLLMCacheStore
+from .client import LLMCache, CachedChatCompletionClient
+
+__all__ = [
+    "BaseLLMCacheStore",
+    "CacheStats",
+    "InMemoryLLMCacheStore",
+    "DiskLLMCacheStore",
+    "LLMCache",
+    "CachedChatCompletionClient",
+]
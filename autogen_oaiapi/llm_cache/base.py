@@ -0,0 +1,58 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Optional
+from autogen_core.models import CreateResult
+
+
+@dataclass
+class CacheStats:
+    """
+    Cache statistics of the model client of one agent.
+
+    Args:
+        hits (int): Number of calls answered from the cache.
+        misses (int): Number of cacheable calls sent to the model.
+        skipped (int): Number of calls sent to the model without looking up the cache, e.g. at a temperature above 0.
+        errors (int): Number of failed reads and writes of the store, the calls then went on without the cache.
+    """
+    hits: int = 0
+    misses: int = 0
+    skipped: int = 0
+    errors: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class BaseLLMCacheStore(ABC):
+    """
+    Abstract base class for the stores of cached model client results.
+
+    Subclasses must implement the get and set methods.
+    """
+    @abstractmethod
+    async def get(self, key: str) -> Optional[CreateResult]:
+        """
+        Get a cached result.
+
+        Args:
+            key (str): The hash of the request.
+
+        Returns:
+            Optional[CreateResult]: The cached result, None if it is missing or expired.
+        """
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, result: CreateResult, ttl_seconds: Optional[float] = None) -> None:
+        """
+        Cache a result.
+
+        Args:
+            key (str): The hash of the request.
+            result (CreateResult): The result of the model.
+            ttl_seconds (Optional[float]): The time the result stays valid. Results do not expire when None.
+        """
+        ...
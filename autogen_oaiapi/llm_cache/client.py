@@ -0,0 +1,225 @@
+import hashlib
+import json
+import logging
+from typing import Any, AsyncGenerator, Dict, Mapping, Optional, Sequence, Union
+from autogen_agentchat.agents import BaseChatAgent
+from autogen_agentchat.teams import BaseGroupChat
+from autogen_core import CancellationToken
+from autogen_core.models import ChatCompletionClient, CreateResult, LLMMessage, RequestUsage
+from autogen_core.tools import Tool, ToolSchema
+from pydantic import BaseModel
+from ..base import DelegatingChatCompletionClient, iter_model_client_owners
+from .base import BaseLLMCacheStore, CacheStats
+from .memory import InMemoryLLMCacheStore
+
+logger = logging.getLogger(__name__)
+
+
+def _json_output_key(json_output: Optional[bool | type[BaseModel]]) -> Any:
+    if isinstance(json_output, type) and issubclass(json_output, BaseModel):
+        return json_output.model_json_schema()
+    return json_output
+
+
+class CachedChatCompletionClient(DelegatingChatCompletionClient):
+    """
+    Model client answering repeated `create` and `create_stream` calls from an `LLMCache`.
+    The request is hashed with the component dump of the wrapped client, so clients of different models
+    or create arguments never share results. Cached results are returned with `cached=True` and no usage.
+    Everything else, including `dump_component`, is delegated to the wrapped client.
+
+    Args:
+        client (ChatCompletionClient): The wrapped model client.
+        cache (LLMCache): The cache policy and store.
+        stats (CacheStats): The statistics of the agent using the client.
+    """
+    def __init__(self, client: ChatCompletionClient, cache: "LLMCache", stats: CacheStats) -> None:
+        super().__init__(client)
+        self._cache = cache
+        self._stats = stats
+        try:
+            component = client.dump_component()
+            config: Mapping[str, Any] = component.config
+            self._client_key = json.dumps(component.model_dump(mode="json"), sort_keys=True, default=str)
+        except Exception:
+            # not a serializable component, the class and model info still tell models apart
+            config = {}
+            self._client_key = f"{type(client).__module__}.{type(client).__qualname__}:{json.dumps(client.model_info, sort_keys=True, default=str)}"
+        self._temperature = config.get("temperature")
+
+    def _key(
+        self,
+        messages: Sequence[LLMMessage],
+        tools: Sequence[Tool | ToolSchema],
+        json_output: Optional[bool | type[BaseModel]],
+        extra_create_args: Mapping[str, Any],
+    ) -> Optional[str]:
+        """
+        Hash a request, None if it must not be cached.
+        """
+        temperature = extra_create_args.get("temperature", self._temperature)
+        if self._cache.temperature_zero_only and temperature != 0:
+            return None
+        try:
+            request = json.dumps(
+                {
+                    "client": self._client_key,
+                    "messages": [message.model_dump(mode="json") for message in messages],
+                    "tools": [tool.schema if isinstance(tool, Tool) else tool for tool in tools],
+                    "json_output": _json_output_key(json_output),
+                    "extra_create_args": dict(extra_create_args),
+                },
+                sort_keys=True,
+                default=str,
+            )
+        except Exception as e:
+            logger.debug("Request can not be hashed, it is not cached: %s", e)
+            return None
+        return hashlib.sha256(request.encode()).hexdigest()
+
+    async def _lookup(self, key: Optional[str]) -> Optional[CreateResult]:
+        if key is None:
+            self._stats.skipped += 1
+            return None
+        try:
+            result = await self._cache.store.get(key)
+        except Exception as e:
+            # a broken cache must not fail the call, it goes to the model instead
+            self._stats.errors += 1
+            logger.warning("LLM cache lookup failed, calling the model: %s", e)
+            return None
+        if result is None:
+            self._stats.misses += 1
+            return None
+        self._stats.hits += 1
+        return result.model_copy(update={"cached": True, "usage": RequestUsage(prompt_tokens=0, completion_tokens=0)})
+
+    async def _save(self, key: str, result: CreateResult) -> None:
+        try:
+            await self._cache.store.set(key, result, self._cache.ttl_seconds)
+        except Exception as e:
+            # the result of the model is still returned, it is only not cached
+            self._stats.errors += 1
+            logger.warning("LLM cache write failed: %s", e)
+
+    async def create(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = [],
+        json_output: Optional[bool | type[BaseModel]] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> CreateResult:
+        key = self._key(messages, tools, json_output, extra_create_args)
+        cached = await self._lookup(key)
+        if cached is not None:
+            return cached
+        result = await self._client.create(
+            messages,
+            tools=tools,
+            json_output=json_output,
+            extra_create_args=extra_create_args,
+            cancellation_token=cancellation_token,
+        )
+        if key is not None:
+            await self._save(key, result)
+        return result
+
+    async def create_stream(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = [],
+        json_output: Optional[bool | type[BaseModel]] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> AsyncGenerator[Union[str, CreateResult], None]:
+        key = self._key(messages, tools, json_output, extra_create_args)
+        cached = await self._lookup(key)
+        if cached is not None:
+            if isinstance(cached.content, str):
+                # one chunk, the agents show it like a streamed reply
+                yield cached.content
+            yield cached
+            return
+        async for chunk in self._client.create_stream(
+            messages,
+            tools=tools,
+            json_output=json_output,
+            extra_create_args=extra_create_args,
+            cancellation_token=cancellation_token,
+        ):
+            if key is not None and isinstance(chunk, CreateResult):
+                await self._save(key, chunk)
+            yield chunk
+
+
+class LLMCache:
+    """
+    Opt-in cache of the model client calls made inside the registered actors.
+
+    Teams often repeat identical sub-calls even when the requests differ, e.g. the same system prompt and first
+    user turn sent to the first agent, or the speaker selection of a `SelectorGroupChat`. When an actor is loaded,
+    the model client of every agent and of the selector is wrapped in a `CachedChatCompletionClient`, and
+    `create` results are cached by a hash of the request.
+    By default only calls at temperature 0, set on the client or in the create arguments, are cached,
+    since other calls are not expected to repeat their answer.
+
+    Args:
+        store (Optional[BaseLLMCacheStore]): The store of the cached results. Defaults to an in-memory store.
+        ttl_seconds (Optional[float]): The time a cached result stays valid. Results do not expire when None.
+        temperature_zero_only (bool): Only cache calls at temperature 0. Defaults to True.
+    """
+    def __init__(
+        self,
+        store: Optional[BaseLLMCacheStore] = None,
+        ttl_seconds: Optional[float] = None,
+        temperature_zero_only: bool = True,
+    ) -> None:
+        self.store = store or InMemoryLLMCacheStore()
+        self.ttl_seconds = ttl_seconds
+        self.temperature_zero_only = temperature_zero_only
+        self._stats: Dict[str, CacheStats] = {}
+
+    def _agent_stats(self, model_name: str, agent_name: str) -> CacheStats:
+        key = f"{model_name}/{agent_name}"
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = CacheStats()
+        return stats
+
+    def _wrap(self, client: Any, model_name: str, agent_name: str) -> Any:
+        if not isinstance(client, ChatCompletionClient) or isinstance(client, CachedChatCompletionClient):
+            return client
+        return CachedChatCompletionClient(client, self, self._agent_stats(model_name, agent_name))
+
+    def instrument(self, actor: BaseGroupChat | BaseChatAgent, model_name: str) -> None:
+        """
+        Wrap the model clients of a freshly loaded actor.
+
+        Args:
+            actor (BaseGroupChat | BaseChatAgent): The loaded team or agent.
+            model_name (str): The registered model name of the actor.
+        """
+        for owner, agent_name in iter_model_client_owners(actor):
+            owner._model_client = self._wrap(owner._model_client, model_name, agent_name)
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the cache statistics.
+
+        Returns:
+            Dict[str, Any]: The hits, misses, skipped calls, store errors and hit rate per "<model>/<agent>".
+        """
+        return {
+            name: {
+                "hits": stats.hits,
+                "misses": stats.misses,
+                "skipped": stats.skipped,
+                "errors": stats.errors,
+                "hit_rate": stats.hit_rate,
+            }
+            for name, stats in self._stats.items()
+        }
@@ -0,0 +1,95 @@
+import asyncio
+import itertools
+import os
+import pickle
+import tempfile
+import time
+from typing import Optional
+from autogen_core.models import CreateResult
+from .base import BaseLLMCacheStore
+
+
+class DiskLLMCacheStore(BaseLLMCacheStore):
+    """
+    Store of cached model client results as files in a directory, shared by the processes using the directory.
+    Files are read and written in a thread. Expired results are removed when they are read.
+    Every `sweep_every` writes, the least recently used results beyond `max_entries` are removed.
+
+    Args:
+        dir_path (str): The directory of the cached results.
+        max_entries (Optional[int]): The number of results kept in the directory. The directory is not bounded when None.
+        sweep_every (int): The number of writes between two sweeps of the directory.
+    """
+    def __init__(self, dir_path: str = "llm_cache", max_entries: Optional[int] = 10000, sweep_every: int = 100) -> None:
+        if sweep_every < 1:
+            raise ValueError("sweep_every must be at least 1")
+        os.makedirs(dir_path, exist_ok=True)
+        self.dir_path = dir_path
+        self._max_entries = max_entries
+        self._sweep_every = sweep_every
+        self._writes = itertools.count(1)
+
+    def _file_path(self, key: str) -> str:
+        # keys are hex digests, safe as file names
+        return os.path.join(self.dir_path, f"{key}.result")
+
+    def _read(self, key: str) -> Optional[CreateResult]:
+        path = self._file_path(key)
+        try:
+            with open(path, "rb") as f:
+                expires_at, result = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        if expires_at is not None and expires_at <= time.time():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            return None
+        try:
+            # the modification time orders the sweep, a hit keeps the result
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return result  # type: ignore[no-any-return]
+
+    def _write(self, key: str, result: CreateResult, ttl_seconds: Optional[float]) -> None:
+        # a file of its own, concurrent writes of the same key must not share it
+        fd, tmp_path = tempfile.mkstemp(dir=self.dir_path, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump((time.time() + ttl_seconds if ttl_seconds is not None else None, result), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._file_path(key))
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        if self._max_entries is not None and next(self._writes) % self._sweep_every == 0:
+            self._sweep(self._max_entries)
+
+    def _sweep(self, max_entries: int) -> None:
+        files = []
+        with os.scandir(self.dir_path) as entries:
+            for entry in entries:
+                if not entry.name.endswith(".result"):
+                    continue
+                try:
+                    files.append((entry.stat().st_mtime, entry.path))
+                except FileNotFoundError:
+                    pass
+        if len(files) <= max_entries:
+            return
+        files.sort()
+        for _, path in files[:len(files) - max_entries]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    async def get(self, key: str) -> Optional[CreateResult]:
+        return await asyncio.to_thread(self._read, key)
+
+    async def set(self, key: str, result: CreateResult, ttl_seconds: Optional[float] = None) -> None:
+        await asyncio.to_thread(self._write, key, result, ttl_seconds)
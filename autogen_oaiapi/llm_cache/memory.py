@@ -0,0 +1,38 @@
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+from autogen_core.models import CreateResult
+from .base import BaseLLMCacheStore
+
+
+class InMemoryLLMCacheStore(BaseLLMCacheStore):
+    """
+    In-memory store of cached model client results, dropping the least recently used ones beyond `max_entries`.
+
+    Args:
+        max_entries (int): The number of results kept.
+    """
+    def __init__(self, max_entries: int = 10000) -> None:
+        self._max_entries = max_entries
+        # key -> (result, expiry time on the monotonic clock or None)
+        self._entries: "OrderedDict[str, Tuple[CreateResult, Optional[float]]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[CreateResult]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        result, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return result
+
+    async def set(self, key: str, result: CreateResult, ttl_seconds: Optional[float] = None) -> None:
+        self._entries[key] = (result, time.monotonic() + ttl_seconds if ttl_seconds is not None else None)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
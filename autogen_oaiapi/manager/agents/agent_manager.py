@@ -20,7 +20,7 @@ class AgentManager:
         
         # Create agents directory if it doesn't exist
         self.agents_dir.mkdir(parents=True, exist_ok=True)
-        logger.info(f"Initialized AgentManager with agents directory: {self.agents_dir}")
+        logger.info("Initialized AgentManager with agents directory: %s", self.agents_dir)
     
     def _validate_agent_data(self, agent_data: Dict[str, Any], file_path: Path) -> bool:
         """Validate that the agent data contains all required fields."""
@@ -28,7 +28,7 @@ class AgentManager:
         missing_fields = [field for field in required_fields if field not in agent_data]
         
         if missing_fields:
-            logger.error(f"Agent file {file_path} is missing required fields: {missing_fields}")
+            logger.error("Agent file %s is missing required fields: %s", file_path, missing_fields)
             return False
         
         return True
@@ -37,13 +37,13 @@ class AgentManager:
         """Load all JSON files from the agents directory and initialize team configurations."""
         self.agents.clear()
         
-        logger.info(f"Searching for JSON files in: {self.agents_dir}")
+        logger.info("Searching for JSON files in: %s", self.agents_dir)
         json_files = list(self.agents_dir.rglob("*.json"))
-        logger.info(f"Found {len(json_files)} JSON files")
+        logger.info("Found %s JSON files", len(json_files))
         
         for json_file in json_files:
             try:
-                logger.info(f"Processing JSON file: {json_file}")
+                logger.info("Processing JSON file: %s", json_file)
                 with open(json_file, 'r', encoding='utf-8') as f:
                     agent_data = json.load(f)
                 
@@ -55,15 +55,15 @@ class AgentManager:
                     'team_config': agent_data,
                     'file_path': str(json_file)
                 }
-                logger.info(f"Stored team configuration for: {json_file.stem}")
+                logger.info("Stored team configuration for: %s", json_file.stem)
                 
             except json.JSONDecodeError as e:
-                logger.error(f"Invalid JSON file {json_file}: {str(e)}")
+                logger.error("Invalid JSON file %s: %s", json_file, e)
             except Exception as e:
-                logger.error(f"Error loading {json_file}: {str(e)}")
+                logger.error("Error loading %s: %s", json_file, e)
         
-        logger.info(f"Finished loading agents. Total agents loaded: {len(self.agents)}")
-        logger.info(f"Available agents: {list(self.agents.keys())}")
+        logger.info("Finished loading agents. Total agents loaded: %s", len(self.agents))
+        logger.info("Available agents: %s", list(self.agents.keys()))
         
         if not self.agents:
             logger.warning("No agents were loaded successfully!")
@@ -1,10 +1,13 @@
 from ._json_key_manager import JsonKeyManager
 from ._memory_key_manager import MemoryKeyManager
 from ._non_key_manager import NonKeyManager
+from ._sqlite_key_manager import SqliteKeyManager, SqliteAPIKeyStore
 
 
 __all__ = [
     "JsonKeyManager",
     "MemoryKeyManager",
     "NonKeyManager",
-]
\ No newline at end of file
+    "SqliteKeyManager",
+    "SqliteAPIKeyStore",
+]
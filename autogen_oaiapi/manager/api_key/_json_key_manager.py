@@ -1,21 +1,143 @@
+import asyncio
+import logging
+import os
+import secrets
+import time
+from typing import Any, Dict
 from pydantic import TypeAdapter
 from ...base import BaseKeyManager, APIKeyStore, DefaultAPIKeyStore
 
+logger = logging.getLogger(__name__)
+
+
 class JsonKeyManager(BaseKeyManager):
     """
     JsonKeyManager is a key manager that loads API keys from a JSON file.
     It is used to manage API keys and their associated models.
+    Each entry holds either a plaintext `api_key` or an `api_key_hash` made with the same pepper.
+
+    When `watch_interval` is set, the file is polled for changes once the server starts.
+    A changed file is parsed in a worker thread and swapped in as a new key store snapshot,
+    so requests never see a half-loaded file. An invalid file keeps the previous snapshot.
+    Keys added at runtime with `set_api_key` or `set_allow_model` are lost on the next reload.
     """
-    def __init__(self, json_path: str) -> None:
+    def __init__(
+        self,
+        json_path: str,
+        pepper: str | None = None,
+        cache_size: int = 1024,
+        watch_interval: float | None = None,
+    ) -> None:
         """
         Initialize the JsonKeyManager with a path to a JSON file.
         Args:
             json_path (str): The path to the JSON file containing API keys.
+            pepper (str | None): The secret used to hash the API keys. Required when the file contains `api_key_hash` entries.
+            cache_size (int): The maximum number of verified API keys kept in the LRU cache.
+            watch_interval (float | None): Seconds between checks of the file modification time. Disabled when None.
+        Raises:
+            ValueError: If the file contains hashed keys but no pepper is given.
+        """
+        self._json_path = json_path
+        self._has_pepper = pepper is not None
+        self._pepper: bytes = pepper.encode("utf-8") if pepper is not None else secrets.token_bytes(32)
+        self._watch_interval = watch_interval
+        self._watch_task: asyncio.Task[None] | None = None
+        self._mtime_ns = os.stat(json_path).st_mtime_ns
+        self._reload_count = 0
+        self._reload_failures = 0
+        self._last_reload_seconds: float | None = None
+        self._last_reload_error: str | None = None
+        super().__init__(key_store=self._load(), cache_size=cache_size)
+
+    def _load(self) -> DefaultAPIKeyStore:
+        """
+        Parse the JSON file into a new key store. This is blocking and runs off the event loop on reloads.
+        Returns:
+            DefaultAPIKeyStore: A fully populated key store.
+        Raises:
+            OSError: If the file can not be read.
+            ValueError: If the file is invalid or contains hashed keys but no pepper is given.
         """
-        api_key_store = DefaultAPIKeyStore()
-        super().__init__(key_store=api_key_store)
-        with open(json_path, "r") as json_file:
+        with open(self._json_path, "r") as json_file:
             key_store = TypeAdapter(APIKeyStore).validate_json(
                 json_file.read(), strict=True
             )
+        if not self._has_pepper and any(entry.api_key is None for entry in key_store.keys.values()):
+            raise ValueError("pepper is required to load hashed API keys")
+        api_key_store = DefaultAPIKeyStore(pepper=self._pepper)
         api_key_store.set_api_key_entry_batch(key_store.keys)
+        return api_key_store
+
+    async def reload(self) -> bool:
+        """
+        Reload the JSON file and atomically swap in the new key store.
+        Returns:
+            bool: True if the new snapshot is active, False if the previous one was kept.
+        """
+        start_time = time.perf_counter()
+        try:
+            key_store = await asyncio.to_thread(self._load)
+        except (OSError, ValueError) as e:
+            self._reload_failures += 1
+            self._last_reload_error = str(e)
+            logger.error("Failed to reload API keys from %s, keeping previous keys: %s", self._json_path, e)
+            return False
+
+        # the swap and the cache drop happen without yielding to the event loop
+        self._key_store = key_store
+        self.invalidate_cache()
+        self._reload_count += 1
+        self._last_reload_seconds = time.perf_counter() - start_time
+        self._last_reload_error = None
+        logger.info("Reloaded API keys from %s (%.4fs)", self._json_path, self._last_reload_seconds)
+        return True
+
+    async def _watch(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                mtime_ns = os.stat(self._json_path).st_mtime_ns
+            except OSError as e:
+                logger.warning("Can not stat API key file %s: %s", self._json_path, e)
+                continue
+            if mtime_ns != self._mtime_ns:
+                # a broken file is only retried once it changes again
+                self._mtime_ns = mtime_ns
+                await self.reload()
+
+    async def start(self) -> None:
+        """
+        Start watching the JSON file for changes if `watch_interval` is set.
+        """
+        await super().start()
+        if self._watch_interval is not None and self._watch_task is None:
+            self._watch_task = asyncio.create_task(self._watch(self._watch_interval))
+
+    async def stop(self) -> None:
+        """
+        Stop watching the JSON file.
+        """
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except asyncio.CancelledError:
+                pass
+            self._watch_task = None
+        await super().stop()
+
+    @property
+    def reload_stats(self) -> Dict[str, Any]:
+        """
+        Get the reload statistics.
+
+        Returns:
+            Dict[str, Any]: Number of reloads and failures, the last reload latency and the last error.
+        """
+        return {
+            "reload_count": self._reload_count,
+            "reload_failures": self._reload_failures,
+            "last_reload_seconds": self._last_reload_seconds,
+            "last_reload_error": self._last_reload_error,
+        }
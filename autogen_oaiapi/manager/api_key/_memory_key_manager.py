@@ -7,9 +7,12 @@ class MemoryKeyManager(BaseKeyManager):
     MemoryKeyManager is a key manager that stores API keys in memory.
     It is used to manage API keys and their associated models.
     """
-    def __init__(self) -> None:
+    def __init__(self, pepper: str | None = None, cache_size: int = 1024) -> None:
         """
         Initialize the MemoryKeyManager with a default API key store.
+        Args:
+            pepper (str | None): The secret used to hash the API keys. A random one is used when omitted.
+            cache_size (int): The maximum number of verified API keys kept in the LRU cache.
         """
-        key_store = DefaultAPIKeyStore()
-        super().__init__(key_store=key_store)
+        key_store = DefaultAPIKeyStore(pepper=pepper)
+        super().__init__(key_store=key_store, cache_size=cache_size)
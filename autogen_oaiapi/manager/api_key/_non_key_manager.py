@@ -1,6 +1,10 @@
-from ...base import BaseKeyManager
+from typing import FrozenSet, Optional
+from ...base import BaseKeyManager, VerifiedKey
 from ...base.types import TOTAL_MODELS_NAME
 
+_ALL_MODELS: FrozenSet[str] = frozenset([TOTAL_MODELS_NAME])
+_ANONYMOUS_KEY = VerifiedKey(key_name="anonymous", allowed_models=_ALL_MODELS)
+
 
 class NonKeyManager(BaseKeyManager):
     """
@@ -10,15 +14,51 @@ class NonKeyManager(BaseKeyManager):
     def __init__(self) -> None:
         pass
 
-    def get_allow_models(self, api_key: str) -> list[str]:
+    def get_verified_key(self, api_key: str) -> Optional[VerifiedKey]:
+        """
+        Verify the given API key. Every key is accepted as the anonymous key.
+        Args:
+            api_key (str): The API key to look up. BUt this is not used in NonKeyManager.
+        Returns:
+            Optional[VerifiedKey]: The anonymous key allowed to use every model.
+        """
+        return _ANONYMOUS_KEY
+
+    async def aget_verified_key(self, api_key: str) -> Optional[VerifiedKey]:
         """
-        Get the list of allowed models for the given API key.
+        Verify the given API key. Every key is accepted as the anonymous key.
         Args:
             api_key (str): The API key to look up. BUt this is not used in NonKeyManager.
         Returns:
-            list[str]: A list of allowed models for the API key.
+            Optional[VerifiedKey]: The anonymous key allowed to use every model.
+        """
+        return _ANONYMOUS_KEY
+
+    def get_allow_models(self, api_key: str) -> FrozenSet[str]:
         """
-        return [TOTAL_MODELS_NAME]
+        Get the set of allowed models for the given API key.
+        Args:
+            api_key (str): The API key to look up. BUt this is not used in NonKeyManager.
+        Returns:
+            FrozenSet[str]: The allowed models for the API key.
+        """
+        return _ALL_MODELS
+
+    async def aget_allow_models(self, api_key: str) -> FrozenSet[str]:
+        """
+        Get the set of allowed models for the given API key.
+        Args:
+            api_key (str): The API key to look up. BUt this is not used in NonKeyManager.
+        Returns:
+            FrozenSet[str]: The allowed models for the API key.
+        """
+        return _ALL_MODELS
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
 
     def set_allow_model(self, key_name: str, model: str) -> bool:
         """
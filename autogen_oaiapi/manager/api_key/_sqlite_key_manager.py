@@ -0,0 +1,359 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Literal, Optional, cast
+from ...base import BaseKeyManager, BaseAPIKeyStore, APIKeyEntry
+from ...base.utils import hash_key
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS api_keys (
+    key_name TEXT PRIMARY KEY,
+    api_key_hash TEXT NOT NULL,
+    allowed_models TEXT NOT NULL,
+    is_active INTEGER NOT NULL DEFAULT 1,
+    description TEXT,
+    weight REAL NOT NULL DEFAULT 1.0,
+    priority TEXT NOT NULL DEFAULT 'interactive'
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_api_keys_hash ON api_keys (api_key_hash);
+"""
+
+# columns added after the first release, created on databases made by older versions
+_MIGRATIONS = {
+    "weight": "ALTER TABLE api_keys ADD COLUMN weight REAL NOT NULL DEFAULT 1.0",
+    "priority": "ALTER TABLE api_keys ADD COLUMN priority TEXT NOT NULL DEFAULT 'interactive'",
+}
+
+_COLUMNS = "key_name, api_key_hash, allowed_models, is_active, description, weight, priority"
+
+_UPSERT = f"""
+INSERT INTO api_keys ({_COLUMNS})
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (key_name) DO UPDATE SET
+    api_key_hash = excluded.api_key_hash,
+    allowed_models = excluded.allowed_models,
+    is_active = excluded.is_active,
+    description = excluded.description,
+    weight = excluded.weight,
+    priority = excluded.priority
+"""
+
+_Row = tuple[str, str, str, int, Optional[str], float, str]
+
+
+class SqliteAPIKeyStore(BaseAPIKeyStore):
+    """
+    SQLite implementation of the API key store.
+    Keys are stored as peppered SHA-256 hashes in a WAL mode database, so several workers can share one file.
+    Lookups by hash go through an in-memory LRU cache. The cache is dropped on local writes and,
+    while the server runs, whenever another connection commits to the database.
+    """
+    def __init__(
+        self,
+        db_path: str,
+        pepper: str,
+        cache_size: int = 4096,
+        poll_interval: float = 1.0,
+    ) -> None:
+        """
+        Initialize the SQLite API key store.
+        Args:
+            db_path (str): The path to the SQLite database file.
+            pepper (str): The secret mixed into every key hash. Must be the same for every worker sharing the database.
+            cache_size (int): The maximum number of key entries kept in the read-through cache.
+            poll_interval (float): Seconds between checks for writes made by other connections.
+        """
+        self._pepper = pepper.encode("utf-8")
+        self._cache_size = cache_size
+        self._poll_interval = poll_interval
+        self._cache: OrderedDict[str, APIKeyEntry] = OrderedDict()
+        self._poll_task: asyncio.Task[None] | None = None
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._migrate()
+        self._data_version = self._read_data_version()
+        self.generation = 0
+
+    def hash_api_key(self, api_key: str) -> str:
+        """
+        Hash an API key with the pepper of this store.
+        Args:
+            api_key (str): The plaintext API key.
+        Returns:
+            str: The hex digest stored for the API key.
+        """
+        return hash_key(api_key, self._pepper)
+
+    def _migrate(self) -> None:
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(api_keys)")}
+        for column, statement in _MIGRATIONS.items():
+            if column not in columns:
+                self._conn.execute(statement)
+
+    def _read_data_version(self) -> int:
+        with self._lock:
+            row = self._conn.execute("PRAGMA data_version").fetchone()
+        return int(row[0])
+
+    def _invalidate(self) -> None:
+        self._cache.clear()
+        self.generation += 1
+
+    @staticmethod
+    def _row_to_entry(row: _Row) -> APIKeyEntry:
+        key_name, api_key_hash, allowed_models, is_active, description, weight, priority = row
+        return APIKeyEntry(
+            key_name=key_name,
+            api_key_hash=api_key_hash,
+            allowed_models=json.loads(allowed_models),
+            is_active=bool(is_active),
+            description=description,
+            weight=weight,
+            # a text column, APIKeyEntry rejects values other than the priority classes
+            priority=cast(Literal["interactive", "batch"], priority),
+        )
+
+    def _select_by_hash(self, api_key_hash: str) -> Optional[APIKeyEntry]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM api_keys WHERE api_key_hash = ?",
+                (api_key_hash,),
+            ).fetchone()
+        return self._row_to_entry(row) if row else None
+
+    def _cache_entry(self, api_key_hash: str, key_entry: Optional[APIKeyEntry]) -> Optional[APIKeyEntry]:
+        if key_entry is not None:
+            self._cache[api_key_hash] = key_entry
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return key_entry
+
+    def _get_cached_entry(self, api_key_hash: str) -> Optional[APIKeyEntry]:
+        key_entry = self._cache.get(api_key_hash)
+        if key_entry is not None:
+            self._cache.move_to_end(api_key_hash)
+        return key_entry
+
+    def get_api_key_entry(self, api_key: str) -> Optional[APIKeyEntry]:
+        """
+        Get the API key entry for a given API key.
+        Args:
+            api_key (str): The API key to look up.
+        Returns:
+            Optional[APIKeyEntry]: The API key entry if found, None otherwise.
+        """
+        api_key_hash = self.hash_api_key(api_key)
+        key_entry = self._get_cached_entry(api_key_hash)
+        if key_entry is not None:
+            return key_entry
+        return self._cache_entry(api_key_hash, self._select_by_hash(api_key_hash))
+
+    async def aget_api_key_entry(self, api_key: str) -> Optional[APIKeyEntry]:
+        """
+        Get the API key entry for a given API key, reading the database in a worker thread on a cache miss.
+        Args:
+            api_key (str): The API key to look up.
+        Returns:
+            Optional[APIKeyEntry]: The API key entry if found, None otherwise.
+        """
+        api_key_hash = self.hash_api_key(api_key)
+        key_entry = self._get_cached_entry(api_key_hash)
+        if key_entry is not None:
+            return key_entry
+        generation = self.generation
+        key_entry = await asyncio.to_thread(self._select_by_hash, api_key_hash)
+        if generation != self.generation:
+            # the store changed while reading, do not cache a possibly stale entry
+            return key_entry
+        return self._cache_entry(api_key_hash, key_entry)
+
+    def _upsert(self, rows: List[_Row]) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(_UPSERT, rows)
+            except sqlite3.Error:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        self._invalidate()
+
+    def _entry_to_row(self, key_name: str, key_entry: APIKeyEntry) -> _Row:
+        api_key_hash = self.hash_api_key(key_entry.api_key) if key_entry.api_key is not None else key_entry.api_key_hash
+        return (
+            key_name,
+            api_key_hash or "",
+            json.dumps(key_entry.allowed_models),
+            int(key_entry.is_active),
+            key_entry.description,
+            key_entry.weight,
+            key_entry.priority,
+        )
+
+    def set_api_key_entry_batch(self, key_entries: Dict[str, APIKeyEntry]) -> None:
+        """
+        Set multiple API key entries in the store within one transaction.
+        Args:
+            key_entries (Dict[str, APIKeyEntry]): A dictionary of API key entries.
+        """
+        self._upsert([self._entry_to_row(key_name, entry) for key_name, entry in key_entries.items()])
+
+    def set_api_key_entry(self, key_name: str, key_entry: APIKeyEntry) -> None:
+        """
+        Set a single API key entry in the store.
+        Args:
+            key_name (str): The name of the API key.
+            key_entry (APIKeyEntry): The API key entry to set.
+        """
+        self._upsert([self._entry_to_row(key_name, key_entry)])
+
+    def set_api_key(self, key_name: str, api_key: str, description: str|None=None) -> APIKeyEntry:
+        """
+        Set a new API key.
+        Args:
+            key_name (str): The name of the API key.
+            api_key (str): The API key to set.
+            description (str|None): An optional description for the API key.
+        Returns:
+            APIKeyEntry: The created API key entry.
+        """
+        entry = APIKeyEntry(
+            key_name=key_name,
+            api_key_hash=self.hash_api_key(api_key),
+            allowed_models=[],
+            description=description,
+        )
+        self.set_api_key_entry(key_name, entry)
+        return entry
+
+    def set_model_to_api_key(self, key_name: str, model: str) -> bool:
+        """
+        Set the list of allowed models for an API key.
+        Args:
+            key_name (str): The name of the API key.
+            model (str): The model to allow for this API key.
+        Returns:
+            bool: True if the model was added, False if it was already present.
+        """
+        with self._lock:
+            # read and write under one write lock, so concurrent workers can not drop each other's models
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT allowed_models FROM api_keys WHERE key_name = ?", (key_name,)
+                ).fetchone()
+                allowed_models: List[str] = json.loads(row[0]) if row else []
+                added = row is not None and model not in allowed_models
+                if added:
+                    self._conn.execute(
+                        "UPDATE api_keys SET allowed_models = ? WHERE key_name = ?",
+                        (json.dumps(allowed_models + [model]), key_name),
+                    )
+            except sqlite3.Error:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        if added:
+            self._invalidate()
+        return added
+
+    def set_api_key_active_status(self, key_name: str, is_active: bool) -> None:
+        """
+        Set the active status of an API key.
+        Args:
+            key_name (str): The name of the API key.
+            is_active (bool): The active status to set.
+        """
+        with self._lock:
+            self._conn.execute("UPDATE api_keys SET is_active = ? WHERE key_name = ?", (int(is_active), key_name))
+        self._invalidate()
+
+    def get_all_api_key_entries(self) -> List[tuple[str,APIKeyEntry]]:
+        """
+        Get all API key entries.
+        Returns:
+            List[tuple[str,APIKeyEntry]]: A list of tuples containing the key name and API key entry.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM api_keys"
+            ).fetchall()
+        return [(row[0], self._row_to_entry(row)) for row in rows]
+
+    async def _poll(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                data_version = await asyncio.to_thread(self._read_data_version)
+            except sqlite3.Error as e:
+                logger.warning("Can not poll API key database: %s", e)
+                continue
+            if data_version != self._data_version:
+                self._data_version = data_version
+                self._invalidate()
+                logger.info("API key database changed by another connection, cache invalidated")
+
+    async def start(self) -> None:
+        """
+        Start polling the database for writes made by other connections.
+        """
+        if self._poll_task is None:
+            self._poll_task = asyncio.create_task(self._poll(self._poll_interval))
+
+    async def stop(self) -> None:
+        """
+        Stop polling the database.
+        """
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            try:
+                await self._poll_task
+            except asyncio.CancelledError:
+                pass
+            self._poll_task = None
+
+    def close(self) -> None:
+        """
+        Close the database connection.
+        """
+        with self._lock:
+            self._conn.close()
+
+
+class SqliteKeyManager(BaseKeyManager):
+    """
+    SqliteKeyManager is a key manager that persists API keys in a SQLite database.
+    Keys set at runtime are shared with every worker using the same database file.
+    """
+    def __init__(
+        self,
+        db_path: str,
+        pepper: str,
+        cache_size: int = 1024,
+        store_cache_size: int = 4096,
+        poll_interval: float = 1.0,
+    ) -> None:
+        """
+        Initialize the SqliteKeyManager with a path to a SQLite database.
+        Args:
+            db_path (str): The path to the SQLite database file, created if missing.
+            pepper (str): The secret used to hash the API keys.
+            cache_size (int): The maximum number of verified API keys kept in the LRU cache.
+            store_cache_size (int): The maximum number of key entries kept in the store read-through cache.
+            poll_interval (float): Seconds between checks for writes made by other workers.
+        """
+        key_store = SqliteAPIKeyStore(
+            db_path=db_path,
+            pepper=pepper,
+            cache_size=store_cache_size,
+            poll_interval=poll_interval,
+        )
+        super().__init__(key_store=key_store, cache_size=cache_size)
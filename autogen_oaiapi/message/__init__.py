@@ -1,8 +1,23 @@
 from .response_builder import (
-    return_last_message
+    return_last_message,
+    select_message_content,
+    clean_message,
 )
+from .message_cleaner import (
+    MessageCleaner,
+    StreamingMessageCleaner,
+    get_message_cleaner,
+)
+from .stream_buffer import StreamBuffer, BufferPolicy
 
 
 __all__ = [
     "return_last_message",
+    "select_message_content",
+    "clean_message",
+    "MessageCleaner",
+    "StreamingMessageCleaner",
+    "get_message_cleaner",
+    "StreamBuffer",
+    "BufferPolicy",
 ]
\ No newline at end of file
@@ -0,0 +1,116 @@
+import re
+from functools import lru_cache
+from typing import FrozenSet, Sequence
+
+# default terminate text and think markers, always removed from the output
+DEFAULT_REMOVERS = ("TERMINATE", "<think>", "</think>")
+
+
+class MessageCleaner:
+    """
+    Removes termination texts and think markers from message content with a single compiled pattern.
+
+    Args:
+        removers (Sequence[str]): Substrings to remove in addition to the default markers.
+    """
+    def __init__(self, removers: Sequence[str]) -> None:
+        patterns = sorted({r for r in (*removers, *DEFAULT_REMOVERS) if r}, key=len, reverse=True)
+        # longest first, so a pattern that contains another one wins the alternation
+        self._pattern = re.compile("|".join(re.escape(p) for p in patterns))
+        self._prefixes: FrozenSet[str] = frozenset(p[:i] for p in patterns for i in range(1, len(p)))
+        self._max_prefix_len = max(len(p) for p in patterns) - 1
+
+    def clean(self, content: str) -> str:
+        """
+        Remove every removal pattern from the content.
+
+        Args:
+            content (str): The message content to clean.
+
+        Returns:
+            str: Cleaned message content.
+        """
+        return self._pattern.sub("", content)
+
+    def partial_match_len(self, content: str) -> int:
+        """
+        Get the length of the longest suffix of the content that could be the start of a removal pattern.
+
+        Args:
+            content (str): The cleaned content.
+
+        Returns:
+            int: The number of trailing characters to hold back, 0 if none.
+        """
+        for length in range(min(self._max_prefix_len, len(content)), 0, -1):
+            if content[-length:] in self._prefixes:
+                return length
+        return 0
+
+    def stream(self) -> "StreamingMessageCleaner":
+        """
+        Create an incremental cleaner for content that arrives in chunks.
+
+        Returns:
+            StreamingMessageCleaner: A new streaming cleaner using these patterns.
+        """
+        return StreamingMessageCleaner(self)
+
+
+class StreamingMessageCleaner:
+    """
+    Incrementally cleans chunked content, so a removal pattern split across chunks is still removed.
+    Only the longest suffix that may start a pattern is held back until the next chunk.
+
+    Args:
+        cleaner (MessageCleaner): The compiled cleaner to use.
+    """
+    def __init__(self, cleaner: MessageCleaner) -> None:
+        self._cleaner = cleaner
+        self._pending = ""
+
+    def feed(self, chunk: str) -> str:
+        """
+        Clean the next chunk.
+
+        Args:
+            chunk (str): The next chunk of content.
+
+        Returns:
+            str: The cleaned content that is safe to emit, possibly empty.
+        """
+        content = self._cleaner.clean(self._pending + chunk)
+        hold = self._cleaner.partial_match_len(content)
+        if hold:
+            self._pending = content[-hold:]
+            return content[:-hold]
+        self._pending = ""
+        return content
+
+    def flush(self) -> str:
+        """
+        Emit the held back content at the end of the stream.
+
+        Returns:
+            str: The remaining content, possibly empty.
+        """
+        content, self._pending = self._pending, ""
+        return content
+
+
+@lru_cache(maxsize=256)
+def _get_message_cleaner(removers: tuple[str, ...]) -> MessageCleaner:
+    return MessageCleaner(removers)
+
+
+def get_message_cleaner(removers: Sequence[str]) -> MessageCleaner:
+    """
+    Get the compiled cleaner for the given removers. Cleaners are compiled once and cached.
+
+    Args:
+        removers (Sequence[str]): Substrings to remove in addition to the default markers.
+
+    Returns:
+        MessageCleaner: The compiled cleaner.
+    """
+    return _get_message_cleaner(tuple(removers))
@@ -3,7 +3,7 @@ import time
 import uuid
 from autogen_agentchat.base import TaskResult
 from autogenstudio.datamodel.types import TeamResult
-from autogen_agentchat.messages import TextMessage
+from autogen_agentchat.messages import TextMessage, BaseAgentEvent, BaseChatMessage
 from autogen_oaiapi.base.types import (
     ChatCompletionMessage,
     ChatCompletionResponse,
@@ -11,11 +11,15 @@ from autogen_oaiapi.base.types import (
     UsageInfo,
     ChatCompletionStreamResponse,
     ChatCompletionStreamChoice,
+    ChatCompletionErrorResponse,
+    ChatCompletionErrorDetail,
     DeltaMessage,
 )
 from autogen_oaiapi.base.types import (
     ReturnMessage,
 )
+from autogen_oaiapi.message.message_cleaner import get_message_cleaner
+from autogen_oaiapi.upstream import is_upstream_overloaded
 
 def clean_message(content:str, removers:Sequence[str]) -> str:
     """
@@ -28,16 +32,7 @@ def clean_message(content:str, removers:Sequence[str]) -> str:
     Returns:
         str: Cleaned message content.
     """
-    for remover in removers:
-        content = content.replace(remover, "")
-
-    content = (
-        content
-        .replace("TERMINATE", "") # default terminate text
-        .replace("<think>", "") # default think text
-        .replace("</think>", "") # default think text
-    )
-    return content
+    return get_message_cleaner(removers).clean(content)
         
 
 async def build_content_chunk(
@@ -73,6 +68,38 @@ async def build_content_chunk(
     return content_chunk
 
 
+def select_message_content(
+        messages: Sequence[BaseAgentEvent | BaseChatMessage],
+        source: str|None=None,
+        idx: int|None=None,
+    ) -> str:
+    """
+    Select the output content from the messages in a single reverse scan that stops at the first match.
+    Args:
+        messages (Sequence[BaseAgentEvent | BaseChatMessage]): The messages of the run, oldest first.
+        source (str, optional): Select the last unempty message of this source. Defaults to None.
+        idx (int, optional): Select the message `messages[-idx]`, so 1 is the last message. 0 also selects the last message. Defaults to None.
+    Returns:
+        str: The selected content, empty if nothing matched.
+    """
+    if idx is not None:
+        # `messages[-0]` would be the task, 0 is the default index and means the last message
+        position = -idx if idx else -1
+        if -len(messages) <= position < len(messages):
+            return messages[position].to_text()
+        return ""
+
+    for message in reversed(messages):
+        if source is not None:
+            if message.source == source:
+                content = message.to_text()
+                if content:
+                    return content
+        elif isinstance(message, TextMessage):
+            return message.to_text()
+    return ""
+
+
 def return_last_message(
         result: TaskResult | TeamResult,
         source: str|None=None,
@@ -82,48 +109,24 @@ def return_last_message(
     """
     Extract the last message from the result and calculate token usage.
     Args:
-        result (TaskResult): The result object containing messages.
+        result (TaskResult | TeamResult): The result object containing messages.
         source (str, optional): Source identifier to filter messages. Defaults to None.
-        idx (int, optional): Index of the message to return. Defaults to None.
+        idx (int, optional): Index of the message to return, see `select_message_content`. Defaults to None.
         terminate_texts (Sequence[str], optional): List of substrings to remove from the message content. Defaults to None.
     Returns:
         tuple[str, int, int, int]: A tuple containing the last message content, prompt tokens, completion tokens, and total tokens.
-    Raises:
-        ValueError: If both idx and source are provided.
     """
+    messages = result.task_result.messages if isinstance(result, TeamResult) else result.messages
+
     total_prompt_tokens = 0
     total_completion_tokens = 0
-    
-    if terminate_texts is None:
-        terminate_texts = []
-    
-    content = ""
-    if isinstance(result, TeamResult):
-        for message in result.task_result.messages:
-            if tokens:=message.models_usage:
-                total_prompt_tokens += tokens.prompt_tokens
-                total_completion_tokens += tokens.completion_tokens
-            if isinstance(message, TextMessage):
-                content = message.to_text()
-    else:
-        for message in result.messages:
-            if tokens:=message.models_usage:
-                total_prompt_tokens += tokens.prompt_tokens
-                total_completion_tokens += tokens.completion_tokens
-            if source is not None:
-                if message.source == source:
-                    _content = message.to_text()
-                    if _content:
-                        # update last source and unempty content
-                        content = _content
-
+    for message in messages:
+        if tokens:=message.models_usage:
+            total_prompt_tokens += tokens.prompt_tokens
+            total_completion_tokens += tokens.completion_tokens
     total_tokens = total_prompt_tokens + total_completion_tokens
 
-    if idx is not None:
-        result_message = result.messages[-idx]
-        content = result_message.to_text()
-
-    content = clean_message(content, terminate_texts)
+    content = clean_message(select_message_content(messages, source, idx), terminate_texts or [])
 
     if not content:
         content = "something went wrong, please try again."
@@ -157,33 +160,16 @@ async def build_openai_response(
         # Non-streaming response
         message: ReturnMessage = await result
         
-        if isinstance(message, list):
-            choices = []
-            total_prompt_tokens = 0 
-            total_completion_tokens = 0
-            total_tokens = 0
-            for message_item in message:
-                if not message_item.content:
-                    continue
-                choices.append(ChatCompletionResponseChoice(
-                    index=0,
-                    message=ChatCompletionMessage(role= 'assistant', content=message_item.content), # LLM response
-                    finish_reason="stop"
-                ))
-                total_prompt_tokens += message_item.total_prompt_tokens if message_item.total_prompt_tokens else 0
-                total_completion_tokens += message_item.total_completion_tokens if message_item.total_completion_tokens else 0
-                total_tokens += message_item.total_tokens if message_item.total_tokens else 0
-        else:
-            total_prompt_tokens = message.total_prompt_tokens if message.total_prompt_tokens else 0
-            total_completion_tokens = message.total_completion_tokens if message.total_completion_tokens else 0
-            total_tokens = message.total_tokens if message.total_tokens else 0
-            choices = [
-                ChatCompletionResponseChoice(
-                    index=0,
-                    message=ChatCompletionMessage(role= 'assistant', content=message.content), # LLM response
-                    finish_reason="stop"
-                )
-            ],
+        total_prompt_tokens = message.total_prompt_tokens if message.total_prompt_tokens else 0
+        total_completion_tokens = message.total_completion_tokens if message.total_completion_tokens else 0
+        total_tokens = message.total_tokens if message.total_tokens else 0
+        choices = [
+            ChatCompletionResponseChoice(
+                index=0,
+                message=ChatCompletionMessage(role= 'assistant', content=message.content), # LLM response
+                finish_reason="stop"
+            )
+        ]
         response = ChatCompletionResponse(
             # id, created is auto build from Field default_factory
             model=model_name,
@@ -200,56 +186,93 @@ async def build_openai_response(
         # Streaming response
         result = cast(AsyncGenerator[ReturnMessage, None], result)
         async def _stream_generator() -> AsyncGenerator[str, None]:
-            request_id = f"chatcmpl-{uuid.uuid4().hex}"
-            created_timestamp = int(time.time())
-
-            # 1. init chunk (role)
-            initial_chunk = ChatCompletionStreamResponse(
-                id=request_id,
-                model=model_name,
-                created=created_timestamp,
-                choices=[
-                    ChatCompletionStreamChoice(
-                        index=0,
-                        delta=DeltaMessage(role="assistant"),
-                        finish_reason=None
-                    )
-                ]
-            )
-            yield f"data: {initial_chunk.model_dump_json()}\n\n"
-            # await asyncio.sleep(0.01) # wait for a short time
-
-            message = ReturnMessage(
-                content="Somting went wrong, please try again.",
-                total_completion_tokens=0,
-                total_prompt_tokens=0,
-                total_tokens=0
-            )
-            async for message in result:
-                content_chunk = await build_content_chunk(request_id, model_name, message.content)
-                yield f"data: {content_chunk.model_dump_json()}\n\n"
-            else:
-                final_chunk = ChatCompletionStreamResponse(
-                    id=request_id,
-                    model=model_name,
-                    created=int(time.time()),
-                    choices=[
-                        ChatCompletionStreamChoice(
-                            index=0,
-                            delta=DeltaMessage(), # empty delta
-                            finish_reason="stop"
-                        )
-                    ],
-                    usage=UsageInfo(
-                        prompt_tokens=message.total_prompt_tokens if message.total_prompt_tokens else 0,
-                        completion_tokens=message.total_completion_tokens if message.total_completion_tokens else 0,
-                        total_tokens=message.total_tokens if message.total_tokens else 0
+            try:
+                async for chunk, event_id in build_stream_chunks(model_name, result):
+                    if event_id is not None:
+                        # a reconnecting client sends it back as Last-Event-ID
+                        yield f"id: {event_id}\ndata: {chunk.model_dump_json()}\n\n"
+                    else:
+                        yield f"data: {chunk.model_dump_json()}\n\n"
+            except Exception as e:
+                if not is_upstream_overloaded(e):
+                    raise
+                # the status line is sent already, the error is reported in the stream like OpenAI does
+                error = ChatCompletionErrorResponse(
+                    error=ChatCompletionErrorDetail(
+                        message="The upstream model endpoint is overloaded, please retry later",
+                        type="server_error",
+                        param=None,
+                        code="overloaded",
                     )
                 )
-                yield f"data: {final_chunk.model_dump_json()}\n\n"
+                yield f"data: {error.model_dump_json()}\n\n"
+                return
 
             # 4. stream end message
             yield "data: [DONE]\n\n"
 
         # return the async generator
         return _stream_generator()
+
+
+async def build_stream_chunks(
+        model_name: str,
+        result: AsyncGenerator[ReturnMessage, None],
+    ) -> AsyncGenerator[tuple[ChatCompletionStreamResponse, str | None], None]:
+    """
+    Build the ChatCompletionStreamResponse chunks of a streamed run: the role chunk, one chunk per message,
+    and the final chunk with the finish reason and the token usage.
+
+    Args:
+        model_name (str): Name of the model.
+        result (AsyncGenerator[ReturnMessage, None]): The streamed results from the model.
+
+    Yields:
+        tuple[ChatCompletionStreamResponse, str | None]: The chunk and the event id of its message, if any.
+    """
+    request_id = f"chatcmpl-{uuid.uuid4().hex}"
+    created_timestamp = int(time.time())
+
+    # 1. init chunk (role)
+    initial_chunk = ChatCompletionStreamResponse(
+        id=request_id,
+        model=model_name,
+        created=created_timestamp,
+        choices=[
+            ChatCompletionStreamChoice(
+                index=0,
+                delta=DeltaMessage(role="assistant"),
+                finish_reason=None
+            )
+        ]
+    )
+    yield initial_chunk, None
+
+    message = ReturnMessage(
+        content="Somting went wrong, please try again.",
+        total_completion_tokens=0,
+        total_prompt_tokens=0,
+        total_tokens=0
+    )
+    async for message in result:
+        content_chunk = await build_content_chunk(request_id, model_name, message.content)
+        yield content_chunk, message.event_id
+    else:
+        final_chunk = ChatCompletionStreamResponse(
+            id=request_id,
+            model=model_name,
+            created=int(time.time()),
+            choices=[
+                ChatCompletionStreamChoice(
+                    index=0,
+                    delta=DeltaMessage(), # empty delta
+                    finish_reason="stop"
+                )
+            ],
+            usage=UsageInfo(
+                prompt_tokens=message.total_prompt_tokens if message.total_prompt_tokens else 0,
+                completion_tokens=message.total_completion_tokens if message.total_completion_tokens else 0,
+                total_tokens=message.total_tokens if message.total_tokens else 0
+            )
+        )
+        yield final_chunk, None
@@ -0,0 +1,126 @@
+import asyncio
+import time
+from collections import deque
+from typing import AsyncGenerator, Deque, Dict, Literal, Any
+
+from autogen_oaiapi.base.types import ReturnMessage
+
+BufferPolicy = Literal["block", "coalesce"]
+
+
+class StreamBuffer:
+    """
+    Bounded buffer between a team run and the delivery of its stream to the client.
+
+    The team run is a producer task writing into a buffer of at most `max_size` messages, and the client drains it.
+    A slow client only slows the team once the buffer is full. Then the producer either blocks until there is
+    space ("block"), or merges the new message into the last buffered one ("coalesce").
+    Merged messages produce the same text, as each delta is delivered on its own line, and keep the usage
+    and event id of the newer message.
+    The statistics are aggregated over every stream of the server.
+
+    Args:
+        max_size (int): The maximum number of buffered messages per stream.
+        policy (BufferPolicy): What the producer does when the buffer is full.
+    """
+    def __init__(self, max_size: int = 64, policy: BufferPolicy = "block") -> None:
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self._max_size = max_size
+        self._policy = policy
+        self._streams = 0
+        self._active = 0
+        self._high_water = 0
+        self._blocked_seconds = 0.0
+        self._blocked_count = 0
+        self._coalesced = 0
+
+    async def stream(self, source: AsyncGenerator[ReturnMessage, None]) -> AsyncGenerator[ReturnMessage, None]:
+        """
+        Run the source in a producer task and yield its messages from the buffer.
+        Closing this generator cancels the producer, and with it the team run.
+
+        Args:
+            source (AsyncGenerator[ReturnMessage, None]): The streamed results from the model.
+
+        Yields:
+            ReturnMessage: The streamed results from the model, possibly coalesced.
+        """
+        buffer: Deque[ReturnMessage] = deque()
+        not_empty = asyncio.Event()
+        not_full = asyncio.Event()
+        done = False
+        error: BaseException | None = None
+
+        async def produce() -> None:
+            nonlocal done, error
+            try:
+                async for message in source:
+                    while len(buffer) >= self._max_size:
+                        last = buffer[-1]
+                        if self._policy == "coalesce":
+                            buffer[-1] = message.model_copy(update={"content": f"{last.content}\n{message.content}"})
+                            self._coalesced += 1
+                            break
+                        not_full.clear()
+                        start = time.perf_counter()
+                        await not_full.wait()
+                        self._blocked_seconds += time.perf_counter() - start
+                        self._blocked_count += 1
+                    else:
+                        buffer.append(message)
+                        if len(buffer) > self._high_water:
+                            self._high_water = len(buffer)
+                    not_empty.set()
+            except Exception as e:
+                error = e
+            finally:
+                done = True
+                not_empty.set()
+                # stop the team run right away instead of on garbage collection
+                await source.aclose()
+
+        self._streams += 1
+        self._active += 1
+        producer = asyncio.create_task(produce())
+        try:
+            while True:
+                if buffer:
+                    message = buffer.popleft()
+                    not_full.set()
+                    yield message
+                elif done:
+                    if error is not None:
+                        raise error
+                    return
+                else:
+                    not_empty.clear()
+                    await not_empty.wait()
+        finally:
+            self._active -= 1
+            if not producer.done():
+                producer.cancel()
+                try:
+                    await producer
+                except asyncio.CancelledError:
+                    pass
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the buffer statistics.
+
+        Returns:
+            Dict[str, Any]: The buffer configuration, number of streams, the high-water mark,
+                the time producers were blocked on slow clients and the number of coalesced messages.
+        """
+        return {
+            "max_size": self._max_size,
+            "policy": self._policy,
+            "streams": self._streams,
+            "active": self._active,
+            "high_water": self._high_water,
+            "blocked_count": self._blocked_count,
+            "blocked_seconds": self._blocked_seconds,
+            "coalesced": self._coalesced,
+        }
@@ -1,5 +1,11 @@
 from ._model import Model
+from ._checkpoint import BaseCheckpointStore, CheckpointStore, DiskCheckpointStore, RunCheckpoint, parse_last_event_id
 
 __all__ = [
     "Model",
+    "BaseCheckpointStore",
+    "CheckpointStore",
+    "DiskCheckpointStore",
+    "RunCheckpoint",
+    "parse_last_event_id",
 ]
\ No newline at end of file
@@ -0,0 +1,325 @@
+import asyncio
+import dataclasses
+import hashlib
+import itertools
+import os
+import pickle
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Mapping, Tuple
+from autogen_agentchat.teams import BaseGroupChat
+
+from ..base.types import ReturnMessage, SessionContext
+
+
+@dataclass
+class RunCheckpoint(SessionContext):
+    """
+    Checkpoint of a streamed run, stored in a `BaseCheckpointStore` under its run id.
+
+    Args:
+        model (str): The name of the model of the run.
+        owner (str | None): The name of the API key that started the run, only this key can resume it.
+        chunks (List[ReturnMessage]): The chunks emitted up to the checkpoint, the position is the event index.
+        team_state (Mapping[str, Any] | None): The team state saved at the checkpoint, None before the first one.
+        turns (int): The number of agent turns at the checkpoint.
+        total_prompt_tokens (int): The prompt tokens used up to the checkpoint.
+        total_completion_tokens (int): The completion tokens used up to the checkpoint.
+        done (bool): Whether the run completed, its chunks are then replayed without running the team.
+    """
+    model: str
+    owner: str | None = None
+    chunks: List[ReturnMessage] = field(default_factory=list)
+    team_state: Mapping[str, Any] | None = None
+    turns: int = 0
+    total_prompt_tokens: int = 0
+    total_completion_tokens: int = 0
+    done: bool = False
+
+
+@dataclass
+class ActorSession(SessionContext):
+    """
+    Team state of a chat socket session, stored in the session store under `session_key(session_id)`.
+
+    Args:
+        model (str): The name of the model of the session.
+        owner (str | None): The name of the API key that opened the session, only this key can reopen it.
+        state (Mapping[str, Any]): The state of the actor after the last completed turn.
+    """
+    model: str
+    owner: str | None
+    state: Mapping[str, Any]
+
+
+def session_key(session_id: str) -> str:
+    """
+    Get the session store key of the actor state of a chat socket session.
+    Args:
+        session_id (str): The id of the session, chosen by the client.
+    Returns:
+        str: The session store key.
+    """
+    return f"actor-session:{session_id}"
+
+
+def event_id(run_id: str, index: int) -> str:
+    """
+    Build the server-sent event id of a chunk.
+    Args:
+        run_id (str): The id of the run.
+        index (int): The position of the chunk in the run.
+    Returns:
+        str: The event id, "<run_id>:<index>".
+    """
+    return f"{run_id}:{index}"
+
+
+def parse_last_event_id(value: str) -> Tuple[str, int] | None:
+    """
+    Parse the `Last-Event-ID` header sent by a reconnecting client.
+    Args:
+        value (str): The header value, an id built by `event_id`.
+    Returns:
+        Tuple[str, int] | None: The run id and the index of the last received chunk, None if the value is not an event id.
+    """
+    run_id, _, index = value.rpartition(":")
+    if not run_id or not index.isdigit():
+        return None
+    return run_id, int(index)
+
+
+class BaseCheckpointStore(ABC):
+    """
+    Abstract base class for the stores of the checkpoints of streamed runs, kept apart from the session store.
+
+    Subclasses must implement the get, set and delete methods. A checkpoint expires `ttl_seconds` after it is
+    last saved, and `done_ttl_seconds` after its run completed, long enough for a client that lost the end of
+    the stream to read it.
+    """
+    @abstractmethod
+    async def get(self, run_id: str) -> RunCheckpoint | None:
+        """
+        Get the checkpoint of a run.
+        Args:
+            run_id (str): The id of the run.
+        Returns:
+            RunCheckpoint | None: The checkpoint, None if the run is unknown, expired or was dropped.
+        """
+        ...
+
+    @abstractmethod
+    async def set(self, run_id: str, checkpoint: RunCheckpoint) -> None:
+        """
+        Save the checkpoint of a run, replacing the previous one.
+        Args:
+            run_id (str): The id of the run.
+            checkpoint (RunCheckpoint): The checkpoint.
+        """
+        ...
+
+    @abstractmethod
+    async def delete(self, run_id: str) -> None:
+        """
+        Delete the checkpoint of a run.
+        Args:
+            run_id (str): The id of the run.
+        """
+        ...
+
+
+class CheckpointStore(BaseCheckpointStore):
+    """
+    Bounded in-memory store of the checkpoints of streamed runs, the default store.
+    Only reconnections to the same process can resume, see `DiskCheckpointStore` to resume after a restart.
+    The least recently saved checkpoints are dropped beyond `max_runs`.
+
+    Args:
+        max_runs (int): The number of checkpoints kept.
+        ttl_seconds (float): The time a checkpoint of a running run can be resumed after it is saved.
+        done_ttl_seconds (float): The time the chunks of a completed run can be read again.
+    """
+    def __init__(self, max_runs: int = 256, ttl_seconds: float = 600.0, done_ttl_seconds: float = 60.0) -> None:
+        if max_runs < 1:
+            raise ValueError("max_runs must be at least 1")
+        self._max_runs = max_runs
+        self._ttl_seconds = ttl_seconds
+        self._done_ttl_seconds = done_ttl_seconds
+        # run id -> checkpoint and expiry time, in saving order
+        self._checkpoints: "OrderedDict[str, Tuple[RunCheckpoint, float]]" = OrderedDict()
+        self._expired = 0
+        self._evicted = 0
+
+    def _evict(self, now: float) -> None:
+        # completed runs expire sooner, so the saving order is not the expiry order
+        for run_id in [run_id for run_id, (_, expires_at) in self._checkpoints.items() if expires_at <= now]:
+            del self._checkpoints[run_id]
+            self._expired += 1
+        while len(self._checkpoints) > self._max_runs:
+            self._checkpoints.popitem(last=False)
+            self._evicted += 1
+
+    async def set(self, run_id: str, checkpoint: RunCheckpoint) -> None:
+        now = time.time()
+        ttl = self._done_ttl_seconds if checkpoint.done else self._ttl_seconds
+        self._checkpoints[run_id] = (checkpoint, now + ttl)
+        self._checkpoints.move_to_end(run_id)
+        self._evict(now)
+
+    async def get(self, run_id: str) -> RunCheckpoint | None:
+        self._evict(time.time())
+        entry = self._checkpoints.get(run_id)
+        return entry[0] if entry is not None else None
+
+    async def delete(self, run_id: str) -> None:
+        self._checkpoints.pop(run_id, None)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the checkpoint store statistics.
+        Returns:
+            Dict[str, int]: The stored checkpoints, and the expired and evicted ones.
+        """
+        return {
+            "stored": len(self._checkpoints),
+            "expired": self._expired,
+            "evicted": self._evicted,
+        }
+
+
+class DiskCheckpointStore(BaseCheckpointStore):
+    """
+    Store of the checkpoints of streamed runs as files in a directory, read and written in a thread.
+    The checkpoints survive a restart of the server and are shared by the processes using the directory,
+    so a client reconnecting to another worker or after a crash resumes its run.
+
+    The modification time of a file is set to its expiry time. Expired checkpoints are removed when they are
+    read, and every `sweep_every` saves the expired ones and the ones expiring first beyond `max_runs` are removed.
+
+    Args:
+        dir_path (str): The directory of the checkpoints.
+        max_runs (int): The number of checkpoints kept in the directory.
+        ttl_seconds (float): The time a checkpoint of a running run can be resumed after it is saved.
+        done_ttl_seconds (float): The time the chunks of a completed run can be read again.
+        sweep_every (int): The number of saves between two sweeps of the directory.
+    """
+    def __init__(
+        self,
+        dir_path: str = "checkpoints",
+        max_runs: int = 1024,
+        ttl_seconds: float = 600.0,
+        done_ttl_seconds: float = 60.0,
+        sweep_every: int = 100,
+    ) -> None:
+        if max_runs < 1 or sweep_every < 1:
+            raise ValueError("max_runs and sweep_every must be at least 1")
+        os.makedirs(dir_path, exist_ok=True)
+        self.dir_path = dir_path
+        self._max_runs = max_runs
+        self._ttl_seconds = ttl_seconds
+        self._done_ttl_seconds = done_ttl_seconds
+        self._sweep_every = sweep_every
+        self._saves = itertools.count(1)
+
+    def _file_path(self, run_id: str) -> str:
+        # hashed, the run id of a resumed run comes from the client
+        return os.path.join(self.dir_path, hashlib.sha256(run_id.encode()).hexdigest() + ".checkpoint")
+
+    def _read(self, run_id: str) -> RunCheckpoint | None:
+        path = self._file_path(run_id)
+        try:
+            with open(path, "rb") as f:
+                if os.fstat(f.fileno()).st_mtime <= time.time():
+                    os.remove(path)
+                    return None
+                checkpoint = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        return checkpoint if isinstance(checkpoint, RunCheckpoint) else None
+
+    def _write(self, run_id: str, checkpoint: RunCheckpoint) -> None:
+        expires_at = time.time() + (self._done_ttl_seconds if checkpoint.done else self._ttl_seconds)
+        fd, tmp_path = tempfile.mkstemp(dir=self.dir_path, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(checkpoint, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.utime(tmp_path, (expires_at, expires_at))
+            os.replace(tmp_path, self._file_path(run_id))
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        if next(self._saves) % self._sweep_every == 0:
+            self._sweep()
+
+    def _sweep(self) -> None:
+        now = time.time()
+        files = []
+        with os.scandir(self.dir_path) as entries:
+            for entry in entries:
+                if not entry.name.endswith(".checkpoint"):
+                    continue
+                try:
+                    files.append((entry.stat().st_mtime, entry.path))
+                except FileNotFoundError:
+                    pass
+        files.sort()
+        live = [path for expires_at, path in files if expires_at > now]
+        for path in [path for expires_at, path in files if expires_at <= now] + live[:max(len(live) - self._max_runs, 0)]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _remove(self, run_id: str) -> None:
+        try:
+            os.remove(self._file_path(run_id))
+        except FileNotFoundError:
+            pass
+
+    async def get(self, run_id: str) -> RunCheckpoint | None:
+        return await asyncio.to_thread(self._read, run_id)
+
+    async def set(self, run_id: str, checkpoint: RunCheckpoint) -> None:
+        await asyncio.to_thread(self._write, run_id, checkpoint)
+
+    async def delete(self, run_id: str) -> None:
+        await asyncio.to_thread(self._remove, run_id)
+
+
+class Checkpointer:
+    """
+    Saves the checkpoint of one streamed run every `every` agent turns.
+    The chunks are appended by the caller as they are emitted, the team state is saved by the run at turn boundaries.
+    """
+    def __init__(self, store: BaseCheckpointStore, run_id: str, every: int, checkpoint: RunCheckpoint) -> None:
+        self.store = store
+        self.run_id = run_id
+        self.every = every
+        self.checkpoint = checkpoint
+
+    async def save(self) -> None:
+        # a copy, the store would otherwise see chunks emitted after the saved team state
+        await self.store.set(self.run_id, dataclasses.replace(self.checkpoint, chunks=list(self.checkpoint.chunks)))
+
+    async def turn(self, actor: BaseGroupChat, total_prompt_tokens: int, total_completion_tokens: int) -> None:
+        """
+        Count an agent turn and save a checkpoint every `every` turns.
+        Args:
+            actor (BaseGroupChat): The running team.
+            total_prompt_tokens (int): The prompt tokens used so far.
+            total_completion_tokens (int): The completion tokens used so far.
+        """
+        self.checkpoint.turns += 1
+        if self.checkpoint.turns % self.every:
+            return
+        self.checkpoint.team_state = await actor.save_state()
+        self.checkpoint.total_prompt_tokens = total_prompt_tokens
+        self.checkpoint.total_completion_tokens = total_completion_tokens
+        await self.save()
@@ -1,6 +1,11 @@
+import asyncio
+import dataclasses
 import gc
 import itertools
-from typing import Dict, List, Callable, AsyncGenerator, Sequence, Literal
+import logging
+import weakref
+from collections import Counter
+from typing import Any, Dict, List, Callable, AsyncGenerator, Mapping, Sequence, Literal
 from autogen_agentchat.teams import BaseGroupChat
 from autogen_agentchat.agents import BaseChatAgent
 from autogen_agentchat.base import (
@@ -12,14 +17,25 @@ from autogen_agentchat.conditions import (
     TextMentionTermination,
 )
 from autogen_core import ComponentModel
-from autogen_agentchat.messages import ChatMessage, BaseChatMessage, BaseAgentEvent
+from autogen_agentchat.messages import ChatMessage, BaseChatMessage, BaseAgentEvent, ModelClientStreamingChunkEvent
 from autogen_agentchat.base import TaskResult
 from autogenstudio.teammanager import TeamManager
 from autogenstudio.datamodel.types import TeamResult
 from autogen_agentchat.messages import TextMessage
 
 from ..base.types import Registry, ReturnMessage, TOTAL_MODELS_NAME
-from ..message import return_last_message
+from ._single_flight import SingleFlight, request_key
+from ._process_pool import ProcessPool
+from ._warmup import stub_model_clients, WARMUP_TASK
+from ._checkpoint import ActorSession, BaseCheckpointStore, Checkpointer, CheckpointStore, RunCheckpoint, event_id, session_key
+from ..tools import ToolExecutor
+from ..llm_cache import LLMCache
+from ..upstream import UpstreamGuard
+from ..history import BaseHistoryPolicy
+from ..session_manager.base import BaseSessionStore
+from ..message import return_last_message, select_message_content, get_message_cleaner, StreamingMessageCleaner
+
+logger = logging.getLogger(__name__)
 
 
 def get_termination_conditions(termination_condition: TerminationCondition) -> Sequence[str]:
@@ -48,8 +64,46 @@ class Model:
     Model is a class that manages the registration and execution of AutoGen GroupChat and Agent instances.
     It provides methods to register models, run them, and retrieve their results.
     """
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        coalesce: bool = False,
+        workers: int | None = None,
+        tool_executor: ToolExecutor | None = None,
+        session_store: BaseSessionStore | None = None,
+        checkpoint_store: BaseCheckpointStore | None = None,
+        checkpoint_every: int | None = None,
+        llm_cache: LLMCache | None = None,
+        upstream_guard: UpstreamGuard | None = None,
+    ) -> None:
+        """
+        Args:
+            coalesce (bool): Collapse identical in-flight requests (same API key, model and messages) into one execution.
+            workers (int | None): Run the models in this many worker processes instead of the event loop of the server.
+            tool_executor (ToolExecutor | None): Executor policy for the FunctionTools of the registered agents.
+            session_store (BaseSessionStore | None): Store of the actor states of sessions.
+            checkpoint_store (BaseCheckpointStore | None): Store of the checkpoints of streamed runs, a bounded in-memory `CheckpointStore` when None.
+            checkpoint_every (int | None): Checkpoint streamed team runs with a run id every this many agent turns. No checkpoints when None.
+            llm_cache (LLMCache | None): Cache of the model client calls of the actors, applied when they are loaded.
+            upstream_guard (UpstreamGuard | None): Concurrency limits and circuit breakers of the upstreams of the actors, applied when they are loaded.
+        """
+        if checkpoint_every is not None and checkpoint_every < 1:
+            raise ValueError("checkpoint_every must be at least 1")
+        self._tool_executor = tool_executor
+        self._llm_cache = llm_cache
+        self._upstream_guard = upstream_guard
+        self._session_store = session_store
+        self._checkpoint_every = checkpoint_every
+        self._checkpoint_store: BaseCheckpointStore | None = None
+        if checkpoint_every is not None:
+            self._checkpoint_store = checkpoint_store or CheckpointStore()
         self._registry: Dict[str, Registry] = {}
+        self._history_policies: Dict[str, BaseHistoryPolicy] = {}
+        self._single_flight: SingleFlight | None = SingleFlight() if coalesce else None
+        self._process_pool: ProcessPool | None = ProcessPool(self._registry, workers) if workers is not None else None
+        self._in_flight = 0
+        # actors built for runs, a growing live count means runs leak their teams
+        self._live_actors: "weakref.WeakSet[Any]" = weakref.WeakSet()
+        self._built_actors = 0
 
     def _register(
         self,
@@ -92,6 +146,8 @@ class Model:
             termination_conditions=termination_conditions or [],
         )
         self._registry[name] = registry
+        if self._process_pool is not None:
+            self._process_pool.register(registry)
 
     def register(
         self,
@@ -99,6 +155,7 @@ class Model:
         source_select: str | None = None,
         output_idx: int | None = None,
         actor: BaseGroupChat | BaseChatAgent | None = None,
+        history_policy: BaseHistoryPolicy | None = None,
     ) -> Callable[..., None]:
         """
         Register a model with the given name and actor.
@@ -107,6 +164,7 @@ class Model:
             source_select (str | None): The source select for the model.
             output_idx (int | None): The output index for the model.
             actor (BaseGroupChat | BaseChatAgent | None): The actor (GroupChat or Agent) to register.
+            history_policy (BaseHistoryPolicy | None): Shortens the message history before it reaches the actor.
         Returns:
             Callable[..., None]: A decorator to register the model.
         """
@@ -117,6 +175,8 @@ class Model:
             raise ValueError("source_select and output_idx cannot be used together")
         if source_select is None and output_idx is None:
             output_idx = 0
+        if history_policy is not None:
+            self._history_policies[name] = history_policy
         # if actor is None:
             # If no actor is provided, return a decorator
         def decorator(builder: Callable[..., BaseGroupChat|BaseChatAgent]) -> None:
@@ -150,6 +210,18 @@ class Model:
         """
         return list(self._registry.keys())
 
+    def can_open(self, name: str) -> bool:
+        """
+        Check whether the actor of a model can be kept open across runs with `open_actor`.
+
+        Args:
+            name (str): The name of the model.
+
+        Returns:
+            bool: False for team managers, which build a new team for every run.
+        """
+        return name in self._registry and self._registry[name].type != "teammanager"
+
     # @property
     def _get_actor(self, name: str) -> BaseGroupChat | BaseChatAgent:
         """
@@ -166,57 +238,484 @@ class Model:
         if name not in self._registry:
             raise KeyError(f"model {name} not found in registry")
         dump = self._registry[name].actor
+        actor: BaseGroupChat | BaseChatAgent
         if self._registry[name].type == "team":
-            return BaseGroupChat.load_component(dump)
+            actor = BaseGroupChat.load_component(dump)
         elif self._registry[name].type == "agent":
-            return BaseChatAgent.load_component(dump)
+            actor = BaseChatAgent.load_component(dump)
         elif self._registry[name].type == "teammanager":
-            return TeamManager()
+            manager = TeamManager()
+            self._built_actors += 1
+            self._live_actors.add(manager)
+            return manager
         else:
             raise TypeError("actor must be a AutoGen GroupChat(team) or Agent instance")
+        self._built_actors += 1
+        self._live_actors.add(actor)
+        if self._tool_executor is not None:
+            self._tool_executor.instrument(actor, name, dump)
+        if self._upstream_guard is not None:
+            self._upstream_guard.instrument(actor, name)
+        if self._llm_cache is not None:
+            # outside the guard, cache hits do not take an upstream slot
+            self._llm_cache.instrument(actor, name)
+        return actor
         
-    async def run_stream(self, name: str, messages: Sequence[ChatMessage]) -> AsyncGenerator[ReturnMessage, None]:
+    async def start(self) -> None:
+        """
+        Start the worker processes if the models run in a process pool. Called once when the server starts.
+        """
+        if self._process_pool is not None:
+            await self._process_pool.start()
+
+    async def stop(self) -> None:
+        """
+        Stop the worker processes and the tool executors. Called once when the server shuts down.
+        """
+        if self._process_pool is not None:
+            await self._process_pool.stop()
+        if self._tool_executor is not None:
+            await self._tool_executor.stop()
+
+    def _stub_run_actor(self, name: str) -> BaseGroupChat | BaseChatAgent:
+        registry = self._registry[name]
+        # the termination text ends teams on the first reply, the stub client answers a few turns for other conditions
+        reply = registry.termination_conditions[0] if registry.termination_conditions else "TERMINATE"
+        dump = stub_model_clients(registry.actor, [reply] * 8)
+        if registry.type == "team":
+            return BaseGroupChat.load_component(dump)
+        return BaseChatAgent.load_component(dump)
+
+    async def warmup(self, run: bool = False, timeout: float = 30.0) -> Dict[str, str]:
+        """
+        Build the actor of every registered model once, so the first requests do not pay for imports,
+        component loading and the cleaner and tool caches. Actors are built in a thread to keep the event loop free.
+        Args:
+            run (bool): Also run every actor once against a stub model client that replays its termination text.
+            timeout (float): The longest time one synthetic run may take, in seconds.
+        Returns:
+            Dict[str, str]: The warm-up result per model name, "built", "ran", "skipped" for team managers or "failed".
+        """
+        results: Dict[str, str] = {}
+        for name, registry in list(self._registry.items()):
+            if registry.type == "teammanager":
+                results[name] = "skipped"
+                continue
+            try:
+                get_message_cleaner(registry.termination_conditions)
+                await asyncio.to_thread(self._get_actor, name)
+                results[name] = "built"
+                if run:
+                    actor = await asyncio.to_thread(self._stub_run_actor, name)
+                    await asyncio.wait_for(actor.run(task=[TextMessage(content=WARMUP_TASK, source="user")]), timeout)
+                    results[name] = "ran"
+            except Exception as e:
+                logger.warning("Warm-up of model %s failed: %s", name, e)
+                results[name] = "failed"
+        return results
+
+    @property
+    def in_flight(self) -> int:
+        """
+        Get the number of runs in progress, streaming or not.
+
+        Returns:
+            int: The number of runs in progress.
+        """
+        return self._in_flight
+
+    @property
+    def actor_stats(self) -> Dict[str, Any]:
+        """
+        Get the number of actors built for runs and of those still alive.
+
+        Returns:
+            Dict[str, Any]: The actors built, the actors alive and the alive actors per class name.
+        """
+        actors = list(self._live_actors)
+        return {
+            "built": self._built_actors,
+            "live": len(actors),
+            "live_by_type": dict(Counter(type(actor).__name__ for actor in actors)),
+        }
+
+    @property
+    def tool_stats(self) -> Dict[str, Any] | None:
+        """
+        Get the tool timing statistics.
+
+        Returns:
+            Dict[str, Any] | None: The executor sizes and the timing statistics per tool, None without a tool executor.
+        """
+        return self._tool_executor.stats if self._tool_executor is not None else None
+
+    @property
+    def llm_cache_stats(self) -> Dict[str, Any] | None:
+        """
+        Get the model client cache statistics.
+
+        Returns:
+            Dict[str, Any] | None: The hit rates per model and agent, None without a cache.
+        """
+        return self._llm_cache.stats if self._llm_cache is not None else None
+
+    @property
+    def process_pool_stats(self) -> Dict[str, int] | None:
+        """
+        Get the process pool statistics.
+
+        Returns:
+            Dict[str, int] | None: Number of workers, live workers, respawned workers and requests in flight, None without a process pool.
+        """
+        return self._process_pool.stats if self._process_pool is not None else None
+
+    @property
+    def checkpoint_stats(self) -> Dict[str, int] | None:
+        """
+        Get the run checkpoint statistics.
+
+        Returns:
+            Dict[str, int] | None: The stored, expired and evicted checkpoints, None without checkpoints or for stores without statistics.
+        """
+        stats: Dict[str, int] | None = getattr(self._checkpoint_store, "stats", None)
+        return stats
+
+    async def open_actor(
+        self,
+        name: str,
+        owner: str | None = None,
+        session_id: str | None = None,
+        state: Mapping[str, Any] | None = None,
+    ) -> BaseGroupChat | BaseChatAgent:
+        """
+        Build an actor kept by the caller across several runs, see `run_actor_stream`.
+        The actor is built in a thread, in this process also with worker processes.
+        Args:
+            name (str): The name of the model.
+            owner (str | None): The name of the API key of the caller.
+            session_id (str | None): Restore the state saved by `save_actor` for this session, if it belongs to the model and the key.
+            state (Mapping[str, Any] | None): Restore this actor state, saved by the caller.
+        Returns:
+            BaseGroupChat | BaseChatAgent: The actor, with the state of the session when there is one.
+        Raises:
+            KeyError: If the model is not found in the registry.
+            TypeError: If the model is a team manager, which builds a new team for every run.
+        """
+        if name in self._registry and not self.can_open(name):
+            raise TypeError(f"model {name} builds a new team for every run and can not be kept open")
+        actor = await asyncio.to_thread(self._get_actor, name)
+        if state is not None:
+            await actor.load_state(state)
+        elif session_id is not None and self._session_store is not None:
+            session = await self._session_store.aget(session_key(session_id))
+            if isinstance(session, ActorSession) and session.model == name and session.owner == owner:
+                await actor.load_state(session.state)
+        return actor
+
+    async def save_actor(
+        self,
+        name: str,
+        actor: BaseGroupChat | BaseChatAgent,
+        owner: str | None,
+        session_id: str,
+    ) -> None:
+        """
+        Save the state of an actor built by `open_actor` to the session store.
+        Args:
+            name (str): The name of the model.
+            actor (BaseGroupChat | BaseChatAgent): The actor.
+            owner (str | None): The name of the API key of the caller.
+            session_id (str): The id of the session.
+        """
+        if self._session_store is None:
+            return
+        session = await self._session_store.aget(session_key(session_id))
+        if isinstance(session, ActorSession) and (session.model != name or session.owner != owner):
+            # the id is taken by another key or model, its state is kept
+            logger.warning("Session %s belongs to another model or key, the actor state is not saved", session_id)
+            return
+        await self._session_store.aset(
+            session_key(session_id), ActorSession(model=name, owner=owner, state=await actor.save_state())
+        )
+
+    async def run_actor_stream(
+        self,
+        name: str,
+        actor: BaseGroupChat | BaseChatAgent,
+        messages: Sequence[ChatMessage],
+    ) -> AsyncGenerator[ReturnMessage, None]:
+        """
+        Run an actor built by `open_actor` with the new messages of a turn, streaming the results.
+        The actor keeps the previous turns, so the history policy and coalescing are not applied.
+        Args:
+            name (str): The name of the model.
+            actor (BaseGroupChat | BaseChatAgent): The actor.
+            messages (Sequence[ChatMessage]): The new messages of the turn.
+        Yields:
+            AsyncGenerator[ReturnMessage, None]: The streamed results from the model.
+        """
+        self._in_flight += 1
+        try:
+            async for message in self._run_stream(name, messages, actor=actor):
+                yield message
+        finally:
+            self._in_flight -= 1
+
+    def _execute_stream(self, name: str, messages: Sequence[ChatMessage]) -> AsyncGenerator[ReturnMessage, None]:
+        if self._process_pool is not None:
+            return self._process_pool.run_stream(name, messages)
+        return self._run_stream(name, messages)
+
+    async def _execute(self, name: str, messages: List[ChatMessage]) -> ReturnMessage:
+        if self._process_pool is not None:
+            return await self._process_pool.run(name, messages)
+        return await self._run(name, messages)
+
+    @property
+    def history_stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Get the token statistics of the history policies.
+
+        Returns:
+            Dict[str, Dict[str, int]]: The statistics of the history policy per model name.
+        """
+        return {name: policy.model_stats(name) for name, policy in self._history_policies.items()}
+
+    async def _window(self, name: str, messages: Sequence[ChatMessage]) -> List[ChatMessage]:
+        policy = self._history_policies.get(name)
+        if policy is None:
+            return list(messages)
+        return await policy.apply(messages, name)
+
+    @property
+    def coalesce_stats(self) -> Dict[str, int] | None:
+        """
+        Get the request coalescing statistics.
+
+        Returns:
+            Dict[str, int] | None: Number of executed runs, collapsed requests and runs in flight, None if coalescing is off.
+        """
+        return self._single_flight.stats if self._single_flight is not None else None
+
+    async def run_stream(
+        self,
+        name: str,
+        messages: Sequence[ChatMessage],
+        run_id: str | None = None,
+        owner: str | None = None,
+        resume_after: int | None = None,
+    ) -> AsyncGenerator[ReturnMessage, None]:
         """
         Run the model with the given name and messages, streaming the results.
+        The history policy of the model is applied first.
+        With coalescing on, identical in-flight requests of the same API key share one execution and its chunks.
+        With checkpoints on and a run id, the run is checkpointed instead, see `_run_checkpointed`.
         Args:
             name (str): The name of the model.
             messages (Sequence[ChatMessage]): The messages to send to the model.
+            run_id (str | None): The id of the run, the chunks then carry event ids.
+            owner (str | None): The name of the API key of the run.
+            resume_after (int | None): Resume the run `run_id` after the chunk with this index, the last one the client received.
         Yields:
             AsyncGenerator[ReturnMessage, None]: The streamed results from the model.
         """
-        actor = self._get_actor(name)
+        self._in_flight += 1
+        try:
+            stream: AsyncGenerator[ReturnMessage, None]
+            if run_id is not None and self._checkpoint_every is not None and self._process_pool is None:
+                stream = self._run_checkpointed(name, messages, run_id, owner, resume_after)
+            else:
+                messages = await self._window(name, messages)
+                if self._single_flight is None:
+                    stream = self._execute_stream(name, messages)
+                else:
+                    stream = self._single_flight.run_stream(
+                        request_key(name, messages, owner), lambda: self._execute_stream(name, messages)
+                    )
+            async for message in stream:
+                yield message
+        finally:
+            self._in_flight -= 1
+
+    async def resumable(self, name: str, run_id: str, owner: str | None) -> bool:
+        """
+        Check whether a streamed run can be resumed.
+        Args:
+            name (str): The name of the model.
+            run_id (str): The id of the run.
+            owner (str | None): The name of the API key resuming the run.
+        Returns:
+            bool: True if checkpoints are on and the run has a checkpoint of this model started by this key.
+        """
+        if self._checkpoint_store is None or self._checkpoint_every is None or self._process_pool is not None:
+            return False
+        checkpoint = await self._checkpoint_store.get(run_id)
+        return isinstance(checkpoint, RunCheckpoint) and checkpoint.model == name and checkpoint.owner == owner
+
+    async def _run_checkpointed(
+        self,
+        name: str,
+        messages: Sequence[ChatMessage],
+        run_id: str,
+        owner: str | None,
+        resume_after: int | None,
+    ) -> AsyncGenerator[ReturnMessage, None]:
+        """
+        Run the model, saving the emitted chunks and the team state every `checkpoint_every` agent turns.
+        The checkpoint is saved when the run starts, so a new run can not take the id of a running one.
+        When resumed, the chunks after `resume_after` are replayed from the checkpoint, and the team continues
+        from the saved state instead of rerunning the completed turns. Chunks the client received after the
+        checkpoint are produced again by the resumed run and are not sent twice. A run resumed before its
+        first saved team state restarts from the task, without replaying the chunks.
+        The termination condition of the team restarts with the resumed run.
+        The checkpoint of a completed run is kept only for the short retention of the checkpoint store.
+        Args:
+            name (str): The name of the model.
+            messages (Sequence[ChatMessage]): The messages to send to the model.
+            run_id (str): The id of the run.
+            owner (str | None): The name of the API key of the run, only the same key can resume it.
+            resume_after (int | None): The index of the last chunk the client received, None for a new run.
+        Yields:
+            AsyncGenerator[ReturnMessage, None]: The streamed results from the model, with event ids.
+        Raises:
+            PermissionError: If `resume_after` is given and the run is not `resumable`,
+                or if it is not given and the run id is taken.
+        """
+        assert self._checkpoint_store is not None and self._checkpoint_every is not None
+        skip_until = -1
+        checkpoint = await self._checkpoint_store.get(run_id)
+        if resume_after is not None:
+            if checkpoint is None or checkpoint.model != name or checkpoint.owner != owner:
+                raise PermissionError(f"run {run_id} can not be resumed")
+            skip_until = resume_after
+        elif checkpoint is not None:
+            raise PermissionError(f"run {run_id} already exists")
+        if checkpoint is None or not (checkpoint.done or checkpoint.team_state is not None):
+            # the run starts from the task, the chunks it emits again replace the saved ones
+            checkpoint = RunCheckpoint(model=name, owner=owner)
+            messages = await self._window(name, messages)
+        else:
+            # a copy, the chunks emitted by this run must not change the saved checkpoint
+            checkpoint = dataclasses.replace(checkpoint, chunks=list(checkpoint.chunks))
+        for idx in range(skip_until + 1, len(checkpoint.chunks)):
+            yield checkpoint.chunks[idx].model_copy(update={"event_id": event_id(run_id, idx)})
+        if checkpoint.done:
+            return
+
+        checkpointer = Checkpointer(self._checkpoint_store, run_id, self._checkpoint_every, checkpoint)
+        if checkpoint.team_state is None:
+            await checkpointer.save()
+        async for message in self._run_stream(name, messages, checkpointer):
+            idx = len(checkpoint.chunks)
+            checkpoint.chunks.append(message)
+            if idx > skip_until:
+                yield message.model_copy(update={"event_id": event_id(run_id, idx)})
+        checkpoint.done = True
+        await checkpointer.save()
+
+    @staticmethod
+    def _chunk(content: str, total_prompt_tokens: int, total_completion_tokens: int) -> ReturnMessage:
+        return ReturnMessage(
+            content=content,
+            total_prompt_tokens=total_prompt_tokens,
+            total_completion_tokens=total_completion_tokens,
+            total_tokens=total_prompt_tokens + total_completion_tokens,
+        )
+
+    async def _run_stream(
+        self,
+        name: str,
+        messages: Sequence[ChatMessage],
+        checkpointer: Checkpointer | None = None,
+        actor: BaseGroupChat | BaseChatAgent | None = None,
+    ) -> AsyncGenerator[ReturnMessage, None]:
+        """
+        Run the model with the given name and messages, streaming the results.
+        Token usage is accumulated while streaming, so the final message does not rescan the transcript.
+        Every message carries the usage so far, which is what gets recorded when the client drops the stream.
+        Args:
+            name (str): The name of the model.
+            messages (Sequence[ChatMessage]): The messages to send to the model.
+            checkpointer (Checkpointer | None): Saves the team state at agent turns, and holds the state to resume from.
+            actor (BaseGroupChat | BaseChatAgent | None): Run this actor instead of building a new one.
+        Yields:
+            AsyncGenerator[ReturnMessage, None]: The streamed results from the model.
+        """
+        if actor is None:
+            actor = self._get_actor(name)
+        registry = self._registry[name]
         len_messages = len(messages)
         message_count = 0
-        if isinstance(actor, BaseGroupChat):
-            yield ReturnMessage(content="<think>")
+        total_prompt_tokens = 0
+        total_completion_tokens = 0
+        if not isinstance(actor, BaseGroupChat):
+            # only teams are resumed at turn boundaries
+            checkpointer = None
+        resume_state = checkpointer.checkpoint.team_state if checkpointer is not None else None
 
-        message: BaseAgentEvent | BaseChatMessage | TaskResult | None = None
-        team_config = {}
+        stream: AsyncGenerator[Any, None]
         if isinstance(actor, TeamManager):
-            team_config = self._registry[name].actor.config['team_config']
-        
-        async for message in actor.run_stream(task=messages, team_config = team_config):
+            stream = actor.run_stream(task=messages, team_config=registry.actor.config['team_config'])
+        elif resume_state is not None and checkpointer is not None:
+            # the team continues the saved conversation, the task and the opening chunk are already done
+            await actor.load_state(resume_state)
+            len_messages = 0
+            total_prompt_tokens = checkpointer.checkpoint.total_prompt_tokens
+            total_completion_tokens = checkpointer.checkpoint.total_completion_tokens
+            stream = actor.run_stream()
+        else:
+            if isinstance(actor, BaseGroupChat):
+                yield self._chunk("<think>", total_prompt_tokens, total_completion_tokens)
+            stream = actor.run_stream(task=messages)
+
+        cleaner = get_message_cleaner(registry.termination_conditions)
+        chunk_cleaner: StreamingMessageCleaner | None = None
+        message: Any = None
+        async for message in stream:
+            if isinstance(message, TeamResult):
+                message = message.task_result
+            if isinstance(message, TaskResult):
+                continue
+            if not isinstance(message, (BaseAgentEvent, BaseChatMessage)):
+                # e.g. LLM call events of TeamManager
+                continue
+            if tokens:=message.models_usage:
+                total_prompt_tokens += tokens.prompt_tokens
+                total_completion_tokens += tokens.completion_tokens
             if len_messages > message_count:
                 message_count += 1
                 continue
-            if not isinstance(message, TaskResult):
-                yield ReturnMessage(content=f"## [{message.source}]\n\n" + message.to_text())
+            if isinstance(message, ModelClientStreamingChunkEvent):
+                # a termination text can be split across chunks, hold back a possible partial match
+                if chunk_cleaner is None:
+                    chunk_cleaner = cleaner.stream()
+                content = chunk_cleaner.feed(message.to_text())
+                if content:
+                    yield self._chunk(f"## [{message.source}]\n\n" + content, total_prompt_tokens, total_completion_tokens)
+                continue
+            if chunk_cleaner is not None:
+                content = chunk_cleaner.flush()
+                chunk_cleaner = None
+                if content:
+                    yield self._chunk(f"## [{message.source}]\n\n" + content, total_prompt_tokens, total_completion_tokens)
+            yield self._chunk(
+                f"## [{message.source}]\n\n" + cleaner.clean(message.to_text()), total_prompt_tokens, total_completion_tokens
+            )
+            if checkpointer is not None and isinstance(message, BaseChatMessage) and isinstance(actor, BaseGroupChat):
+                await checkpointer.turn(actor, total_prompt_tokens, total_completion_tokens)
         else:
             if isinstance(actor, BaseGroupChat):
-                yield ReturnMessage(content="</think>")
+                yield self._chunk("</think>", total_prompt_tokens, total_completion_tokens)
             # at that point, the message is a TaskResult
             if isinstance(message, TaskResult):
-                content, total_prompt_tokens, total_completion_tokens, total_tokens = return_last_message(
-                    message,
-                    source=self._registry[name].source_select,
-                    idx=self._registry[name].output_idx,
-                    terminate_texts=self._registry[name].termination_conditions,
+                content = cleaner.clean(
+                    select_message_content(message.messages, source=registry.source_select, idx=registry.output_idx)
                 )
                 yield ReturnMessage(
-                    content=content,
+                    content=content or "something went wrong, please try again.",
                     total_completion_tokens=total_completion_tokens,
                     total_prompt_tokens=total_prompt_tokens,
-                    total_tokens=total_tokens,
+                    total_tokens=total_prompt_tokens + total_completion_tokens,
                 )
             else:
                 yield ReturnMessage(
@@ -229,7 +728,33 @@ class Model:
         gc.garbage.clear() 
         return
     
-    async def run(self, name: str, messages: List[ChatMessage]) -> ReturnMessage | List[ReturnMessage]:
+    async def run(self, name: str, messages: List[ChatMessage], owner: str | None = None) -> ReturnMessage:
+        """
+        Run the model with the given name and messages, returning the result.
+        The history policy of the model is applied first.
+        With coalescing on, identical in-flight requests of the same API key share one execution and its result.
+        Args:
+            name (str): The name of the model.
+            messages (List[ChatMessage]): The messages to send to the model.
+            owner (str | None): The name of the API key of the request.
+        Returns:
+            ReturnMessage: The result from the model.
+        Raises:
+            TypeError: If the actor is not a valid GroupChat or Agent instance.
+        """
+        self._in_flight += 1
+        try:
+            messages = await self._window(name, messages)
+            if self._single_flight is None:
+                return await self._execute(name, messages)
+            result: ReturnMessage = await self._single_flight.run(
+                request_key(name, messages, owner), lambda: self._execute(name, messages)
+            )
+            return result
+        finally:
+            self._in_flight -= 1
+
+    async def _run(self, name: str, messages: List[ChatMessage]) -> ReturnMessage:
         """
         Run the model with the given name and messages, returning the result.
         Args:
@@ -243,12 +768,16 @@ class Model:
         actor = self._get_actor(name)
         message = ReturnMessage(content="Something went wrong, please try again.", total_completion_tokens=0, total_prompt_tokens=0, total_tokens=0)
         if isinstance(actor, BaseGroupChat):
-            async for message in self.run_stream(name, messages):
+            async for message in self._run_stream(name, messages):
                 continue
             else:
                 return message
-        elif isinstance(actor, BaseChatAgent):
-            result_message = await actor.run(task=messages)
+        elif isinstance(actor, (BaseChatAgent, TeamManager)):
+            result_message: TaskResult | TeamResult
+            if isinstance(actor, TeamManager):
+                result_message = await actor.run(task=messages, team_config=self._registry[name].actor.config['team_config'])
+            else:
+                result_message = await actor.run(task=messages)
             content, total_prompt_tokens, total_completion_tokens, total_tokens = return_last_message(
                 result_message,
                 source=self._registry[name].source_select,
@@ -261,28 +790,5 @@ class Model:
                 total_prompt_tokens=total_prompt_tokens,
                 total_tokens=total_tokens,
             )
-        elif isinstance(actor, TeamManager):
-            result_message = await TeamManager().run(task=messages, team_config=self._registry[name].actor.config['team_config'])
-            if isinstance(result_message, TeamResult):
-                messages = []
-                for message in result_message.task_result.messages:
-                    content = ""
-                    total_prompt_tokens = 0
-                    total_completion_tokens = 0
-                    total_tokens = 0
-                    if tokens:=message.models_usage:
-                        total_prompt_tokens += tokens.prompt_tokens
-                        total_completion_tokens += tokens.completion_tokens
-                    if isinstance(message, TextMessage):
-                        content = message.to_text()
-                    message_to_return = ReturnMessage(
-                        content=content,
-                        total_completion_tokens=total_completion_tokens,
-                        total_prompt_tokens=total_prompt_tokens,
-                        total_tokens=total_tokens,
-                    )
-                    messages.append(message_to_return)
-            
-            return messages
         else:
-            raise TypeError("actor must be a AutoGen GroupChat(team) or Agent instance")
\ No newline at end of file
+            raise TypeError("actor must be a AutoGen GroupChat(team) or Agent instance")
@@ -0,0 +1,369 @@
+import asyncio
+import functools
+import itertools
+import logging
+import multiprocessing
+import pickle
+import threading
+from multiprocessing.connection import Connection
+from multiprocessing.context import SpawnContext
+from typing import Any, AsyncGenerator, Dict, List, Sequence, Set, Tuple
+from autogen_agentchat.messages import ChatMessage
+
+from ..base.types import Registry, ReturnMessage
+
+logger = logging.getLogger(__name__)
+
+# request id of the message a worker sends once it serves requests, never used by a request
+_READY = -1
+
+
+def _pump(conn: Connection, loop: asyncio.AbstractEventLoop, inbox: "asyncio.Queue[Any]") -> None:
+    """
+    Forward every message received on the pipe to the event loop. None is forwarded once the pipe is closed.
+    """
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            break
+        loop.call_soon_threadsafe(inbox.put_nowait, message)
+    loop.call_soon_threadsafe(inbox.put_nowait, None)
+
+
+def _picklable_error(error: BaseException) -> BaseException:
+    try:
+        pickle.dumps(error)
+    except Exception:
+        return RuntimeError(f"{type(error).__name__}: {error}")
+    return error
+
+
+async def _execute(conn: Connection, model: Any, request_id: int, name: str, messages: List[ChatMessage], stream: bool) -> None:
+    try:
+        if stream:
+            async for chunk in model.run_stream(name, messages):
+                conn.send(("chunk", request_id, chunk))
+            conn.send(("done", request_id, None))
+        else:
+            conn.send(("done", request_id, await model.run(name, messages)))
+    except asyncio.CancelledError:
+        pass
+    except Exception as e:
+        conn.send(("error", request_id, _picklable_error(e)))
+
+
+def _forget_task(tasks: Dict[int, "asyncio.Task[None]"], request_id: int, _: "asyncio.Task[None]") -> None:
+    tasks.pop(request_id, None)
+
+
+async def _serve(conn: Connection, registries: List[Registry]) -> None:
+    from ._model import Model
+
+    model = Model()
+    for registry in registries:
+        model._registry[registry.name] = registry
+    loop = asyncio.get_running_loop()
+    inbox: "asyncio.Queue[Any]" = asyncio.Queue()
+    threading.Thread(target=_pump, args=(conn, loop, inbox), daemon=True).start()
+    conn.send(("ready", _READY, None))
+    tasks: Dict[int, asyncio.Task[None]] = {}
+    while True:
+        message = await inbox.get()
+        if message is None or message[0] == "stop":
+            break
+        kind = message[0]
+        if kind == "run":
+            _, request_id, name, messages, stream = message
+            task = asyncio.create_task(_execute(conn, model, request_id, name, messages, stream))
+            tasks[request_id] = task
+            task.add_done_callback(functools.partial(_forget_task, tasks, request_id))
+        elif kind == "cancel":
+            running = tasks.get(message[1])
+            if running is not None:
+                running.cancel()
+        elif kind == "register":
+            model._registry[message[1].name] = message[1]
+    for task in list(tasks.values()):
+        task.cancel()
+    await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+
+def _worker_main(conn: Connection, registries: List[Registry]) -> None:
+    """
+    Entry point of a worker process. Runs its own event loop with its own copy of the registry.
+    """
+    asyncio.run(_serve(conn, registries))
+
+
+_MAX_RESTART_BACKOFF = 60.0
+
+
+class _Worker:
+    """
+    One worker process, the parent end of its pipe and the requests it is running.
+    """
+    def __init__(self, process: multiprocessing.process.BaseProcess, conn: Connection, crashes: int) -> None:
+        self.process = process
+        self.conn = conn
+        # a worker exiting before it is ready crashed at startup
+        self.ready = False
+        # consecutive crashes at startup of the workers this one replaces
+        self.crashes = crashes
+        self.in_flight: Dict[int, "asyncio.Queue[Tuple[str, Any]]"] = {}
+        # sends run in threads, a message must not be interleaved with another one
+        self._send_lock = threading.Lock()
+
+    def send(self, message: Tuple[Any, ...]) -> bool:
+        """
+        Send a message to the worker, blocking while it is pickled and written.
+        Returns False if the pipe is closed.
+        """
+        with self._send_lock:
+            try:
+                self.conn.send(message)
+            except OSError:
+                return False
+        return True
+
+
+class ProcessPool:
+    """
+    Runs models in a pool of worker processes, each holding its own loaded registry and event loop.
+
+    A blocking or CPU-heavy run only stalls the requests of its own worker, never the server event loop.
+    Requests go to the worker with the fewest requests in flight, and `ReturnMessage` chunks stream back over pipes.
+    A worker that exits fails its in-flight requests and is replaced by a new one. A worker crashing at startup
+    is replaced after an exponential backoff, and given up after `max_restarts` crashes in a row.
+    Requests are pickled and sent to the workers off the event loop.
+    The worker processes are started with the "spawn" method, so the entry script of the
+    server must be guarded by `if __name__ == "__main__":`.
+    """
+    def __init__(
+        self,
+        registry: Dict[str, Registry],
+        workers: int,
+        max_restarts: int = 5,
+        restart_backoff: float = 1.0,
+    ) -> None:
+        """
+        Initialize the process pool.
+
+        Args:
+            registry (Dict[str, Registry]): The registry shared with the workers, read each time a worker is spawned.
+            workers (int): The number of worker processes.
+            max_restarts (int): The number of consecutive crashes at startup after which a worker is not replaced.
+            restart_backoff (float): Seconds before replacing a worker after its first crash at startup,
+                doubled with every further crash.
+
+        Raises:
+            ValueError: If workers is less than 1.
+        """
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self._registry = registry
+        self._size = workers
+        self._max_restarts = max_restarts
+        self._restart_backoff = restart_backoff
+        # forking would copy the threads and event loop of the server into the worker
+        self._context: SpawnContext = multiprocessing.get_context("spawn")
+        self._workers: List[_Worker] = []
+        self._request_ids = itertools.count()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._started = False
+        self._stopping = False
+        self._respawns = 0
+        self._given_up = 0
+        self._pending_respawns: Set[asyncio.TimerHandle] = set()
+
+    def _spawn(self, crashes: int = 0) -> _Worker:
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(child_conn, list(self._registry.values())),
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        worker = _Worker(process, parent_conn, crashes)
+        threading.Thread(target=self._read, args=(worker,), daemon=True).start()
+        return worker
+
+    def _read(self, worker: _Worker) -> None:
+        assert self._loop is not None
+        while True:
+            try:
+                message = worker.conn.recv()
+            except (EOFError, OSError):
+                break
+            self._loop.call_soon_threadsafe(self._deliver, worker, message)
+        self._loop.call_soon_threadsafe(self._on_exit, worker)
+
+    def _deliver(self, worker: _Worker, message: Tuple[str, int, Any]) -> None:
+        kind, request_id, payload = message
+        if request_id == _READY:
+            worker.ready = True
+            return
+        queue = worker.in_flight.get(request_id)
+        if queue is not None:
+            queue.put_nowait((kind, payload))
+
+    def _on_exit(self, worker: _Worker) -> None:
+        worker.conn.close()
+        for queue in worker.in_flight.values():
+            queue.put_nowait(("error", RuntimeError("model worker process exited")))
+        worker.in_flight.clear()
+        if self._stopping or worker not in self._workers:
+            return
+        assert self._loop is not None
+        self._workers.remove(worker)
+        crashes = 0 if worker.ready else worker.crashes + 1
+        if crashes > self._max_restarts:
+            logger.error(
+                "Model worker process %s exited with code %s, it crashed %d times at startup and is not respawned",
+                worker.process.pid, worker.process.exitcode, crashes,
+            )
+            self._given_up += 1
+            return
+        delay = min(self._restart_backoff * 2 ** (crashes - 1), _MAX_RESTART_BACKOFF) if crashes else 0.0
+        logger.error(
+            "Model worker process %s exited with code %s, respawning in %.1f seconds",
+            worker.process.pid, worker.process.exitcode, delay,
+        )
+        handle = self._loop.call_later(delay, lambda: self._respawn(handle, crashes))
+        self._pending_respawns.add(handle)
+
+    def _respawn(self, handle: asyncio.TimerHandle, crashes: int) -> None:
+        self._pending_respawns.discard(handle)
+        self._respawns += 1
+        self._workers.append(self._spawn(crashes))
+
+    async def start(self) -> None:
+        """
+        Start the worker processes.
+        """
+        if self._started:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._started = True
+        self._stopping = False
+        self._workers = [self._spawn() for _ in range(self._size)]
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """
+        Stop the worker processes, terminating the ones that do not exit in time.
+
+        Args:
+            timeout (float): Seconds to wait for each worker to exit.
+        """
+        self._stopping = True
+        self._started = False
+        for handle in self._pending_respawns:
+            handle.cancel()
+        self._pending_respawns.clear()
+        workers, self._workers = self._workers, []
+        for worker in workers:
+            await asyncio.to_thread(worker.send, ("stop",))
+        for worker in workers:
+            await asyncio.to_thread(worker.process.join, timeout)
+            if worker.process.is_alive():
+                worker.process.terminate()
+
+    def register(self, registry: Registry) -> None:
+        """
+        Send a registration to the running workers. Workers spawned later read it from the shared registry.
+
+        Args:
+            registry (Registry): The registered model.
+        """
+        for worker in self._workers:
+            worker.send(("register", registry))
+
+    async def _submit(
+        self,
+        name: str,
+        messages: Sequence[ChatMessage],
+        stream: bool,
+    ) -> AsyncGenerator[Tuple[str, Any], None]:
+        if not self._started:
+            await self.start()
+        if not self._workers:
+            raise RuntimeError("no model worker process is available")
+        worker = min(self._workers, key=lambda w: len(w.in_flight))
+        request_id = next(self._request_ids)
+        queue: "asyncio.Queue[Tuple[str, Any]]" = asyncio.Queue()
+        worker.in_flight[request_id] = queue
+        finished = False
+        try:
+            # the messages can be large, they are pickled and written off the event loop
+            if not await asyncio.to_thread(worker.send, ("run", request_id, name, list(messages), stream)):
+                raise RuntimeError("model worker process is not available")
+            while True:
+                kind, payload = await queue.get()
+                if kind == "error":
+                    finished = True
+                    raise payload
+                finished = kind == "done"
+                yield kind, payload
+                if finished:
+                    return
+        finally:
+            if worker.in_flight.pop(request_id, None) is not None and not finished:
+                # the caller went away, stop the run in the worker, without waiting for a send in progress
+                assert self._loop is not None
+                self._loop.run_in_executor(None, worker.send, ("cancel", request_id))
+
+    async def run_stream(self, name: str, messages: Sequence[ChatMessage]) -> AsyncGenerator[ReturnMessage, None]:
+        """
+        Run the model in a worker process, streaming the results.
+
+        Args:
+            name (str): The name of the model.
+            messages (Sequence[ChatMessage]): The messages to send to the model.
+
+        Yields:
+            ReturnMessage: The streamed results from the model.
+
+        Raises:
+            RuntimeError: If the worker process exits during the run.
+        """
+        async for kind, payload in self._submit(name, messages, stream=True):
+            if kind == "chunk":
+                yield payload
+
+    async def run(self, name: str, messages: Sequence[ChatMessage]) -> ReturnMessage:
+        """
+        Run the model in a worker process, returning the result.
+
+        Args:
+            name (str): The name of the model.
+            messages (Sequence[ChatMessage]): The messages to send to the model.
+
+        Returns:
+            ReturnMessage: The result from the model.
+
+        Raises:
+            RuntimeError: If the worker process exits during the run.
+        """
+        result: ReturnMessage | None = None
+        async for _, payload in self._submit(name, messages, stream=False):
+            result = payload
+        assert result is not None
+        return result
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the process pool statistics.
+
+        Returns:
+            Dict[str, int]: Number of workers, live workers, respawned workers, workers given up after crashing
+                at startup and requests in flight.
+        """
+        return {
+            "workers": self._size,
+            "alive": sum(1 for worker in self._workers if worker.process.is_alive()),
+            "respawns": self._respawns,
+            "given_up": self._given_up,
+            "in_flight": sum(len(worker.in_flight) for worker in self._workers),
+        }
@@ -0,0 +1,180 @@
+import asyncio
+import logging
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, Hashable, List, Sequence
+from autogen_agentchat.messages import ChatMessage
+
+from ..base.types import ReturnMessage
+
+logger = logging.getLogger(__name__)
+
+
+def request_key(name: str, messages: Sequence[ChatMessage], owner: str | None = None) -> Hashable:
+    """
+    Build the key identifying identical requests.
+    Requests of different API keys are never identical, every key is billed for its own run.
+    Args:
+        name (str): The name of the model.
+        messages (Sequence[ChatMessage]): The messages sent to the model.
+        owner (str | None): The name of the API key of the request.
+    Returns:
+        Hashable: A key that is equal for requests with the same API key, model and messages.
+    """
+    return (owner, name, tuple((type(m).__name__, m.source, m.to_text()) for m in messages))
+
+
+class _Call:
+    """
+    One in-flight non-streaming run shared by every caller.
+    """
+    def __init__(self, task: "asyncio.Future[Any]") -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class _StreamFlight:
+    """
+    One in-flight streaming run shared by every subscriber.
+    Chunks are buffered, so late subscribers replay the chunks they missed.
+    """
+    def __init__(self) -> None:
+        self.chunks: List[ReturnMessage] = []
+        self.done = False
+        self.error: BaseException | None = None
+        self.subscribers = 0
+        self.task: asyncio.Task[None] | None = None
+        self._updated = asyncio.Event()
+
+    def publish(self, chunk: ReturnMessage) -> None:
+        self.chunks.append(chunk)
+        self._updated.set()
+        self._updated = asyncio.Event()
+
+    def finish(self, error: BaseException | None = None) -> None:
+        self.done = True
+        self.error = error
+        self._updated.set()
+
+    async def subscribe(self) -> AsyncGenerator[ReturnMessage, None]:
+        idx = 0
+        while True:
+            if idx < len(self.chunks):
+                yield self.chunks[idx]
+                idx += 1
+            elif self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            else:
+                await self._updated.wait()
+
+
+class SingleFlight:
+    """
+    Collapses identical concurrent requests into one execution.
+    Non-streaming followers await the result of the leader, streaming followers get the same chunk sequence.
+    """
+    def __init__(self) -> None:
+        self._calls: Dict[Hashable, _Call] = {}
+        self._streams: Dict[Hashable, _StreamFlight] = {}
+        self._runs = 0
+        self._collapsed = 0
+
+    async def run(self, key: Hashable, runner: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run the coroutine returned by `runner`, or attach to an identical run already in flight.
+        The run is cancelled once every caller is gone.
+        Args:
+            key (Hashable): The request key.
+            runner (Callable[[], Awaitable[Any]]): Starts the execution.
+        Returns:
+            Any: The shared result.
+        """
+        call = self._calls.get(key)
+        if call is None:
+            self._runs += 1
+            call = _Call(asyncio.ensure_future(runner()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(self._calls, key, call))
+        else:
+            self._collapsed += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # forget it now, a caller arriving before the done callback must not attach to the cancelled run
+                self._forget(self._calls, key, call)
+                call.task.cancel()
+
+    @staticmethod
+    def _forget(flights: Dict[Hashable, Any], key: Hashable, flight: Any) -> None:
+        if flights.get(key) is flight:
+            del flights[key]
+
+    async def run_stream(
+        self,
+        key: Hashable,
+        runner: Callable[[], AsyncGenerator[ReturnMessage, None]],
+    ) -> AsyncGenerator[ReturnMessage, None]:
+        """
+        Stream the chunks of the generator returned by `runner`, or attach to an identical stream already in flight.
+        The run is cancelled once every subscriber is gone.
+        Args:
+            key (Hashable): The request key.
+            runner (Callable[[], AsyncGenerator[ReturnMessage, None]]): Starts the execution.
+        Yields:
+            ReturnMessage: The shared chunks, from the first one.
+        """
+        flight = self._streams.get(key)
+        if flight is None:
+            self._runs += 1
+            flight = _StreamFlight()
+            self._streams[key] = flight
+            flight.task = asyncio.create_task(self._produce(key, flight, runner))
+        else:
+            self._collapsed += 1
+
+        flight.subscribers += 1
+        try:
+            async for chunk in flight.subscribe():
+                yield chunk
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done and flight.task is not None:
+                self._forget(self._streams, key, flight)
+                flight.task.cancel()
+
+    async def _produce(
+        self,
+        key: Hashable,
+        flight: _StreamFlight,
+        runner: Callable[[], AsyncGenerator[ReturnMessage, None]],
+    ) -> None:
+        try:
+            async for chunk in runner():
+                flight.publish(chunk)
+        except asyncio.CancelledError:
+            flight.finish(asyncio.CancelledError())
+        except Exception as e:
+            logger.error("Shared stream run failed: %s", e)
+            flight.finish(e)
+        else:
+            flight.finish()
+        finally:
+            self._forget(self._streams, key, flight)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the coalescing statistics.
+
+        Returns:
+            Dict[str, int]: Number of executed runs, collapsed requests and runs in flight.
+        """
+        return {
+            "runs": self._runs,
+            "collapsed": self._collapsed,
+            "in_flight": len(self._calls) + len(self._streams),
+        }
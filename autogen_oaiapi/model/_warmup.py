@@ -0,0 +1,41 @@
+from typing import Any, Dict, List, Mapping
+from autogen_core import ComponentModel
+
+_REPLAY_PROVIDER = "autogen_ext.models.replay.ReplayChatCompletionClient"
+# every capability on, so agents with tools or structured output accept the stub client
+_STUB_MODEL_INFO = {
+    "vision": True,
+    "function_calling": True,
+    "json_output": True,
+    "family": "unknown",
+    "structured_output": True,
+}
+WARMUP_TASK = "ping"
+
+
+def stub_model_clients(component: ComponentModel, responses: List[str]) -> ComponentModel:
+    """
+    Copy a component dump with every model client replaced by a replay client, so the actor can run without an LLM.
+
+    Args:
+        component (ComponentModel): The component dump of a registered team or agent.
+        responses (List[str]): The responses every replay client answers with, in order.
+
+    Returns:
+        ComponentModel: The component dump with replay clients.
+    """
+    def replace(value: Any) -> Any:
+        if isinstance(value, Mapping):
+            if value.get("component_type") == "model" and "provider" in value:
+                return {
+                    "provider": _REPLAY_PROVIDER,
+                    "component_type": "replay_chat_completion_client",
+                    "config": {"chat_completions": list(responses), "model_info": dict(_STUB_MODEL_INFO)},
+                }
+            return {key: replace(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [replace(item) for item in value]
+        return value
+
+    stubbed: Dict[str, Any] = replace(component.model_dump())
+    return ComponentModel.model_validate(stubbed)
@@ -0,0 +1,17 @@
+from .log_pipeline import StructuredLogging, JSONFormatter, request_id_var, model_var
+from .profiling import Profiler, ProfileReport, PROFILE_HEADER
+from .loop_monitor import LoopLagMonitor
+from .memory import MemoryTracker, ModelMemoryStats
+
+__all__ = [
+    "StructuredLogging",
+    "JSONFormatter",
+    "request_id_var",
+    "model_var",
+    "Profiler",
+    "ProfileReport",
+    "PROFILE_HEADER",
+    "LoopLagMonitor",
+    "MemoryTracker",
+    "ModelMemoryStats",
+]
@@ -0,0 +1,172 @@
+import contextvars
+import json
+import logging
+import queue
+import random
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, List, Optional
+
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+model_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("model", default=None)
+
+# attributes every LogRecord has, anything else was passed with `extra=` and becomes a JSON field
+_RECORD_ATTRIBUTES = frozenset(
+    vars(logging.LogRecord("", logging.INFO, "", 0, "", None, None)).keys()
+) | {"message", "asctime", "access"}
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Format a log record as one JSON object per line, with the `extra=` fields of the call as top-level keys.
+    """
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and value is not None:
+                entry[key] = value
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _ContextFilter(logging.Filter):
+    """
+    Attach the request id and model of the current request to records that do not carry them.
+    """
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "request_id", None) is None:
+            record.request_id = request_id_var.get()
+        if getattr(record, "model", None) is None:
+            record.model = model_var.get()
+        return True
+
+
+class _AccessSampler(logging.Filter):
+    """
+    Keep a fraction of the INFO access records, records logged with `extra={"access": True}`.
+    """
+    def __init__(self, rate: float) -> None:
+        super().__init__()
+        self.rate = rate
+        self.dropped = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno == logging.INFO and getattr(record, "access", False) and random.random() >= self.rate:
+            self.dropped += 1
+            return False
+        return True
+
+
+class _DroppingQueueHandler(QueueHandler):
+    """
+    Queue handler that never blocks the caller: records are dropped and counted when the queue is full.
+    """
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]") -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._exception_formatter = logging.Formatter()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # resolve the message and the traceback here, the arguments may change before the listener writes the record
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = self._exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class StructuredLogging:
+    """
+    Non-blocking JSON logging for the loggers of the server.
+
+    Records are put on a bounded queue on the calling thread and written by a `QueueListener` thread,
+    so slow stdout or disk writes do not block the event loop. When the queue is full, records are dropped and counted.
+    Every record carries the request id and model of the request that logged it. INFO access records can be
+    sampled at high request rates; warnings and errors are always kept.
+
+    Args:
+        level (int): The level of the configured logger.
+        handlers (Optional[List[logging.Handler]]): The handlers writing the records, on the listener thread.
+            Defaults to a stream handler on stderr. Handlers without a formatter get a JSONFormatter.
+        access_sample_rate (float): The fraction of INFO access records that is kept, between 0 and 1.
+        queue_size (int): The maximum number of records waiting for the listener.
+        logger_name (str): The logger to configure. Its records no longer propagate to the root logger while started.
+    """
+    def __init__(
+        self,
+        level: int = logging.INFO,
+        handlers: Optional[List[logging.Handler]] = None,
+        access_sample_rate: float = 1.0,
+        queue_size: int = 10000,
+        logger_name: str = "autogen_oaiapi",
+    ) -> None:
+        if not 0.0 <= access_sample_rate <= 1.0:
+            raise ValueError("access_sample_rate must be between 0 and 1")
+        self._level = level
+        self._handlers = handlers or [logging.StreamHandler(sys.stderr)]
+        for handler in self._handlers:
+            if handler.formatter is None:
+                handler.setFormatter(JSONFormatter())
+        self._logger = logging.getLogger(logger_name)
+        self._queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=queue_size)
+        self._queue_handler = _DroppingQueueHandler(self._queue)
+        self._queue_handler.addFilter(_ContextFilter())
+        self._sampler = _AccessSampler(access_sample_rate)
+        self._queue_handler.addFilter(self._sampler)
+        self._listener: Optional[QueueListener] = None
+        self._previous: Optional[tuple[int, bool]] = None
+
+    def start(self) -> None:
+        """
+        Attach the queue handler to the logger and start the listener thread.
+        """
+        if self._listener is not None:
+            return
+        self._previous = (self._logger.level, self._logger.propagate)
+        self._logger.setLevel(self._level)
+        self._logger.propagate = False
+        self._logger.addHandler(self._queue_handler)
+        self._listener = QueueListener(self._queue, *self._handlers, respect_handler_level=True)
+        self._listener.start()
+
+    def stop(self) -> None:
+        """
+        Detach the queue handler and stop the listener thread once the queued records are written.
+        """
+        if self._listener is None:
+            return
+        self._logger.removeHandler(self._queue_handler)
+        if self._previous is not None:
+            self._logger.setLevel(self._previous[0])
+            self._logger.propagate = self._previous[1]
+        self._listener.stop()
+        self._listener = None
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the logging statistics.
+
+        Returns:
+            Dict[str, int]: Records waiting for the listener, records dropped on a full queue and sampled out access records.
+        """
+        return {
+            "queued": self._queue.qsize(),
+            "dropped": self._queue_handler.dropped,
+            "sampled_out": self._sampler.dropped,
+        }
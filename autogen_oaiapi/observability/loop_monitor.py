@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Any, Dict, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# upper bounds of the lag histogram buckets in milliseconds, the last bucket is unbounded
+LAG_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+class LoopLagMonitor:
+    """
+    Measures how late the event loop wakes up a probe that sleeps `interval` seconds.
+
+    The lag of every probe goes into a histogram. A watchdog thread checks the probe in between, and when the loop
+    has not woken it for `block_threshold` seconds, logs the stack the loop thread is running, that is the code
+    blocking the loop. With `shed_above` set, the server sheds new chat completion requests with 503 "overloaded"
+    while the smoothed lag stays above it.
+
+    Args:
+        interval (float): The sleep of the probe in seconds.
+        block_threshold (float): Log the stack of the loop thread when it is blocked longer than this.
+        shed_above (Optional[float]): Shed new chat completion requests while the smoothed lag is above this many seconds. Never sheds when None.
+        smoothing (float): The weight of the last probe in the smoothed lag, between 0 and 1.
+        buckets_ms (Sequence[float]): The upper bounds of the histogram buckets in milliseconds.
+    """
+    def __init__(
+        self,
+        interval: float = 0.1,
+        block_threshold: float = 0.5,
+        shed_above: Optional[float] = None,
+        smoothing: float = 0.3,
+        buckets_ms: Sequence[float] = LAG_BUCKETS_MS,
+    ) -> None:
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        if not 0.0 < smoothing <= 1.0:
+            raise ValueError("smoothing must be between 0 and 1")
+        self._interval = interval
+        self._block_threshold = block_threshold
+        self._shed_above = shed_above
+        self._smoothing = smoothing
+        self._buckets_ms = tuple(sorted(buckets_ms))
+        self._counts = [0] * (len(self._buckets_ms) + 1)
+        self._probes = 0
+        self._last_lag = 0.0
+        self._smoothed_lag = 0.0
+        self._max_lag = 0.0
+        self._blocked = 0
+        self._shed = 0
+        # perf_counter time at which the probe should wake up, read by the watchdog thread
+        self._expected_wake = 0.0
+        self._reported_wake = 0.0
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task[None]] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def _record(self, lag: float) -> None:
+        self._probes += 1
+        self._last_lag = lag
+        self._smoothed_lag += self._smoothing * (lag - self._smoothed_lag)
+        if lag > self._max_lag:
+            self._max_lag = lag
+        lag_ms = lag * 1000
+        for idx, bound in enumerate(self._buckets_ms):
+            if lag_ms <= bound:
+                self._counts[idx] += 1
+                break
+        else:
+            self._counts[-1] += 1
+
+    async def _probe(self) -> None:
+        while True:
+            self._expected_wake = time.perf_counter() + self._interval
+            await asyncio.sleep(self._interval)
+            self._record(max(0.0, time.perf_counter() - self._expected_wake))
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self._interval):
+            expected_wake = self._expected_wake
+            blocked = time.perf_counter() - expected_wake
+            if blocked < self._block_threshold or expected_wake == self._reported_wake:
+                continue
+            # report every blocking once
+            self._reported_wake = expected_wake
+            self._blocked += 1
+            frame = sys._current_frames().get(self._loop_thread) if self._loop_thread is not None else None
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else "<unknown>"
+            logger.warning("Event loop blocked for more than %.3fs in:\n%s", blocked, stack)
+
+    async def start(self) -> None:
+        """
+        Start the probe and the watchdog thread. Called once when the server starts.
+        """
+        if self._task is not None:
+            return
+        self._loop_thread = threading.get_ident()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._probe())
+        self._watchdog = threading.Thread(target=self._watch, name="autogen-oaiapi-loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        """
+        Stop the probe and the watchdog thread. Called once when the server shuts down.
+        """
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._stop.set()
+        if self._watchdog is not None:
+            await asyncio.to_thread(self._watchdog.join)
+            self._watchdog = None
+
+    @property
+    def lag(self) -> float:
+        """
+        Get the smoothed lag, including the time an overdue probe is late right now.
+
+        Returns:
+            float: The lag in seconds.
+        """
+        if self._task is None:
+            return 0.0
+        return max(self._smoothed_lag, time.perf_counter() - self._expected_wake)
+
+    def should_shed(self) -> bool:
+        """
+        Check whether a new request should be shed, and count it if so.
+
+        Returns:
+            bool: True while the smoothed lag is above `shed_above`.
+        """
+        if self._shed_above is None or self.lag <= self._shed_above:
+            return False
+        self._shed += 1
+        return True
+
+    @property
+    def overloaded(self) -> bool:
+        """
+        Check whether the smoothed lag is above `shed_above`, without counting a shed request.
+
+        Returns:
+            bool: True while new chat completion requests are shed.
+        """
+        return self._shed_above is not None and self.lag > self._shed_above
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the loop lag statistics.
+
+        Returns:
+            Dict[str, Any]: The last, smoothed and largest lag in seconds, the lag histogram with its bucket
+                upper bounds in milliseconds, the number of blockings logged and of requests shed.
+        """
+        histogram = {f"le_{bound:g}ms": count for bound, count in zip(self._buckets_ms, self._counts[:-1], strict=True)}
+        histogram["inf"] = self._counts[-1]
+        return {
+            "interval": self._interval,
+            "probes": self._probes,
+            "last_lag": self._last_lag,
+            "smoothed_lag": self._smoothed_lag,
+            "max_lag": self._max_lag,
+            "histogram": histogram,
+            "blocked": self._blocked,
+            "shed": self._shed,
+        }
@@ -0,0 +1,208 @@
+import asyncio
+import time
+import tracemalloc
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+_IGNORED_FILES = (tracemalloc.__file__, "<frozen importlib._bootstrap>", "<frozen importlib._bootstrap_external>", "<unknown>")
+
+
+@dataclass
+class ModelMemoryStats:
+    """
+    Memory statistics of the runs of one model.
+
+    Args:
+        requests (int): Number of tracked runs.
+        total_retained_bytes (int): Summed traced memory still allocated at the end of the runs.
+        max_retained_bytes (int): Largest traced memory still allocated at the end of a run.
+        max_peak_bytes (int): Largest traced memory peak during a run, above the memory at its start.
+    """
+    requests: int = 0
+    total_retained_bytes: int = 0
+    max_retained_bytes: int = 0
+    max_peak_bytes: int = 0
+
+
+def _statistics(stats: List[Any], limit: int) -> List[Dict[str, Any]]:
+    entries = []
+    for stat in stats[:limit]:
+        frame = stat.traceback[0]
+        entry = {"location": f"{frame.filename}:{frame.lineno}", "size": stat.size, "count": stat.count}
+        if hasattr(stat, "size_diff"):
+            entry["size_diff"] = stat.size_diff
+            entry["count_diff"] = stat.count_diff
+        entries.append(entry)
+    return entries
+
+
+class MemoryTracker:
+    """
+    Opt-in `tracemalloc` instrumentation of the server.
+
+    Every model run records the traced memory it retained and the traced peak above the memory at its start.
+    Runs overlap on the event loop, so with concurrent requests both numbers include the allocations of the other
+    runs and are upper bounds; the peak is only reset when no tracked run is in progress.
+    Heap snapshots are kept by id to be compared later, taken off the event loop thread.
+    Tracing slows down every allocation, so the tracker is meant to be enabled while hunting a leak.
+
+    Args:
+        frames (int): The number of frames stored per traced allocation.
+        max_snapshots (int): The number of snapshots kept, the oldest are dropped first.
+    """
+    def __init__(self, frames: int = 1, max_snapshots: int = 4) -> None:
+        self._frames = frames
+        self._max_snapshots = max_snapshots
+        self._started_tracing = False
+        self._active = 0
+        self._models: Dict[str, ModelMemoryStats] = {}
+        self._snapshots: "OrderedDict[str, Tuple[float, tracemalloc.Snapshot]]" = OrderedDict()
+        self._next_id = 1
+
+    def start(self) -> None:
+        """
+        Start tracing the allocations, unless they are traced already. Called once when the server starts.
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self._frames)
+            self._started_tracing = True
+
+    def stop(self) -> None:
+        """
+        Stop tracing if this tracker started it and drop the snapshots. Called once when the server shuts down.
+        """
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        self._snapshots.clear()
+
+    @contextmanager
+    def track(self, model_name: str) -> Iterator[None]:
+        """
+        Attribute the traced memory of a run to its model.
+
+        Args:
+            model_name (str): The registered model name of the run.
+        """
+        if not tracemalloc.is_tracing():
+            yield
+            return
+        if self._active == 0:
+            tracemalloc.reset_peak()
+        self._active += 1
+        start = tracemalloc.get_traced_memory()[0]
+        try:
+            yield
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            self._active -= 1
+            stats = self._models.get(model_name)
+            if stats is None:
+                stats = self._models[model_name] = ModelMemoryStats()
+            retained = current - start
+            stats.requests += 1
+            stats.total_retained_bytes += retained
+            stats.max_retained_bytes = max(stats.max_retained_bytes, retained)
+            stats.max_peak_bytes = max(stats.max_peak_bytes, peak - start)
+
+    async def _take(self) -> Tuple[str, tracemalloc.Snapshot]:
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("memory tracing is not started")
+        snapshot = await asyncio.to_thread(tracemalloc.take_snapshot)
+        snapshot = snapshot.filter_traces([tracemalloc.Filter(False, pattern) for pattern in _IGNORED_FILES])
+        snapshot_id = str(self._next_id)
+        self._next_id += 1
+        self._snapshots[snapshot_id] = (time.time(), snapshot)
+        while len(self._snapshots) > self._max_snapshots:
+            self._snapshots.popitem(last=False)
+        return snapshot_id, snapshot
+
+    async def snapshot(self, limit: int = 20) -> Dict[str, Any]:
+        """
+        Take and keep a heap snapshot.
+
+        Args:
+            limit (int): The number of source lines with the most allocated memory to return.
+
+        Returns:
+            Dict[str, Any]: The snapshot id, the traced memory and the source lines with the most allocated memory.
+
+        Raises:
+            RuntimeError: If the allocations are not traced.
+        """
+        snapshot_id, snapshot = await self._take()
+        stats = await asyncio.to_thread(snapshot.statistics, "lineno")
+        return {
+            "id": snapshot_id,
+            "traced_bytes": sum(stat.size for stat in stats),
+            "top": _statistics(stats, limit),
+        }
+
+    async def diff(self, base_id: str, target_id: Optional[str] = None, limit: int = 20) -> Dict[str, Any]:
+        """
+        Compare a kept heap snapshot with a later one.
+
+        Args:
+            base_id (str): The id of the older snapshot.
+            target_id (Optional[str]): The id of the newer snapshot. A new snapshot is taken and kept when None.
+            limit (int): The number of source lines with the largest growth to return.
+
+        Returns:
+            Dict[str, Any]: The ids of both snapshots and the source lines whose allocated memory changed the most.
+
+        Raises:
+            KeyError: If a snapshot id is unknown or was dropped.
+            RuntimeError: If a new snapshot is needed and the allocations are not traced.
+        """
+        if base_id not in self._snapshots:
+            raise KeyError(f"snapshot '{base_id}' not found")
+        base = self._snapshots[base_id][1]
+        if target_id is None:
+            target_id, target = await self._take()
+        elif target_id in self._snapshots:
+            target = self._snapshots[target_id][1]
+        else:
+            raise KeyError(f"snapshot '{target_id}' not found")
+        stats = await asyncio.to_thread(target.compare_to, base, "lineno")
+        return {
+            "base": base_id,
+            "target": target_id,
+            "size_diff": sum(stat.size_diff for stat in stats),
+            "top": _statistics(stats, limit),
+        }
+
+    def snapshots(self) -> List[Dict[str, Any]]:
+        """
+        List the kept snapshots.
+
+        Returns:
+            List[Dict[str, Any]]: The id and creation time of every snapshot, oldest first.
+        """
+        return [{"id": snapshot_id, "created": created} for snapshot_id, (created, _) in self._snapshots.items()]
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the memory statistics.
+
+        Returns:
+            Dict[str, Any]: Whether allocations are traced, the traced and peak memory, and the memory per model.
+        """
+        traced, peak = tracemalloc.get_traced_memory()
+        return {
+            "tracing": tracemalloc.is_tracing(),
+            "traced_bytes": traced,
+            "peak_bytes": peak,
+            "snapshots": len(self._snapshots),
+            "models": {
+                name: {
+                    "requests": stats.requests,
+                    "avg_retained_bytes": stats.total_retained_bytes // stats.requests if stats.requests else 0,
+                    "max_retained_bytes": stats.max_retained_bytes,
+                    "max_peak_bytes": stats.max_peak_bytes,
+                }
+                for name, stats in self._models.items()
+            },
+        }
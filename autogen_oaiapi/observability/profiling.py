@@ -0,0 +1,177 @@
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from types import FrameType
+from typing import Any, Dict, List, Optional
+
+PROFILE_HEADER = "x-profile"
+
+
+@dataclass
+class ProfileReport:
+    """
+    The cProfile report of one request.
+
+    Args:
+        id (str): The request id of the profiled request.
+        path (str): The request path.
+        created (float): When the request finished, as a Unix timestamp.
+        seconds (float): Wall time from the start of the request to the end of its response body.
+        report (str): The pstats report.
+    """
+    id: str
+    path: str
+    created: float
+    seconds: float
+    report: str
+
+
+def _frame_name(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class Profiler:
+    """
+    On-demand profiling of the server, for keys allowed to use every model.
+
+    A request sent with the `x-profile` header is run under cProfile, from the start of the request to the end of
+    its response body, and its pstats report is kept for download. cProfile records the whole event loop thread,
+    so requests running at the same time show up in the report too, and one request is profiled at a time.
+    The sampling profiler records the stack of the event loop thread every `interval` seconds from another
+    thread, and returns collapsed stacks that flamegraph.pl or speedscope can render.
+    Nothing is installed when the server has no profiler.
+
+    Args:
+        max_reports (int): The number of request reports kept, the oldest are dropped first.
+        sort (str): The pstats sort key of the request reports.
+        max_sample_seconds (float): The longest sampling run.
+    """
+    def __init__(self, max_reports: int = 32, sort: str = "cumulative", max_sample_seconds: float = 60.0) -> None:
+        self._max_reports = max_reports
+        self._sort = sort
+        self._max_sample_seconds = max_sample_seconds
+        self._reports: "OrderedDict[str, ProfileReport]" = OrderedDict()
+        self._profiling = False
+        self._sampling = False
+        self._busy = 0
+        self._samples = 0
+
+    def begin(self) -> Optional[cProfile.Profile]:
+        """
+        Start profiling a request.
+
+        Returns:
+            Optional[cProfile.Profile]: The enabled profile, None when a request or a sampling run is being profiled.
+        """
+        if self._profiling or self._sampling:
+            self._busy += 1
+            return None
+        self._profiling = True
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile
+
+    def finish(self, profile: cProfile.Profile, request_id: str, path: str, started: float) -> None:
+        """
+        Stop profiling a request and keep its report.
+
+        Args:
+            profile (cProfile.Profile): The profile returned by `begin`.
+            request_id (str): The request id, used as report id.
+            path (str): The request path.
+            started (float): The `time.perf_counter()` at the start of the request.
+        """
+        profile.disable()
+        self._profiling = False
+        seconds = time.perf_counter() - started
+        out = io.StringIO()
+        pstats.Stats(profile, stream=out).sort_stats(self._sort).print_stats(50)
+        self._reports[request_id] = ProfileReport(
+            id=request_id, path=path, created=time.time(), seconds=seconds, report=out.getvalue()
+        )
+        while len(self._reports) > self._max_reports:
+            self._reports.popitem(last=False)
+
+    def reports(self) -> List[Dict[str, Any]]:
+        """
+        List the kept request reports, without their content.
+
+        Returns:
+            List[Dict[str, Any]]: The id, path, creation time and duration of every report, oldest first.
+        """
+        return [
+            {"id": report.id, "path": report.path, "created": report.created, "seconds": report.seconds}
+            for report in self._reports.values()
+        ]
+
+    def report(self, report_id: str) -> Optional[ProfileReport]:
+        """
+        Get a request report.
+
+        Args:
+            report_id (str): The request id of the profiled request.
+
+        Returns:
+            Optional[ProfileReport]: The report, None if it is unknown or was dropped.
+        """
+        return self._reports.get(report_id)
+
+    async def sample(self, seconds: float, interval: float = 0.005) -> str:
+        """
+        Sample the stack of the event loop thread for a while.
+
+        Args:
+            seconds (float): How long to sample, capped at `max_sample_seconds`.
+            interval (float): The time between two samples.
+
+        Returns:
+            str: One "frame;frame;frame count" line per distinct stack, root frame first.
+
+        Raises:
+            RuntimeError: If a request or another sampling run is being profiled.
+        """
+        if self._profiling or self._sampling:
+            raise RuntimeError("the profiler is busy")
+        self._sampling = True
+        loop_thread = threading.get_ident()
+        stacks: Counter[str] = Counter()
+        stop = threading.Event()
+
+        def run() -> None:
+            while not stop.wait(interval):
+                frame: Optional[FrameType] = sys._current_frames().get(loop_thread)
+                names: List[str] = []
+                while frame is not None:
+                    names.append(_frame_name(frame))
+                    frame = frame.f_back
+                if names:
+                    stacks[";".join(reversed(names))] += 1
+
+        sampler = threading.Thread(target=run, name="autogen-oaiapi-sampler", daemon=True)
+        sampler.start()
+        try:
+            await asyncio.sleep(min(seconds, self._max_sample_seconds))
+        finally:
+            stop.set()
+            await asyncio.to_thread(sampler.join)
+            self._sampling = False
+        self._samples += sum(stacks.values())
+        return "\n".join(f"{stack} {count}" for stack, count in stacks.most_common())
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the profiler statistics.
+
+        Returns:
+            Dict[str, int]: The kept reports, requests not profiled because the profiler was busy and the stacks sampled.
+        """
+        return {"reports": len(self._reports), "busy": self._busy, "samples": self._samples}
@@ -0,0 +1,7 @@
+from .fair import FairScheduler, TenantQueueStats, PRIORITY_CLASSES
+
+__all__ = [
+    "FairScheduler",
+    "TenantQueueStats",
+    "PRIORITY_CLASSES",
+]
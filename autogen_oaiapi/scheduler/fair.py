@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Deque, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+# scheduled in this order, a lower class only gets a slot when no higher class is waiting
+PRIORITY_CLASSES: Tuple[str, ...] = ("interactive", "batch")
+
+
+@dataclass
+class TenantQueueStats:
+    """
+    Queue statistics of one API key.
+
+    Args:
+        key_name (str): The name of the API key.
+        weight (float): The weight of the API key at its last request.
+        priority (str): The priority class of the API key at its last request.
+        scheduled (int): Number of requests that got an execution slot.
+        queued (int): Number of requests waiting for a slot right now.
+        running (int): Number of requests holding a slot right now.
+        total_wait_seconds (float): Summed queue wait of the scheduled requests.
+        max_wait_seconds (float): Longest queue wait of a scheduled request.
+    """
+    key_name: str
+    weight: float = 1.0
+    priority: str = "interactive"
+    scheduled: int = 0
+    queued: int = 0
+    running: int = 0
+    total_wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+
+
+class FairScheduler:
+    """
+    Hands out a fixed number of execution slots fairly across API keys.
+
+    Every key accumulates virtual time: the seconds its requests held a slot, divided by its weight.
+    When a slot is free, the waiting key with the least virtual time in the highest waiting priority class
+    gets it, so a key with weight 2 gets about twice the execution time of a key with weight 1 under contention.
+    Requests of one key are served in arrival order.
+    A key that was idle starts from the virtual time of the last scheduled request and can not bank idle time.
+    """
+    def __init__(self, max_concurrency: int) -> None:
+        """
+        Initialize the fair scheduler.
+
+        Args:
+            max_concurrency (int): The number of requests executed at the same time.
+
+        Raises:
+            ValueError: If max_concurrency is less than 1.
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self._max_concurrency = max_concurrency
+        self._running = 0
+        self._virtual_time = 0.0
+        # expected run seconds, charged when a slot is granted and corrected when it is released
+        self._expected_cost = 1.0
+        self._key_time: Dict[str, float] = {}
+        # a waiter gets the virtual time charged for its slot
+        self._queues: Dict[str, Dict[str, Deque["asyncio.Future[float]"]]] = {
+            priority: {} for priority in PRIORITY_CLASSES
+        }
+        self._tenants: Dict[str, TenantQueueStats] = {}
+
+    def _tenant(self, key_name: str, weight: float, priority: str) -> TenantQueueStats:
+        tenant = self._tenants.get(key_name)
+        if tenant is None:
+            tenant = self._tenants[key_name] = TenantQueueStats(key_name=key_name)
+        tenant.weight = weight
+        tenant.priority = priority
+        return tenant
+
+    def _grant(self, tenant: TenantQueueStats) -> float:
+        """
+        Take a slot for the key, charging the expected cost. Returns the charged virtual time, to be corrected by `_release`.
+        """
+        start = max(self._key_time.get(tenant.key_name, 0.0), self._virtual_time)
+        self._virtual_time = start
+        charged = self._expected_cost / tenant.weight
+        self._key_time[tenant.key_name] = start + charged
+        self._running += 1
+        tenant.running += 1
+        return charged
+
+    def _release(self, tenant: TenantQueueStats, run_seconds: float, charged: float) -> None:
+        self._running -= 1
+        tenant.running -= 1
+        # the expected cost moved with the other releases since the grant, the charge itself is corrected
+        self._key_time[tenant.key_name] += run_seconds / tenant.weight - charged
+        self._expected_cost = 0.9 * self._expected_cost + 0.1 * run_seconds
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        for priority in PRIORITY_CLASSES:
+            queues = self._queues[priority]
+            while self._running < self._max_concurrency and queues:
+                # O(number of waiting keys), which stays small compared to the cost of a team run
+                key_name = min(queues, key=lambda name: max(self._key_time.get(name, 0.0), self._virtual_time))
+                waiters = queues[key_name]
+                future = waiters.popleft()
+                if not waiters:
+                    del queues[key_name]
+                tenant = self._tenants[key_name]
+                tenant.queued -= 1
+                # the slot is taken here, so no other request can claim it before the waiter wakes up
+                future.set_result(self._grant(tenant))
+            if self._running >= self._max_concurrency:
+                return
+
+    def _forget_waiter(self, priority: str, tenant: TenantQueueStats, future: "asyncio.Future[float]") -> None:
+        waiters = self._queues[priority].get(tenant.key_name)
+        if waiters is not None and future in waiters:
+            waiters.remove(future)
+            tenant.queued -= 1
+            if not waiters:
+                del self._queues[priority][tenant.key_name]
+
+    def _has_waiters(self) -> bool:
+        return any(self._queues[priority] for priority in PRIORITY_CLASSES)
+
+    @asynccontextmanager
+    async def slot(self, key_name: str, weight: float = 1.0, priority: str = "interactive") -> AsyncIterator[None]:
+        """
+        Wait for an execution slot and hold it for the duration of the block.
+
+        Args:
+            key_name (str): The name of the API key of the request.
+            weight (float): The weight of the API key.
+            priority (str): The priority class of the request, one of PRIORITY_CLASSES.
+
+        Raises:
+            ValueError: If the priority class is unknown.
+        """
+        if priority not in self._queues:
+            raise ValueError(f"Unknown priority class: {priority}")
+        tenant = self._tenant(key_name, weight, priority)
+        enqueued_at = time.perf_counter()
+        if self._running < self._max_concurrency and not self._has_waiters():
+            charged = self._grant(tenant)
+        else:
+            future: "asyncio.Future[float]" = asyncio.get_running_loop().create_future()
+            self._queues[priority].setdefault(key_name, deque()).append(future)
+            tenant.queued += 1
+            try:
+                charged = await future
+            except asyncio.CancelledError:
+                if future.cancelled():
+                    self._forget_waiter(priority, tenant, future)
+                else:
+                    # the slot was granted while the waiter was being cancelled
+                    self._release(tenant, 0.0, future.result())
+                raise
+        wait_seconds = time.perf_counter() - enqueued_at
+        tenant.scheduled += 1
+        tenant.total_wait_seconds += wait_seconds
+        tenant.max_wait_seconds = max(tenant.max_wait_seconds, wait_seconds)
+
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._release(tenant, time.perf_counter() - started_at, charged)
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the scheduler statistics.
+
+        Returns:
+            Dict[str, Any]: Running and queued requests, and the queue statistics per API key.
+        """
+        return {
+            "max_concurrency": self._max_concurrency,
+            "running": self._running,
+            "queued": sum(t.queued for t in self._tenants.values()),
+            "tenants": {
+                key_name: {
+                    "weight": tenant.weight,
+                    "priority": tenant.priority,
+                    "scheduled": tenant.scheduled,
+                    "queued": tenant.queued,
+                    "running": tenant.running,
+                    "avg_wait_seconds": tenant.total_wait_seconds / tenant.scheduled if tenant.scheduled else 0.0,
+                    "max_wait_seconds": tenant.max_wait_seconds,
+                }
+                for key_name, tenant in self._tenants.items()
+            },
+        }
@@ -1,17 +1,32 @@
-from typing import Optional, Union
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
 from pathlib import Path
 from fastapi import FastAPI
 from autogen_oaiapi.app.router import register_routes
-from autogen_oaiapi.app.middleware import RequestContextMiddleware, APIKeyModelMiddleware
+from autogen_oaiapi.app.middleware import RequestContextMiddleware, APIKeyModelMiddleware, ProfilingMiddleware
 from autogen_oaiapi.app.exception_handlers import register_exception_handlers
+from autogen_oaiapi.app.responses import FastJSONResponse
 from autogen_oaiapi.session_manager.memory import InMemorySessionStore
 from autogen_oaiapi.session_manager.base import BaseSessionStore
-from autogen_oaiapi.model import Model
+from autogen_oaiapi.session_manager.response_store import ResponseStore
+from autogen_oaiapi.model import Model, BaseCheckpointStore
 from autogen_oaiapi.base import BaseKeyManager
 from autogen_oaiapi.manager.api_key._non_key_manager import NonKeyManager
 from autogen_agentchat.teams import BaseGroupChat
 from autogen_agentchat.agents import BaseChatAgent
 from autogen_oaiapi.manager.agents.agent_manager import AgentManager
+from autogen_oaiapi.usage import UsageLedger
+from autogen_oaiapi.scheduler import FairScheduler
+from autogen_oaiapi.tools import ToolExecutor
+from autogen_oaiapi.llm_cache import LLMCache
+from autogen_oaiapi.upstream import UpstreamGuard
+from autogen_oaiapi.history import BaseHistoryPolicy
+from autogen_oaiapi.message import StreamBuffer
+from autogen_oaiapi.observability import StructuredLogging, Profiler, LoopLagMonitor, MemoryTracker
+
+logger = logging.getLogger(__name__)
 
 class Server:
     """
@@ -23,6 +38,28 @@ class Server:
         source_select (Optional[str]): Name of the agent whose output should be selected.
         key_manager (Optional[BaseKeyManager]): Custom key manager for API key management. Defaults to NonKeyManager. NonKeyManager is used for no key management.
         session_store (Optional[BaseSessionStore]): Custom session store backend. Defaults to in-memory.
+        usage_ledger (Optional[UsageLedger]): Ledger recording token usage per API key and model. Defaults to an in-memory ledger.
+        coalesce_requests (bool): Run identical concurrent completion requests of one API key only once and share the result. Defaults to False.
+        scheduler (Optional[FairScheduler]): Scheduler sharing execution slots fairly across API keys. Requests are not queued when None.
+        workers (Optional[int]): Run the models in this many worker processes. The script starting the server must be guarded by `if __name__ == "__main__":`. Models run in the server process when None.
+        tool_executor (Optional[ToolExecutor]): Executor policy for the FunctionTools of the registered agents. Tools use the default executor of the event loop when None.
+        max_request_bytes (int): Largest accepted request body, larger requests are rejected with 413 while reading. Defaults to 16 MiB.
+        history_policy (Optional[BaseHistoryPolicy]): Shortens the message history before it reaches the teams given by `team`. The full history is passed when None.
+        stream_buffer (Optional[StreamBuffer]): Bounded buffer between streaming team runs and the clients. Defaults to 64 messages with the "block" policy.
+        warmup (bool): Build the actor of every registered model at startup, in the background. `/readyz` reports ready once it is done. Defaults to False.
+        warmup_run (bool): Also run every model once against a stub model client during the warm-up. Defaults to False.
+        ready_max_in_flight (Optional[int]): `/readyz` reports not ready while this many runs or more are in progress. No limit when None.
+        structured_logging (Optional[StructuredLogging]): Non-blocking JSON logging for the server loggers, started with the server. The logging configuration is left alone when None.
+        profiler (Optional[Profiler]): Profiles requests sent with the `x-profile` header and serves the `/v1/profiles` endpoints, for keys allowed to use every model. Profiling is off when None.
+        loop_monitor (Optional[LoopLagMonitor]): Measures the event loop lag, logs the code blocking the loop and optionally sheds chat completion requests while the loop lags. The loop is not monitored when None.
+        memory_tracker (Optional[MemoryTracker]): Traces allocations per model run and serves the `/v1/memory` snapshot endpoints, for keys allowed to use every model. Allocations are not traced when None.
+        checkpoint_every (Optional[int]): Checkpoint streamed team runs every this many agent turns, so a client reconnecting with `Last-Event-ID` resumes the run. Not available with `workers`. No checkpoints when None.
+        checkpoint_store (Optional[BaseCheckpointStore]): Stores the run checkpoints, kept apart from the session store. A bounded in-memory `CheckpointStore` when None, which only resumes runs in the same process. Use a `DiskCheckpointStore` to resume runs after a restart or on another worker sharing its directory.
+        socket_idle_timeout (Optional[float]): Close `/v1/chat/ws` connections without a running or pending turn after this many seconds. Connections stay open when None. Defaults to 300 seconds.
+        socket_max_pending (int): Turns a `/v1/chat/ws` connection may queue behind its running turn, further messages are rejected with an error frame. Defaults to 4.
+        response_store (Optional[ResponseStore]): Stores the turns of the `/v1/responses` endpoint, so the next turn only sends `previous_response_id` and its new input. The endpoint is off when None.
+        llm_cache (Optional[LLMCache]): Caches the model client calls made inside the teams given by `team`, e.g. repeated selector calls. Not applied inside `workers`. No cache when None.
+        upstream_guard (Optional[UpstreamGuard]): Adapts the concurrency of the calls to each upstream model endpoint and opens a circuit breaker when it fails, requests then fail fast with a 503 "overloaded" error. Not applied inside `workers`. Upstreams are not guarded when None.
     """
     def __init__(
             self,
@@ -30,12 +67,67 @@ class Server:
             output_idx: Optional[int] = None,
             source_select: Optional[str] = None,
             key_manager: Optional[BaseKeyManager] = None,
-            session_store: Optional[BaseSessionStore] = None
+            session_store: Optional[BaseSessionStore] = None,
+            usage_ledger: Optional[UsageLedger] = None,
+            coalesce_requests: bool = False,
+            scheduler: Optional[FairScheduler] = None,
+            workers: Optional[int] = None,
+            tool_executor: Optional[ToolExecutor] = None,
+            max_request_bytes: int = 16 * 1024 * 1024,
+            history_policy: Optional[BaseHistoryPolicy] = None,
+            stream_buffer: Optional[StreamBuffer] = None,
+            warmup: bool = False,
+            warmup_run: bool = False,
+            ready_max_in_flight: Optional[int] = None,
+            structured_logging: Optional[StructuredLogging] = None,
+            profiler: Optional[Profiler] = None,
+            loop_monitor: Optional[LoopLagMonitor] = None,
+            memory_tracker: Optional[MemoryTracker] = None,
+            checkpoint_every: Optional[int] = None,
+            checkpoint_store: Optional[BaseCheckpointStore] = None,
+            socket_idle_timeout: Optional[float] = 300.0,
+            socket_max_pending: int = 4,
+            response_store: Optional[ResponseStore] = None,
+            llm_cache: Optional[LLMCache] = None,
+            upstream_guard: Optional[UpstreamGuard] = None,
         ):
+        self._structured_logging = structured_logging
+        if self._structured_logging is not None:
+            # started here already, so the team loading below logs through it
+            self._structured_logging.start()
         self._session_store = session_store or InMemorySessionStore()
+        self._usage_ledger = usage_ledger or UsageLedger()
         self._key_manager = key_manager or NonKeyManager()
-        self._model = Model()
-        self.app = FastAPI()
+        self._scheduler = scheduler
+        self._max_request_bytes = max_request_bytes
+        self._stream_buffer = stream_buffer or StreamBuffer()
+        self._warmup = warmup
+        self._warmup_run = warmup_run
+        self._ready_max_in_flight = ready_max_in_flight
+        self._profiler = profiler
+        self._loop_monitor = loop_monitor
+        self._memory_tracker = memory_tracker
+        if socket_max_pending < 1:
+            raise ValueError("socket_max_pending must be at least 1")
+        self._socket_idle_timeout = socket_idle_timeout
+        self._socket_max_pending = socket_max_pending
+        self._response_store = response_store
+        self._upstream_guard = upstream_guard
+        self._warmup_task: Optional[asyncio.Task[None]] = None
+        self._warmup_results: Dict[str, str] = {}
+        self._started = False
+        self._warmed_up = False
+        self._model = Model(
+            coalesce=coalesce_requests,
+            workers=workers,
+            tool_executor=tool_executor,
+            session_store=self._session_store,
+            checkpoint_store=checkpoint_store,
+            checkpoint_every=checkpoint_every,
+            llm_cache=llm_cache,
+            upstream_guard=upstream_guard,
+        )
+        self.app = FastAPI(lifespan=self._lifespan, default_response_class=FastJSONResponse)
 
         # Handle team initialization
         if team is not None:
@@ -53,6 +145,7 @@ class Server:
                         actor=agent_manager.get_agent(agent),
                         source_select=source_select,
                         output_idx=output_idx,
+                        history_policy=history_policy,
                     )
             else:
                 self._model.register(
@@ -60,16 +153,101 @@ class Server:
                     actor=team,
                     source_select=source_select,
                     output_idx=output_idx,
+                    history_policy=history_policy,
                 )
         # Register routers, middlewares, and exception handlers
         register_routes(self.app)
         # server is passed to the app state for access in routes
         self.app.state.server = self
 
+        if self._profiler is not None:
+            # innermost, so the key is verified first
+            self.app.add_middleware(ProfilingMiddleware)
         self.app.add_middleware(APIKeyModelMiddleware)
         self.app.add_middleware(RequestContextMiddleware)
         register_exception_handlers(self.app)
 
+    @asynccontextmanager
+    async def _lifespan(self, app: FastAPI) -> AsyncIterator[None]:
+        """
+        Start and stop the background work of the server components with the application.
+
+        Args:
+            app (FastAPI): The FastAPI application.
+        """
+        if self._structured_logging is not None:
+            self._structured_logging.start()
+        await self._model.start()
+        await self._key_manager.start()
+        await self._usage_ledger.start()
+        if self._loop_monitor is not None:
+            await self._loop_monitor.start()
+        if self._memory_tracker is not None:
+            self._memory_tracker.start()
+        self._started = True
+        if self._warmup:
+            # in the background, so liveness probes are answered during the warm-up
+            self._warmup_task = asyncio.create_task(self._run_warmup())
+        else:
+            self._warmed_up = True
+        try:
+            yield
+        finally:
+            self._started = False
+            if self._warmup_task is not None:
+                self._warmup_task.cancel()
+                try:
+                    await self._warmup_task
+                except asyncio.CancelledError:
+                    pass
+                self._warmup_task = None
+            if self._memory_tracker is not None:
+                self._memory_tracker.stop()
+            if self._loop_monitor is not None:
+                await self._loop_monitor.stop()
+            await self._usage_ledger.stop()
+            await self._key_manager.stop()
+            await self._model.stop()
+            if self._structured_logging is not None:
+                await asyncio.to_thread(self._structured_logging.stop)
+
+    async def _run_warmup(self) -> None:
+        self._warmup_results = await self._model.warmup(run=self._warmup_run)
+        self._warmed_up = True
+        logger.info("Warm-up done: %s", self._warmup_results)
+
+    def readiness(self) -> Dict[str, Any]:
+        """
+        Check whether the server should receive traffic: it is started, the warm-up is done,
+        every worker process is alive, the event loop does not lag, no request waits for the scheduler and the runs in progress are below the limit.
+
+        Returns:
+            Dict[str, Any]: "ready", the reasons it is not ready, the warm-up result per model and the runs in progress.
+        """
+        reasons: List[str] = []
+        if not self._started:
+            reasons.append("not started")
+        elif not self._warmed_up:
+            reasons.append("warm-up in progress")
+        in_flight = self._model.in_flight
+        if self._ready_max_in_flight is not None and in_flight >= self._ready_max_in_flight:
+            reasons.append(f"{in_flight} runs in progress, limit is {self._ready_max_in_flight}")
+        process_pool_stats = self._model.process_pool_stats
+        if process_pool_stats is not None and process_pool_stats["alive"] < process_pool_stats["workers"]:
+            reasons.append(f"{process_pool_stats['alive']} of {process_pool_stats['workers']} workers alive")
+        if self._loop_monitor is not None and self._loop_monitor.overloaded:
+            reasons.append(f"event loop lag {self._loop_monitor.lag:.3f}s")
+        if self._scheduler is not None:
+            queued = self._scheduler.stats["queued"]
+            if queued:
+                reasons.append(f"{queued} requests queued")
+        return {
+            "ready": not reasons,
+            "reasons": reasons,
+            "warmup": self._warmup_results,
+            "in_flight": in_flight,
+        }
+
     @property
     def model(self) -> Model:
         """
@@ -100,6 +278,164 @@ class Server:
         """
         return self._key_manager
 
+    @property
+    def usage_ledger(self) -> UsageLedger:
+        """
+        Get the usage ledger instance.
+
+        Returns:
+            UsageLedger: The usage ledger instance.
+        """
+        return self._usage_ledger
+
+    @property
+    def max_request_bytes(self) -> int:
+        """
+        Get the largest accepted request body size.
+
+        Returns:
+            int: The size in bytes.
+        """
+        return self._max_request_bytes
+
+    @property
+    def stream_buffer(self) -> StreamBuffer:
+        """
+        Get the stream buffer instance.
+
+        Returns:
+            StreamBuffer: The stream buffer instance.
+        """
+        return self._stream_buffer
+
+    @property
+    def profiler(self) -> Optional[Profiler]:
+        """
+        Get the profiler instance.
+
+        Returns:
+            Optional[Profiler]: The profiler instance, None if profiling is off.
+        """
+        return self._profiler
+
+    @property
+    def loop_monitor(self) -> Optional[LoopLagMonitor]:
+        """
+        Get the event loop lag monitor instance.
+
+        Returns:
+            Optional[LoopLagMonitor]: The monitor instance, None if the loop is not monitored.
+        """
+        return self._loop_monitor
+
+    @property
+    def memory_tracker(self) -> Optional[MemoryTracker]:
+        """
+        Get the memory tracker instance.
+
+        Returns:
+            Optional[MemoryTracker]: The memory tracker instance, None if allocations are not traced.
+        """
+        return self._memory_tracker
+
+    @property
+    def socket_idle_timeout(self) -> Optional[float]:
+        """
+        Get the idle timeout of the chat socket connections.
+
+        Returns:
+            Optional[float]: The timeout in seconds, None if idle connections stay open.
+        """
+        return self._socket_idle_timeout
+
+    @property
+    def socket_max_pending(self) -> int:
+        """
+        Get the number of turns a chat socket connection may queue.
+
+        Returns:
+            int: The number of queued turns.
+        """
+        return self._socket_max_pending
+
+    @property
+    def response_store(self) -> Optional[ResponseStore]:
+        """
+        Get the response store instance.
+
+        Returns:
+            Optional[ResponseStore]: The response store instance, None if the `/v1/responses` endpoint is off.
+        """
+        return self._response_store
+
+    @property
+    def upstream_guard(self) -> Optional[UpstreamGuard]:
+        """
+        Get the upstream guard instance.
+
+        Returns:
+            Optional[UpstreamGuard]: The upstream guard instance, None if upstreams are not guarded.
+        """
+        return self._upstream_guard
+
+    @property
+    def scheduler(self) -> Optional[FairScheduler]:
+        """
+        Get the scheduler instance.
+
+        Returns:
+            Optional[FairScheduler]: The scheduler instance, None if requests are not queued.
+        """
+        return self._scheduler
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Collect the runtime statistics of the server components.
+
+        Returns:
+            Dict[str, Any]: The statistics per component, components without statistics are left out.
+        """
+        metrics: Dict[str, Any] = {"stream_buffer": self._stream_buffer.stats, "actors": self._model.actor_stats}
+        coalesce_stats = self._model.coalesce_stats
+        if coalesce_stats is not None:
+            metrics["coalescing"] = coalesce_stats
+        process_pool_stats = self._model.process_pool_stats
+        if process_pool_stats is not None:
+            metrics["process_pool"] = process_pool_stats
+        checkpoint_stats = self._model.checkpoint_stats
+        if checkpoint_stats is not None:
+            metrics["checkpoints"] = checkpoint_stats
+        history_stats = self._model.history_stats
+        if history_stats:
+            metrics["history"] = history_stats
+        tool_stats = self._model.tool_stats
+        if tool_stats is not None:
+            metrics["tools"] = tool_stats
+        llm_cache_stats = self._model.llm_cache_stats
+        if llm_cache_stats is not None:
+            metrics["llm_cache"] = llm_cache_stats
+        if self._scheduler is not None:
+            metrics["scheduler"] = self._scheduler.stats
+        session_stats = getattr(self._session_store, "stats", None)
+        if session_stats is not None:
+            metrics["sessions"] = session_stats
+        reload_stats = getattr(self._key_manager, "reload_stats", None)
+        if reload_stats is not None:
+            metrics["key_reload"] = reload_stats
+        if self._structured_logging is not None:
+            metrics["logging"] = self._structured_logging.stats
+        if self._profiler is not None:
+            metrics["profiler"] = self._profiler.stats
+        if self._loop_monitor is not None:
+            metrics["loop_lag"] = self._loop_monitor.stats
+        if self._memory_tracker is not None:
+            metrics["memory"] = self._memory_tracker.stats
+        if self._response_store is not None:
+            metrics["responses"] = self._response_store.stats
+        if self._upstream_guard is not None:
+            metrics["upstreams"] = self._upstream_guard.stats
+        return metrics
+
     def run(self, host: str = "0.0.0.0", port: int = 8000) -> None:
         """
         Start the FastAPI server using Uvicorn.
@@ -7,6 +7,7 @@ class BaseSessionStore(ABC):
     Abstract base class for session storage backends.
 
     Subclasses must implement get and set methods for session management.
+    Stores backed by I/O should also override `aget` and `aset`, which the server awaits on the event loop.
     """
     @abstractmethod
     def get(self, session_id: str) -> Optional[SessionContext]:
@@ -30,4 +31,28 @@ class BaseSessionStore(ABC):
             session_id (str): The session identifier.
             session_context (SessionContext): The session context to store.
         """
-        pass
\ No newline at end of file
+        pass
+
+    async def aget(self, session_id: str) -> Optional[SessionContext]:
+        """
+        Retrieve the session context for a given session ID without blocking the event loop.
+        The default delegates to `get`.
+
+        Args:
+            session_id (str): The session identifier.
+
+        Returns:
+            SessionContext: The session context object, or None if not found.
+        """
+        return self.get(session_id)
+
+    async def aset(self, session_id: str, session_context: SessionContext) -> None:
+        """
+        Store or update the session context for a given session ID without blocking the event loop.
+        The default delegates to `set`.
+
+        Args:
+            session_id (str): The session identifier.
+            session_context (SessionContext): The session context to store.
+        """
+        self.set(session_id, session_context)
\ No newline at end of file
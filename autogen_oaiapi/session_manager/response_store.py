@@ -0,0 +1,173 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+from autogen_oaiapi.session_manager.base import BaseSessionStore
+from autogen_oaiapi.session_manager.memory import InMemorySessionStore
+from ..base.types import SessionContext
+
+
+@dataclass
+class StoredResponse(SessionContext):
+    """
+    A completed turn of the `/v1/responses` endpoint, stored under its response id.
+
+    Args:
+        id (str): The response id.
+        model (str): The name of the model of the turn.
+        owner (Optional[str]): The name of the API key of the turn, only this key can read or continue it.
+        input (List[Tuple[str, str]]): The role and content of the input messages of the turn.
+        output (str): The output text of the turn.
+        team_state (Optional[Mapping[str, Any]]): The actor state after the turn, the next turn continues from it.
+            None for models whose state can not be kept, their next turn replays the inputs and outputs instead.
+        previous_response_id (Optional[str]): The response this turn continued.
+        created_at (int): The creation timestamp.
+        expires_at (float): The time the response expires, on the `time.time` clock.
+        usage (Tuple[int, int, int]): The input, output and total tokens of the turn.
+    """
+    id: str
+    model: str
+    owner: Optional[str]
+    input: List[Tuple[str, str]]
+    output: str
+    team_state: Optional[Mapping[str, Any]] = None
+    previous_response_id: Optional[str] = None
+    created_at: int = 0
+    expires_at: float = 0.0
+    usage: Tuple[int, int, int] = field(default=(0, 0, 0))
+
+
+def response_key(response_id: str) -> str:
+    """
+    Get the session store key of a stored response.
+
+    Args:
+        response_id (str): The response id.
+
+    Returns:
+        str: The session store key.
+    """
+    return f"response:{response_id}"
+
+
+class ResponseStore:
+    """
+    Bounded store of the turns of the `/v1/responses` endpoint, on top of a pluggable session store.
+
+    Responses expire `ttl_seconds` after they are stored, and the oldest ones are dropped beyond `max_responses`.
+    The bound is kept by an index of the responses stored by this process. Responses left in a persistent
+    backend by an earlier process are still found until they expire, but are not counted against the bound.
+    Backends without a `delete` method keep dropped responses, they are only hidden by the expiry check.
+
+    Args:
+        backend (Optional[BaseSessionStore]): The store of the responses. Defaults to an in-memory store.
+        max_responses (int): The number of responses kept.
+        ttl_seconds (float): The time a response can be read or continued.
+    """
+    def __init__(
+        self,
+        backend: Optional[BaseSessionStore] = None,
+        max_responses: int = 1000,
+        ttl_seconds: float = 3600.0,
+    ) -> None:
+        if max_responses < 1:
+            raise ValueError("max_responses must be at least 1")
+        self._backend = backend or InMemorySessionStore()
+        self._max_responses = max_responses
+        self._ttl_seconds = ttl_seconds
+        # response id -> expiry time, in storing order, which is also the expiry order
+        self._index: "OrderedDict[str, float]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._expired = 0
+        self._evicted = 0
+
+    @property
+    def ttl_seconds(self) -> float:
+        """
+        Get the time a response can be read or continued.
+
+        Returns:
+            float: The time in seconds.
+        """
+        return self._ttl_seconds
+
+    def _drop(self, response_id: str) -> None:
+        self._index.pop(response_id, None)
+        delete = getattr(self._backend, "delete", None)
+        if delete is not None:
+            delete(response_key(response_id))
+
+    def _evict(self, now: float) -> None:
+        while self._index:
+            response_id, expires_at = next(iter(self._index.items()))
+            if expires_at > now:
+                break
+            self._drop(response_id)
+            self._expired += 1
+        while len(self._index) > self._max_responses:
+            self._drop(next(iter(self._index)))
+            self._evicted += 1
+
+    def put(self, response: StoredResponse) -> None:
+        """
+        Store a response, setting its expiry time.
+
+        Args:
+            response (StoredResponse): The response to store.
+        """
+        now = time.time()
+        response.expires_at = now + self._ttl_seconds
+        self._backend.set(response_key(response.id), response)
+        self._index[response.id] = response.expires_at
+        self._index.move_to_end(response.id)
+        self._evict(now)
+
+    def get(self, response_id: str) -> Optional[StoredResponse]:
+        """
+        Get a stored response.
+
+        Args:
+            response_id (str): The response id.
+
+        Returns:
+            Optional[StoredResponse]: The response, None if it is unknown, expired or was dropped.
+        """
+        now = time.time()
+        self._evict(now)
+        response = self._backend.get(response_key(response_id))
+        if not isinstance(response, StoredResponse):
+            self._misses += 1
+            return None
+        if response.expires_at <= now:
+            self._drop(response_id)
+            self._expired += 1
+            self._misses += 1
+            return None
+        self._hits += 1
+        return response
+
+    def delete(self, response_id: str) -> None:
+        """
+        Delete a stored response.
+
+        Args:
+            response_id (str): The response id.
+        """
+        self._drop(response_id)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the response store statistics.
+
+        Returns:
+            Dict[str, int]: The stored responses, the found and missed lookups, and the expired and evicted responses.
+        """
+        return {
+            "stored": len(self._index),
+            "hits": self._hits,
+            "misses": self._misses,
+            "expired": self._expired,
+            "evicted": self._evicted,
+        }
@@ -0,0 +1,255 @@
+import asyncio
+import hashlib
+import logging
+import os
+import pickle
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from autogen_oaiapi.session_manager.base import BaseSessionStore
+from ..base.types import SessionContext
+
+try:
+    import psutil
+except ImportError:  # pragma: no cover - psutil is an optional dependency
+    psutil = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _current_rss() -> Optional[int]:
+    """
+    Get the resident set size of this process, None if it can not be read on this platform.
+    """
+    if psutil is not None:
+        return int(psutil.Process().memory_info().rss)
+    try:
+        with open("/proc/self/statm", "rb") as statm:
+            return int(statm.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+class TieredSessionStore(BaseSessionStore):
+    """
+    Session store keeping recently used sessions in memory and spilling the others to disk.
+
+    The hot tier is an LRU bounded by the pickled size of its sessions. Sessions leave it for the disk tier,
+    compressed with zlib, when the tier is over `max_hot_bytes`, when they were not used for `idle_seconds`,
+    or when the process is over `max_rss_bytes`. A spilled session is promoted back to the hot tier by `get`.
+    Spilling is done during `get` and `set`, there is no background task. The server calls `aget` and `aset`,
+    which run them in a thread, so pickling, compression and file I/O never block the event loop.
+    The store is guarded by a lock, it can be used from several threads.
+    Once the process is over `max_rss_bytes` with an empty hot tier, new sessions are written straight to disk.
+
+    Args:
+        dir_path (str): The directory of the disk tier.
+        max_hot_bytes (int): The largest pickled size of the hot sessions.
+        idle_seconds (Optional[float]): Spill sessions not used for this long. Sessions are only spilled for space when None.
+        max_rss_bytes (Optional[int]): The resident memory budget of the process. Read with psutil, or from /proc without it. No budget when None.
+        compress_level (int): The zlib level of the spilled sessions.
+        rss_check_seconds (float): The time between two reads of the resident memory.
+    """
+    def __init__(
+        self,
+        dir_path: str = "sessions",
+        max_hot_bytes: int = 64 * 1024 * 1024,
+        idle_seconds: Optional[float] = 300.0,
+        max_rss_bytes: Optional[int] = None,
+        compress_level: int = 1,
+        rss_check_seconds: float = 1.0,
+    ) -> None:
+        os.makedirs(dir_path, exist_ok=True)
+        self.dir_path = dir_path
+        self._max_hot_bytes = max_hot_bytes
+        self._idle_seconds = idle_seconds
+        self._max_rss_bytes = max_rss_bytes
+        self._compress_level = compress_level
+        self._rss_check_seconds = rss_check_seconds
+        # session id -> (session, pickled size, last use)
+        self._hot: "OrderedDict[str, Tuple[SessionContext, int, float]]" = OrderedDict()
+        self._hot_bytes = 0
+        self._spilled = sum(1 for name in os.listdir(dir_path) if name.endswith(".session"))
+        self._spills = 0
+        self._promotions = 0
+        self._promotion_seconds = 0.0
+        self._rss: Optional[int] = None
+        self._rss_checked = 0.0
+        self._lock = threading.Lock()
+        if max_rss_bytes is not None and _current_rss() is None:
+            logger.warning("Can not read the resident memory on this platform, max_rss_bytes is ignored")
+
+    def _file_path(self, session_id: str) -> str:
+        # hashed, session ids come from clients
+        return os.path.join(self.dir_path, hashlib.sha256(session_id.encode()).hexdigest() + ".session")
+
+    def _over_rss_budget(self, now: float) -> bool:
+        if self._max_rss_bytes is None:
+            return False
+        if now - self._rss_checked >= self._rss_check_seconds:
+            self._rss = _current_rss()
+            self._rss_checked = now
+        return self._rss is not None and self._rss > self._max_rss_bytes
+
+    def _write(self, session_id: str, data: bytes) -> None:
+        path = self._file_path(session_id)
+        existed = os.path.exists(path)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(zlib.compress(data, self._compress_level))
+        os.replace(tmp_path, path)
+        if not existed:
+            self._spilled += 1
+
+    def _spill(self, session_id: str) -> None:
+        session, size, _ = self._hot.pop(session_id)
+        self._hot_bytes -= size
+        data = pickle.dumps(session, protocol=pickle.HIGHEST_PROTOCOL)
+        self._write(session_id, data)
+        self._spills += 1
+
+    def _evict(self, now: float) -> None:
+        while self._hot and self._hot_bytes > self._max_hot_bytes:
+            self._spill(next(iter(self._hot)))
+        if self._idle_seconds is not None:
+            # least recently used first, stop at the first session used recently
+            while self._hot:
+                session_id, (_, _, last_use) = next(iter(self._hot.items()))
+                if now - last_use < self._idle_seconds:
+                    break
+                self._spill(session_id)
+        if self._hot and self._over_rss_budget(now):
+            # the memory of spilled sessions is only released over time, spill half of the tier per check
+            for _ in range((len(self._hot) + 1) // 2):
+                self._spill(next(iter(self._hot)))
+
+    def _remove_file(self, session_id: str) -> bool:
+        try:
+            os.remove(self._file_path(session_id))
+        except FileNotFoundError:
+            return False
+        self._spilled -= 1
+        return True
+
+    def get(self, session_id: str) -> Optional[SessionContext]:
+        """
+        Retrieve the session context for a given session ID, promoting it to memory if it was spilled.
+
+        Args:
+            session_id (str): The session identifier.
+
+        Returns:
+            Optional[SessionContext]: The session context object, or None if not found.
+        """
+        with self._lock:
+            return self._get(session_id)
+
+    def _get(self, session_id: str) -> Optional[SessionContext]:
+        now = time.monotonic()
+        entry = self._hot.get(session_id)
+        if entry is not None:
+            self._hot[session_id] = (entry[0], entry[1], now)
+            self._hot.move_to_end(session_id)
+            self._evict(now)
+            return entry[0]
+
+        start = time.perf_counter()
+        try:
+            with open(self._file_path(session_id), "rb") as f:
+                data = zlib.decompress(f.read())
+        except FileNotFoundError:
+            return None
+        session: SessionContext = pickle.loads(data)
+        if self._over_rss_budget(now):
+            # over budget the session stays on disk
+            return session
+        self._remove_file(session_id)
+        self._hot[session_id] = (session, len(data), now)
+        self._hot_bytes += len(data)
+        self._promotions += 1
+        self._promotion_seconds += time.perf_counter() - start
+        self._evict(now)
+        return session
+
+    def set(self, session_id: str, session_context: SessionContext) -> None:
+        """
+        Store or update the session context for a given session ID.
+
+        Args:
+            session_id (str): The session identifier.
+            session_context (SessionContext): The session context to store.
+        """
+        with self._lock:
+            self._set(session_id, session_context)
+
+    def _set(self, session_id: str, session_context: SessionContext) -> None:
+        now = time.monotonic()
+        data = pickle.dumps(session_context, protocol=pickle.HIGHEST_PROTOCOL)
+        previous = self._hot.pop(session_id, None)
+        if previous is not None:
+            self._hot_bytes -= previous[1]
+        if not self._hot and self._over_rss_budget(now):
+            self._write(session_id, data)
+            return
+        self._remove_file(session_id)
+        self._hot[session_id] = (session_context, len(data), now)
+        self._hot_bytes += len(data)
+        self._evict(now)
+
+    def delete(self, session_id: str) -> None:
+        """
+        Delete the session context for a given session ID from both tiers.
+
+        Args:
+            session_id (str): The session identifier.
+        """
+        with self._lock:
+            entry = self._hot.pop(session_id, None)
+            if entry is not None:
+                self._hot_bytes -= entry[1]
+            self._remove_file(session_id)
+
+    async def aget(self, session_id: str) -> Optional[SessionContext]:
+        """
+        Retrieve the session context for a given session ID in a thread, see `get`.
+
+        Args:
+            session_id (str): The session identifier.
+
+        Returns:
+            Optional[SessionContext]: The session context object, or None if not found.
+        """
+        return await asyncio.to_thread(self.get, session_id)
+
+    async def aset(self, session_id: str, session_context: SessionContext) -> None:
+        """
+        Store or update the session context for a given session ID in a thread, see `set`.
+
+        Args:
+            session_id (str): The session identifier.
+            session_context (SessionContext): The session context to store.
+        """
+        await asyncio.to_thread(self.set, session_id, session_context)
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the session store statistics.
+
+        Returns:
+            Dict[str, Any]: The sessions and bytes in memory, the sessions on disk, the spills and promotions
+                with their average latency, and the last resident memory read.
+        """
+        return {
+            "hot_sessions": len(self._hot),
+            "hot_bytes": self._hot_bytes,
+            "spilled_sessions": self._spilled,
+            "spills": self._spills,
+            "promotions": self._promotions,
+            "avg_promotion_seconds": self._promotion_seconds / self._promotions if self._promotions else 0.0,
+            "rss_bytes": self._rss,
+        }
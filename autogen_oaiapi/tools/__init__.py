@@ -0,0 +1,7 @@
+from .executor import ToolExecutor, ToolStats, ExecutionMode
+
+__all__ = [
+    "ToolExecutor",
+    "ToolStats",
+    "ExecutionMode",
+]
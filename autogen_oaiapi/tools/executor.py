@@ -0,0 +1,291 @@
+import asyncio
+import functools
+import logging
+import multiprocessing
+import pickle
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Generator, List, Literal, Mapping, Optional
+from autogen_agentchat.agents import BaseChatAgent
+from autogen_agentchat.teams import BaseGroupChat
+from autogen_core import CancellationToken, ComponentModel
+from autogen_core.tools import BaseTool, FunctionTool, StaticWorkbench
+from pydantic import BaseModel
+from ..base import iter_actor_parts
+
+logger = logging.getLogger(__name__)
+
+ExecutionMode = Literal["thread", "process"]
+
+_FUNCTION_TOOL_PROVIDER = "autogen_core.tools.FunctionTool"
+
+
+@dataclass
+class ToolStats:
+    """
+    Timing statistics of one tool.
+
+    Args:
+        name (str): The name of the tool.
+        mode (str): Where the tool runs, "thread", "process" or "loop" for coroutine tools.
+        calls (int): Number of calls.
+        errors (int): Number of calls that raised.
+        total_seconds (float): Summed wall time of the calls.
+        max_seconds (float): Longest wall time of a call.
+        max_blocking_seconds (float): Longest time a coroutine tool held the event loop without yielding.
+    """
+    name: str
+    mode: str
+    calls: int = 0
+    errors: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    max_blocking_seconds: float = 0.0
+
+
+@functools.lru_cache(maxsize=128)
+def _load_function(config_json: str) -> Callable[..., Any]:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        tool = FunctionTool.load_component(ComponentModel.model_validate_json(config_json))
+    return tool._func  # type: ignore[no-any-return]
+
+
+def _call_in_process(function: bytes | str, kwargs: Dict[str, Any]) -> Any:
+    """
+    Call a tool function in a worker process. The function is either pickled or a FunctionTool component dump.
+    """
+    func = pickle.loads(function) if isinstance(function, bytes) else _load_function(function)
+    return func(**kwargs)
+
+
+class _BlockingMonitor:
+    """
+    Awaitable driving a coroutine step by step to measure how long each step holds the event loop.
+    """
+    def __init__(self, coro: Any, on_step: Callable[[float], None]) -> None:
+        self._coro = coro
+        self._on_step = on_step
+
+    def __await__(self) -> Generator[Any, Any, Any]:
+        steps = self._coro.__await__()
+        value: Any = None
+        error: BaseException | None = None
+        while True:
+            start = time.perf_counter()
+            try:
+                yielded = steps.throw(error) if error is not None else steps.send(value)
+            except StopIteration as e:
+                self._on_step(time.perf_counter() - start)
+                return e.value
+            finally:
+                error = None
+            self._on_step(time.perf_counter() - start)
+            try:
+                value = yield yielded
+            except BaseException as e:
+                value, error = None, e
+
+
+class _ManagedFunctionTool(BaseTool[BaseModel, BaseModel]):
+    """
+    Runs the function of a FunctionTool on the executors of a ToolExecutor and records its timing.
+    """
+    def __init__(self, tool: FunctionTool, executor: "ToolExecutor", mode: ExecutionMode, function: bytes | str | None) -> None:
+        super().__init__(tool.args_type(), tool.return_type(), tool.name, tool.description, tool._strict)
+        self._func = tool._func
+        self._parameters = list(tool._signature.parameters.keys())
+        self._has_cancellation_support = tool._has_cancellation_support
+        self._is_coroutine = asyncio.iscoroutinefunction(tool._func)
+        self._executor = executor
+        self._mode = mode
+        self._function = function
+        self._stats = executor._tool_stats(tool.name, "loop" if self._is_coroutine else mode)
+
+    def _record_step(self, seconds: float) -> None:
+        if seconds > self._stats.max_blocking_seconds:
+            self._stats.max_blocking_seconds = seconds
+        if seconds > self._executor._block_warning_seconds:
+            logger.warning("Tool %s blocked the event loop for %.3fs", self.name, seconds)
+
+    async def run(self, args: BaseModel, cancellation_token: CancellationToken) -> Any:
+        kwargs = {name: getattr(args, name) for name in self._parameters if hasattr(args, name)}
+        if self._has_cancellation_support:
+            kwargs["cancellation_token"] = cancellation_token
+        start = time.perf_counter()
+        try:
+            if self._is_coroutine:
+                return await _BlockingMonitor(self._func(**kwargs), self._record_step)
+            loop = asyncio.get_running_loop()
+            if self._mode == "process" and self._function is not None:
+                kwargs.pop("cancellation_token", None)
+                future = loop.run_in_executor(self._executor._process_pool(), _call_in_process, self._function, kwargs)
+            else:
+                future = loop.run_in_executor(self._executor._thread_pool(), functools.partial(self._func, **kwargs))
+            cancellation_token.link_future(future)
+            return await future
+        except Exception:
+            self._stats.errors += 1
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            self._stats.calls += 1
+            self._stats.total_seconds += seconds
+            if seconds > self._stats.max_seconds:
+                self._stats.max_seconds = seconds
+
+
+def _function_tool_configs(component: Any, configs: Dict[str, str]) -> Dict[str, str]:
+    """
+    Collect the FunctionTool component dumps of a registered actor by tool name.
+    """
+    if isinstance(component, ComponentModel):
+        component = component.model_dump()
+    if isinstance(component, Mapping):
+        if component.get("provider") == _FUNCTION_TOOL_PROVIDER and isinstance(component.get("config"), Mapping):
+            configs.setdefault(component["config"].get("name", ""), ComponentModel.model_validate(component).model_dump_json())
+        for value in component.values():
+            _function_tool_configs(value, configs)
+    elif isinstance(component, list):
+        for value in component:
+            _function_tool_configs(value, configs)
+    return configs
+
+
+class ToolExecutor:
+    """
+    Server-level executor policy for the FunctionTools of the registered agents.
+
+    Synchronous tools run on a bounded thread pool, or on a bounded process pool for CPU-bound tools.
+    The mode is chosen per tool name, then per registered model, then the default mode.
+    Coroutine tools keep running on the event loop, and a warning is logged when one step of
+    such a tool holds the loop longer than `block_warning_seconds`.
+    A tool sent to the process pool must be picklable or loadable from its component dump,
+    otherwise it runs on the thread pool. The worker processes are started with the "spawn" method,
+    like the model workers, so the entry script of the server must be guarded by `if __name__ == "__main__":`.
+    """
+    def __init__(
+        self,
+        max_threads: int = 8,
+        max_processes: int = 2,
+        default_mode: ExecutionMode = "thread",
+        tool_modes: Optional[Dict[str, ExecutionMode]] = None,
+        model_modes: Optional[Dict[str, ExecutionMode]] = None,
+        block_warning_seconds: float = 0.1,
+    ) -> None:
+        """
+        Initialize the tool executor.
+
+        Args:
+            max_threads (int): The size of the thread pool for blocking tools.
+            max_processes (int): The size of the process pool for CPU-bound tools, started on first use.
+            default_mode (ExecutionMode): The mode of tools without a tool or model mode.
+            tool_modes (Optional[Dict[str, ExecutionMode]]): The mode per tool name.
+            model_modes (Optional[Dict[str, ExecutionMode]]): The mode per registered model name.
+            block_warning_seconds (float): Log a warning when a coroutine tool blocks the event loop longer than this.
+        """
+        self._max_threads = max_threads
+        self._max_processes = max_processes
+        self._default_mode = default_mode
+        self._tool_modes = tool_modes or {}
+        self._model_modes = model_modes or {}
+        self._block_warning_seconds = block_warning_seconds
+        self._threads: ThreadPoolExecutor | None = None
+        self._processes: ProcessPoolExecutor | None = None
+        self._stats: Dict[str, ToolStats] = {}
+        self._tool_configs: Dict[str, Dict[str, str]] = {}
+
+    def _thread_pool(self) -> ThreadPoolExecutor:
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(max_workers=self._max_threads, thread_name_prefix="autogen-oaiapi-tool")
+        return self._threads
+
+    def _process_pool(self) -> ProcessPoolExecutor:
+        if self._processes is None:
+            # forking would copy the threads and event loop of the server into the workers
+            self._processes = ProcessPoolExecutor(
+                max_workers=self._max_processes, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._processes
+
+    def _tool_stats(self, name: str, mode: str) -> ToolStats:
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = ToolStats(name=name, mode=mode)
+        return stats
+
+    def _mode(self, model_name: str, tool_name: str) -> ExecutionMode:
+        return self._tool_modes.get(tool_name) or self._model_modes.get(model_name) or self._default_mode
+
+    def _process_function(self, tool: FunctionTool, configs: Dict[str, str]) -> bytes | str | None:
+        try:
+            return pickle.dumps(tool._func)
+        except Exception:
+            pass
+        config = configs.get(tool.name)
+        if config is None:
+            logger.warning("Tool %s can not be sent to a process, running it on the thread pool", tool.name)
+        return config
+
+    def _wrap_tools(self, tools: List[BaseTool[Any, Any]], model_name: str, configs: Dict[str, str]) -> None:
+        for idx, tool in enumerate(tools):
+            if not isinstance(tool, FunctionTool):
+                continue
+            mode = self._mode(model_name, tool.name)
+            function = self._process_function(tool, configs) if mode == "process" else None
+            tools[idx] = _ManagedFunctionTool(tool, self, mode, function)
+
+    def instrument(self, actor: BaseGroupChat | BaseChatAgent, model_name: str, component: ComponentModel) -> None:
+        """
+        Route the FunctionTools of a freshly loaded actor through the executors of this policy.
+
+        Args:
+            actor (BaseGroupChat | BaseChatAgent): The loaded team or agent.
+            model_name (str): The registered model name of the actor.
+            component (ComponentModel): The component dump the actor was loaded from.
+        """
+        configs = self._tool_configs.get(model_name)
+        if configs is None:
+            configs = self._tool_configs[model_name] = _function_tool_configs(component, {})
+        for part in iter_actor_parts(actor):
+            workbench = getattr(part, "_workbench", None)
+            if isinstance(part, BaseChatAgent) and isinstance(workbench, StaticWorkbench):
+                # the workbench shares its tool list with the agent
+                self._wrap_tools(workbench._tools, model_name, configs)
+
+    async def stop(self) -> None:
+        """
+        Shut down the executors, waiting for running tools to finish.
+        """
+        threads, self._threads = self._threads, None
+        processes, self._processes = self._processes, None
+        if threads is not None:
+            await asyncio.to_thread(threads.shutdown)
+        if processes is not None:
+            await asyncio.to_thread(processes.shutdown)
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the tool timing statistics.
+
+        Returns:
+            Dict[str, Any]: The executor sizes and the timing statistics per tool.
+        """
+        return {
+            "max_threads": self._max_threads,
+            "max_processes": self._max_processes,
+            "tools": {
+                name: {
+                    "mode": stats.mode,
+                    "calls": stats.calls,
+                    "errors": stats.errors,
+                    "avg_seconds": stats.total_seconds / stats.calls if stats.calls else 0.0,
+                    "max_seconds": stats.max_seconds,
+                    "max_blocking_seconds": stats.max_blocking_seconds,
+                }
+                for name, stats in self._stats.items()
+            },
+        }
@@ -0,0 +1,14 @@
+from .limiter import AdaptiveLimiter, UpstreamOverloadedError
+from .breaker import CircuitBreaker, CircuitState
+from .guard import UpstreamGuard, GuardedChatCompletionClient, is_upstream_failure, is_upstream_overloaded
+
+__all__ = [
+    "AdaptiveLimiter",
+    "UpstreamOverloadedError",
+    "CircuitBreaker",
+    "CircuitState",
+    "UpstreamGuard",
+    "GuardedChatCompletionClient",
+    "is_upstream_failure",
+    "is_upstream_overloaded",
+]
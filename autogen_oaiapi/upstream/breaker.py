@@ -0,0 +1,134 @@
+import time
+from collections import deque
+from typing import Deque, Dict, Literal, Optional
+
+CircuitState = Literal["closed", "open", "half_open"]
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker of the calls to one upstream.
+
+    The circuit opens when at least `failure_rate` of the last `window` calls failed, once `min_calls` calls
+    were made. While it is open, calls are refused without reaching the upstream. After `open_seconds` it lets
+    `half_open_calls` probe calls through: the circuit closes when a probe succeeds and opens again when one fails.
+
+    Args:
+        failure_rate (float): The share of failed calls that opens the circuit.
+        window (int): The number of recent calls the failure rate is computed over.
+        min_calls (int): The number of calls in the window before the circuit can open.
+        open_seconds (float): The time the circuit stays open before probing the upstream.
+        half_open_calls (int): The number of probe calls allowed at once.
+    """
+    def __init__(
+        self,
+        failure_rate: float = 0.5,
+        window: int = 20,
+        min_calls: int = 10,
+        open_seconds: float = 30.0,
+        half_open_calls: int = 1,
+    ) -> None:
+        self._failure_rate = failure_rate
+        self._min_calls = min_calls
+        self._open_seconds = open_seconds
+        self._half_open_calls = half_open_calls
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._failures = 0
+        self._state: CircuitState = "closed"
+        self._opened_at = 0.0
+        self._probes = 0
+        self._opens = 0
+        self._refused = 0
+
+    @property
+    def state(self) -> CircuitState:
+        """
+        Get the state of the circuit, moving from open to half open once `open_seconds` passed.
+
+        Returns:
+            CircuitState: "closed", "open" or "half_open".
+        """
+        if self._state == "open" and time.monotonic() - self._opened_at >= self._open_seconds:
+            self._state = "half_open"
+            self._probes = 0
+        return self._state
+
+    @property
+    def retry_after(self) -> float:
+        """
+        Get the time until the circuit lets probe calls through.
+
+        Returns:
+            float: The time in seconds, 0 unless the circuit is open.
+        """
+        if self.state != "open":
+            return 0.0
+        return max(0.0, self._open_seconds - (time.monotonic() - self._opened_at))
+
+    def allow(self) -> bool:
+        """
+        Check whether a call may reach the upstream. A call allowed in half open state is a probe,
+        its outcome must be passed to `record`.
+
+        Returns:
+            bool: False if the call is refused.
+        """
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and self._probes < self._half_open_calls:
+            self._probes += 1
+            return True
+        self._refused += 1
+        return False
+
+    def _open(self) -> None:
+        self._state = "open"
+        self._opened_at = time.monotonic()
+        self._opens += 1
+
+    def record(self, failed: Optional[bool]) -> None:
+        """
+        Record the outcome of an allowed call.
+
+        Args:
+            failed (Optional[bool]): Whether the upstream failed the call. None for outcomes that say nothing
+                about the upstream, e.g. a cancelled call or a rejected request.
+        """
+        if self._state == "half_open":
+            self._probes = max(0, self._probes - 1)
+            if failed is None:
+                return
+            if failed:
+                self._open()
+            else:
+                self._state = "closed"
+                self._outcomes.clear()
+                self._failures = 0
+            return
+        if failed is None or self._state == "open":
+            return
+        if len(self._outcomes) == self._outcomes.maxlen and self._outcomes[0]:
+            self._failures -= 1
+        self._outcomes.append(failed)
+        self._failures += failed
+        if len(self._outcomes) >= self._min_calls and self._failures >= self._failure_rate * len(self._outcomes):
+            self._open()
+            self._outcomes.clear()
+            self._failures = 0
+
+    @property
+    def stats(self) -> Dict[str, float | int | str]:
+        """
+        Get the circuit breaker statistics.
+
+        Returns:
+            Dict[str, float | int | str]: The state, the failure rate over the window, the times the circuit
+                opened and the refused calls.
+        """
+        return {
+            "state": self.state,
+            "failure_rate": self._failures / len(self._outcomes) if self._outcomes else 0.0,
+            "opens": self._opens,
+            "refused": self._refused,
+        }
@@ -0,0 +1,267 @@
+import asyncio
+import logging
+import time
+from typing import Any, AsyncGenerator, Callable, Dict, Mapping, Optional, Sequence, Set, Union
+from autogen_agentchat.agents import BaseChatAgent
+from autogen_agentchat.teams import BaseGroupChat
+from autogen_core import CancellationToken
+from autogen_core.models import ChatCompletionClient, CreateResult, LLMMessage
+from autogen_core.tools import Tool, ToolSchema
+from pydantic import BaseModel
+from ..base import DelegatingChatCompletionClient, iter_model_client_owners
+from .breaker import CircuitBreaker
+from .limiter import AdaptiveLimiter, UpstreamOverloadedError
+
+logger = logging.getLogger(__name__)
+
+
+def is_upstream_failure(error: BaseException) -> bool:
+    """
+    Check whether an error of a model client call says the upstream is failing or saturated,
+    as opposed to an error of the request itself.
+
+    Args:
+        error (BaseException): The error raised by the call.
+
+    Returns:
+        bool: True for 429 and 5xx responses, timeouts and connection errors.
+    """
+    status_code = getattr(error, "status_code", None)
+    if isinstance(status_code, int):
+        return status_code == 429 or status_code >= 500
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    # e.g. openai.APITimeoutError and openai.APIConnectionError, without importing the SDKs
+    return type(error).__name__.endswith(("TimeoutError", "ConnectionError"))
+
+
+def is_upstream_overloaded(error: BaseException) -> bool:
+    """
+    Check whether a run failed because an upstream refused the call.
+    Teams report the errors of their agents as a RuntimeError starting with the error type, which is matched here.
+
+    Args:
+        error (BaseException): The error raised by the run.
+
+    Returns:
+        bool: True if the run failed with an `UpstreamOverloadedError`.
+    """
+    if isinstance(error, UpstreamOverloadedError):
+        return True
+    return isinstance(error, RuntimeError) and str(error).startswith(f"{UpstreamOverloadedError.__name__}: ")
+
+
+def upstream_key(client: ChatCompletionClient) -> str:
+    """
+    Name the upstream of a model client, its endpoint and model.
+
+    Args:
+        client (ChatCompletionClient): The model client.
+
+    Returns:
+        str: "<provider>:<model>@<endpoint>", with the parts the client dump provides.
+    """
+    try:
+        component = client.dump_component()
+    except Exception:
+        return f"{type(client).__module__}.{type(client).__qualname__}"
+    config = component.config
+    key = component.provider
+    if config.get("model"):
+        key += f":{config['model']}"
+    endpoint = config.get("base_url") or config.get("azure_endpoint") or config.get("host")
+    if endpoint:
+        key += f"@{endpoint}"
+    return key
+
+
+class _Upstream:
+    """
+    Limiter and circuit breaker of one upstream, shared by every client calling it.
+    """
+    def __init__(self, name: str, limiter: AdaptiveLimiter, breaker: CircuitBreaker) -> None:
+        self.name = name
+        self.limiter = limiter
+        self.breaker = breaker
+        self.calls = 0
+        self.failures = 0
+
+    async def enter(self) -> int:
+        if not self.breaker.allow():
+            raise UpstreamOverloadedError(
+                f"upstream {self.name} is failing, calls are refused", retry_after=max(1.0, self.breaker.retry_after)
+            )
+        try:
+            return await self.limiter.acquire()
+        except BaseException:
+            self.breaker.record(None)
+            raise
+
+    def exit(self, started: float, in_flight: int, error: Optional[BaseException]) -> None:
+        self.limiter.release()
+        self.calls += 1
+        if error is not None and not isinstance(error, Exception):
+            # cancelled, nothing learned about the upstream
+            self.breaker.record(None)
+            return
+        failed = error is not None and is_upstream_failure(error)
+        if failed:
+            self.failures += 1
+            logger.warning("Upstream %s failed: %s", self.name, error)
+        if error is not None and not failed:
+            # the request was rejected, e.g. with a 400, nothing learned about the upstream
+            self.breaker.record(None)
+            return
+        self.limiter.record(time.perf_counter() - started, failed, in_flight)
+        self.breaker.record(failed)
+
+
+class GuardedChatCompletionClient(DelegatingChatCompletionClient):
+    """
+    Model client passing every call through the limiter and circuit breaker of its upstream.
+    Calls refused by either raise `UpstreamOverloadedError` without reaching the upstream.
+    Everything else, including `dump_component`, is delegated to the wrapped client.
+
+    Args:
+        client (ChatCompletionClient): The wrapped model client.
+        upstream (_Upstream): The state of the upstream of the client.
+    """
+    def __init__(self, client: ChatCompletionClient, upstream: _Upstream) -> None:
+        super().__init__(client)
+        self._upstream = upstream
+
+    async def create(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = [],
+        json_output: Optional[bool | type[BaseModel]] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> CreateResult:
+        in_flight = await self._upstream.enter()
+        started = time.perf_counter()
+        try:
+            result = await self._client.create(
+                messages,
+                tools=tools,
+                json_output=json_output,
+                extra_create_args=extra_create_args,
+                cancellation_token=cancellation_token,
+            )
+        except BaseException as e:
+            self._upstream.exit(started, in_flight, e)
+            raise
+        self._upstream.exit(started, in_flight, None)
+        return result
+
+    async def create_stream(
+        self,
+        messages: Sequence[LLMMessage],
+        *,
+        tools: Sequence[Tool | ToolSchema] = [],
+        json_output: Optional[bool | type[BaseModel]] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> AsyncGenerator[Union[str, CreateResult], None]:
+        in_flight = await self._upstream.enter()
+        started = time.perf_counter()
+        try:
+            async for chunk in self._client.create_stream(
+                messages,
+                tools=tools,
+                json_output=json_output,
+                extra_create_args=extra_create_args,
+                cancellation_token=cancellation_token,
+            ):
+                yield chunk
+        except BaseException as e:
+            self._upstream.exit(started, in_flight, e)
+            raise
+        self._upstream.exit(started, in_flight, None)
+
+
+class UpstreamGuard:
+    """
+    Adaptive concurrency and circuit breaking against the upstream model endpoints of the registered actors.
+
+    When an actor is loaded, the model client of every agent and of the selector is wrapped in a
+    `GuardedChatCompletionClient`. Clients calling the same upstream, the same provider, model and endpoint,
+    share one `AdaptiveLimiter` and one `CircuitBreaker`, so a slow or failing upstream gets fewer concurrent
+    calls, and no calls at all while its circuit is open. Refused calls raise `UpstreamOverloadedError`,
+    which the server answers with a 503 "overloaded" error. New requests for a model whose upstream circuit
+    is open are refused before the team runs.
+
+    Args:
+        limiter (Callable[[], AdaptiveLimiter]): Builds the limiter of each upstream.
+        breaker (Callable[[], CircuitBreaker]): Builds the circuit breaker of each upstream.
+    """
+    def __init__(
+        self,
+        limiter: Callable[[], AdaptiveLimiter] = AdaptiveLimiter,
+        breaker: Callable[[], CircuitBreaker] = CircuitBreaker,
+    ) -> None:
+        self._limiter = limiter
+        self._breaker = breaker
+        self._upstreams: Dict[str, _Upstream] = {}
+        # registered model name -> names of the upstreams its actor calls
+        self._model_upstreams: Dict[str, Set[str]] = {}
+
+    def _upstream(self, name: str) -> _Upstream:
+        upstream = self._upstreams.get(name)
+        if upstream is None:
+            upstream = self._upstreams[name] = _Upstream(name, self._limiter(), self._breaker())
+        return upstream
+
+    def _wrap(self, client: Any, model_name: str) -> Any:
+        if not isinstance(client, ChatCompletionClient) or isinstance(client, GuardedChatCompletionClient):
+            return client
+        name = upstream_key(client)
+        self._model_upstreams.setdefault(model_name, set()).add(name)
+        return GuardedChatCompletionClient(client, self._upstream(name))
+
+    def instrument(self, actor: BaseGroupChat | BaseChatAgent, model_name: str) -> None:
+        """
+        Wrap the model clients of a freshly loaded actor.
+
+        Args:
+            actor (BaseGroupChat | BaseChatAgent): The loaded team or agent.
+            model_name (str): The registered model name of the actor.
+        """
+        for owner, _ in iter_model_client_owners(actor):
+            owner._model_client = self._wrap(owner._model_client, model_name)
+
+    def retry_after(self, model_name: str) -> Optional[float]:
+        """
+        Check whether a model can be run, before its team starts.
+
+        Args:
+            model_name (str): The registered model name.
+
+        Returns:
+            Optional[float]: The time until an upstream of the model lets calls through again, in seconds,
+                None if no upstream circuit of the model is open.
+        """
+        retry_after = max(
+            (self._upstreams[name].breaker.retry_after for name in self._model_upstreams.get(model_name, ())),
+            default=0.0,
+        )
+        return retry_after if retry_after > 0.0 else None
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the upstream statistics.
+
+        Returns:
+            Dict[str, Any]: The calls, failures, limiter and circuit breaker statistics per upstream.
+        """
+        return {
+            name: {
+                "calls": upstream.calls,
+                "failures": upstream.failures,
+                **upstream.limiter.stats,
+                **upstream.breaker.stats,
+            }
+            for name, upstream in self._upstreams.items()
+        }
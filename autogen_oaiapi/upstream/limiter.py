@@ -0,0 +1,176 @@
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+
+class UpstreamOverloadedError(RuntimeError):
+    """
+    Raised instead of calling an upstream model endpoint that is failing or saturated.
+
+    Args:
+        message (str): The error message.
+        retry_after (float): The time after which the upstream may accept calls again, in seconds.
+    """
+    def __init__(self, message: str, retry_after: float = 1.0) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit of the calls to one upstream.
+
+    The limit grows by one per limit's worth of successful calls made while at least half of it was in use,
+    and is multiplied by `backoff` when a call fails, or when the latency, smoothed over recent calls, exceeds
+    `latency_tolerance` times the baseline latency, a slowly moving average of the same latencies. It is lowered
+    at most once per smoothed latency, so one burst of slow calls lowers it once. Calls over the limit wait for a
+    slot, and fail with `UpstreamOverloadedError` after `max_wait` seconds or when `max_queue` calls already wait.
+
+    Args:
+        initial_limit (int): The limit of the first calls.
+        min_limit (int): The lowest limit.
+        max_limit (int): The highest limit.
+        backoff (float): The factor applied to the limit when it is lowered.
+        latency_tolerance (float): Lower the limit when the smoothed latency exceeds the baseline by this factor.
+        max_wait (Optional[float]): The longest time a call waits for a slot. Calls wait as long as needed when None.
+        max_queue (Optional[int]): The number of calls that may wait for a slot. No bound when None.
+    """
+    def __init__(
+        self,
+        initial_limit: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        backoff: float = 0.5,
+        latency_tolerance: float = 2.0,
+        max_wait: Optional[float] = 10.0,
+        max_queue: Optional[int] = None,
+    ) -> None:
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError("the limits must satisfy 1 <= min_limit <= initial_limit <= max_limit")
+        if not 0.0 < backoff < 1.0:
+            raise ValueError("backoff must be between 0 and 1")
+        self._limit = float(initial_limit)
+        self._min_limit = min_limit
+        self._max_limit = max_limit
+        self._backoff = backoff
+        self._latency_tolerance = latency_tolerance
+        self._max_wait = max_wait
+        self._max_queue = max_queue
+        self._in_flight = 0
+        self._waiters: Deque["asyncio.Future[None]"] = deque()
+        self._latency: Optional[float] = None
+        self._baseline: Optional[float] = None
+        self._last_decrease = 0.0
+        self._rejected = 0
+
+    @property
+    def limit(self) -> int:
+        """
+        Get the current concurrency limit.
+
+        Returns:
+            int: The number of calls allowed at once.
+        """
+        return int(self._limit)
+
+    def _wake(self) -> None:
+        while self._waiters and self._in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # the slot is taken on behalf of the waiter
+                self._in_flight += 1
+                waiter.set_result(None)
+
+    def _discard(self, waiter: "asyncio.Future[None]") -> None:
+        waiter.cancel()
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    async def acquire(self) -> int:
+        """
+        Wait for a slot.
+
+        Returns:
+            int: The number of calls in flight when the slot was granted, this one included.
+
+        Raises:
+            UpstreamOverloadedError: If the call waited `max_wait` seconds, or `max_queue` calls already wait.
+        """
+        if self._in_flight < self.limit and not self._waiters:
+            self._in_flight += 1
+            return self._in_flight
+        if self._max_queue is not None and len(self._waiters) >= self._max_queue:
+            self._rejected += 1
+            raise UpstreamOverloadedError("too many calls are waiting for the upstream")
+        waiter: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self._max_wait)
+        except asyncio.TimeoutError:
+            if waiter.done():
+                # granted while timing out, keep the slot
+                return self._in_flight
+            self._discard(waiter)
+            self._rejected += 1
+            raise UpstreamOverloadedError(f"no upstream slot within {self._max_wait} seconds") from None
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                self._discard(waiter)
+            raise
+        return self._in_flight
+
+    def release(self) -> None:
+        """
+        Free a slot granted by `acquire`.
+        """
+        self._in_flight -= 1
+        self._wake()
+
+    def record(self, latency: float, failed: bool, in_flight: int) -> None:
+        """
+        Adjust the limit with the outcome of a call.
+
+        Args:
+            latency (float): The duration of the call, in seconds.
+            failed (bool): Whether the upstream failed the call, e.g. with a 429, a 5xx or a timeout.
+            in_flight (int): The number of calls in flight when the call started, returned by `acquire`.
+        """
+        now = time.monotonic()
+        if not failed:
+            self._latency = latency if self._latency is None else 0.7 * self._latency + 0.3 * latency
+            self._baseline = latency if self._baseline is None else 0.98 * self._baseline + 0.02 * latency
+        slow = (
+            self._latency is not None
+            and self._baseline is not None
+            and self._latency > self._baseline * self._latency_tolerance
+        )
+        if failed or slow:
+            if now - self._last_decrease >= (self._latency or 0.0):
+                self._limit = max(float(self._min_limit), self._limit * self._backoff)
+                self._last_decrease = now
+        elif in_flight >= self._limit / 2:
+            self._limit = min(float(self._max_limit), self._limit + 1.0 / self._limit)
+        self._wake()
+
+    @property
+    def stats(self) -> Dict[str, float | int | None]:
+        """
+        Get the limiter statistics.
+
+        Returns:
+            Dict[str, float | int | None]: The limit, the calls in flight and waiting, the rejected calls,
+                and the smoothed and baseline latencies in milliseconds.
+        """
+        return {
+            "limit": self.limit,
+            "in_flight": self._in_flight,
+            "waiting": len(self._waiters),
+            "rejected": self._rejected,
+            "latency_ms": round(self._latency * 1000, 2) if self._latency is not None else None,
+            "baseline_ms": round(self._baseline * 1000, 2) if self._baseline is not None else None,
+        }
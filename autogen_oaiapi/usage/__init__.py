@@ -0,0 +1,12 @@
+from .base import BaseUsageSink, UsageRecord
+from .ledger import UsageLedger
+from .jsonl import JsonlUsageSink
+from .sqlite import SqliteUsageSink
+
+__all__ = [
+    "BaseUsageSink",
+    "UsageRecord",
+    "UsageLedger",
+    "JsonlUsageSink",
+    "SqliteUsageSink",
+]
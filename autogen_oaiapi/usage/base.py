@@ -0,0 +1,51 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Sequence
+
+
+@dataclass
+class UsageRecord:
+    """
+    Aggregated token usage of one API key on one model.
+
+    Args:
+        key_name (str): The name of the API key.
+        model (str): The model name.
+        requests (int): Number of completed requests.
+        prompt_tokens (int): Number of prompt tokens used.
+        completion_tokens (int): Number of completion tokens used.
+        total_tokens (int): Total tokens used.
+        period_start (float): Start of the aggregation period as a UNIX timestamp.
+        period_end (float): End of the aggregation period as a UNIX timestamp.
+    """
+    key_name: str
+    model: str
+    requests: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    total_tokens: int = 0
+    period_start: float = 0.0
+    period_end: float = 0.0
+
+
+class BaseUsageSink(ABC):
+    """
+    Abstract base class for usage ledger sinks.
+
+    Subclasses must implement write to persist a batch of usage records.
+    """
+    @abstractmethod
+    async def write(self, records: Sequence[UsageRecord]) -> None:
+        """
+        Persist a batch of usage records.
+
+        Args:
+            records (Sequence[UsageRecord]): The records aggregated since the previous flush.
+        """
+        pass
+
+    async def close(self) -> None:  # noqa: B027, optional hook, most sinks hold no resources
+        """
+        Release the resources of the sink. Called once after the last flush.
+        """
+        pass
@@ -0,0 +1,33 @@
+import asyncio
+import dataclasses
+import json
+import os
+from typing import Sequence
+from autogen_oaiapi.usage.base import BaseUsageSink, UsageRecord
+
+
+class JsonlUsageSink(BaseUsageSink):
+    """
+    JSONL file implementation of the usage sink.
+
+    Appends one JSON line per usage record to the given file.
+    """
+    def __init__(self, file_path: str = "usage.jsonl") -> None:
+        directory = os.path.dirname(file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file_path = file_path
+
+    def _append(self, records: Sequence[UsageRecord]) -> None:
+        lines = "".join(json.dumps(dataclasses.asdict(record)) + "\n" for record in records)
+        with open(self.file_path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+    async def write(self, records: Sequence[UsageRecord]) -> None:
+        """
+        Append the usage records to the JSONL file in a worker thread.
+
+        Args:
+            records (Sequence[UsageRecord]): The records aggregated since the previous flush.
+        """
+        await asyncio.to_thread(self._append, records)
@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+from autogen_oaiapi.usage.base import BaseUsageSink, UsageRecord
+
+logger = logging.getLogger(__name__)
+
+
+class UsageLedger:
+    """
+    Per API key and model token usage ledger.
+
+    Recording a request only updates in-memory counters. The counters aggregated since the
+    previous flush are written in one batch to the sink by a background task.
+    Process lifetime totals are kept in memory for queries.
+    """
+    def __init__(self, sink: Optional[BaseUsageSink] = None, flush_interval: float = 10.0) -> None:
+        """
+        Initialize the usage ledger.
+
+        Args:
+            sink (Optional[BaseUsageSink]): Where flushed usage is written. Usage is only kept in memory when None.
+            flush_interval (float): Seconds between flushes to the sink.
+        """
+        self._sink = sink
+        self._flush_interval = flush_interval
+        self._pending: Dict[Tuple[str, str], UsageRecord] = {}
+        self._totals: Dict[Tuple[str, str], UsageRecord] = {}
+        self._period_start = time.time()
+        self._flush_task: asyncio.Task[None] | None = None
+
+    def record(
+        self,
+        key_name: str,
+        model: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        total_tokens: int,
+    ) -> None:
+        """
+        Record the usage of one completed request.
+
+        Args:
+            key_name (str): The name of the API key.
+            model (str): The model name.
+            prompt_tokens (int): Number of prompt tokens used.
+            completion_tokens (int): Number of completion tokens used.
+            total_tokens (int): Total tokens used.
+        """
+        key = (key_name, model)
+        for table in (self._pending, self._totals):
+            usage = table.get(key)
+            if usage is None:
+                usage = table[key] = UsageRecord(key_name=key_name, model=model)
+            usage.requests += 1
+            usage.prompt_tokens += prompt_tokens
+            usage.completion_tokens += completion_tokens
+            usage.total_tokens += total_tokens
+
+    def query(self, key_name: Optional[str] = None, model: Optional[str] = None) -> List[UsageRecord]:
+        """
+        Get the usage recorded by this process, optionally filtered by key name and model.
+
+        Args:
+            key_name (Optional[str]): Only return usage of this API key.
+            model (Optional[str]): Only return usage of this model.
+
+        Returns:
+            List[UsageRecord]: The matching usage totals.
+        """
+        return [
+            usage for (usage_key_name, usage_model), usage in self._totals.items()
+            if (key_name is None or usage_key_name == key_name) and (model is None or usage_model == model)
+        ]
+
+    async def flush(self) -> None:
+        """
+        Write the usage aggregated since the previous flush to the sink.
+        Records are kept for the next flush if the sink fails.
+        """
+        if not self._pending:
+            return
+        period_end = time.time()
+        pending, self._pending = self._pending, {}
+        records = list(pending.values())
+        for record in records:
+            record.period_start = self._period_start
+            record.period_end = period_end
+        if self._sink is None:
+            self._period_start = period_end
+            return
+        try:
+            await self._sink.write(records)
+        except Exception as e:
+            logger.error("Failed to flush %s usage records: %s", len(records), e)
+            for key, record in pending.items():
+                usage = self._pending.setdefault(key, UsageRecord(key_name=record.key_name, model=record.model))
+                usage.requests += record.requests
+                usage.prompt_tokens += record.prompt_tokens
+                usage.completion_tokens += record.completion_tokens
+                usage.total_tokens += record.total_tokens
+            return
+        self._period_start = period_end
+
+    async def _flush_loop(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            await self.flush()
+
+    async def start(self) -> None:
+        """
+        Start the background flush task.
+        """
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop(self._flush_interval))
+
+    async def stop(self) -> None:
+        """
+        Stop the background flush task, flush the remaining usage and close the sink.
+        """
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+        if self._sink is not None:
+            await self._sink.close()
@@ -0,0 +1,67 @@
+import asyncio
+import sqlite3
+import threading
+from typing import Sequence
+from autogen_oaiapi.usage.base import BaseUsageSink, UsageRecord
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage (
+    period_start REAL NOT NULL,
+    period_end REAL NOT NULL,
+    key_name TEXT NOT NULL,
+    model TEXT NOT NULL,
+    requests INTEGER NOT NULL,
+    prompt_tokens INTEGER NOT NULL,
+    completion_tokens INTEGER NOT NULL,
+    total_tokens INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_usage_key_model ON usage (key_name, model, period_start);
+"""
+
+
+class SqliteUsageSink(BaseUsageSink):
+    """
+    SQLite implementation of the usage sink.
+
+    Inserts every flushed batch in one transaction into a WAL mode database.
+    """
+    def __init__(self, db_path: str = "usage.db") -> None:
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def _insert(self, records: Sequence[UsageRecord]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO usage VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        record.period_start,
+                        record.period_end,
+                        record.key_name,
+                        record.model,
+                        record.requests,
+                        record.prompt_tokens,
+                        record.completion_tokens,
+                        record.total_tokens,
+                    )
+                    for record in records
+                ],
+            )
+
+    async def write(self, records: Sequence[UsageRecord]) -> None:
+        """
+        Insert the usage records into the database in a worker thread.
+
+        Args:
+            records (Sequence[UsageRecord]): The records aggregated since the previous flush.
+        """
+        await asyncio.to_thread(self._insert, records)
+
+    async def close(self) -> None:
+        """
+        Close the database connection.
+        """
+        with self._lock:
+            self._conn.close()
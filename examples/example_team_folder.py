@@ -19,10 +19,9 @@ You can see the response from the team in the response body, for example:
     "id":"chatcmpl-c07905dac4774dea9ae567cf1eb46e38","object":"chat.completion","created":1747262769,
     "model":"round_robin_group_chat",
     "choices":[
-        {"index":0,"message":{"role":"assistant","content":"Calculate 1 + 1"},"finish_reason":"stop"},
         {"index":0,"message":{"role":"assistant","content":"RULES:\n- You have provided the expected response for the tool call\n- The calculation result is 2.0 (1 + 1)"},"finish_reason":"stop"}
     ],
-    "usage":{"prompt_tokens":647,"completion_tokens":30,"total_tokens":0}
+    "usage":{"prompt_tokens":647,"completion_tokens":30,"total_tokens":677}
 }
 
 To fully run this example, you should have a local LLM running on http://localhost:1234/v1. 
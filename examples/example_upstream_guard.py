@@ -0,0 +1,54 @@
+"""
+Guard a team against a slow or failing upstream.
+
+A fake OpenAI-compatible upstream runs on port 8002 and injects latency and errors:
+
+    FAKE_LATENCY=2.0 FAKE_ERROR_RATE=0.5 python example_upstream_guard.py
+
+Send chat completions to port 8001 and watch `/v1/metrics`: the concurrency limit of the upstream drops,
+its circuit opens, and requests fail fast with a 503 "overloaded" error until the upstream recovers.
+"""
+import os
+import random
+import threading
+import time
+import asyncio
+
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from autogen_agentchat.agents import AssistantAgent
+from autogen_ext.models.openai import OpenAIChatCompletionClient
+from autogen_oaiapi.server import Server
+from autogen_oaiapi.upstream import UpstreamGuard, AdaptiveLimiter, CircuitBreaker
+
+fake_upstream = FastAPI()
+
+@fake_upstream.post("/v1/chat/completions")
+async def fake_completion() -> JSONResponse:
+    await asyncio.sleep(float(os.environ.get("FAKE_LATENCY", "0.1")))
+    if random.random() < float(os.environ.get("FAKE_ERROR_RATE", "0.0")):
+        return JSONResponse(status_code=503, content={"error": {"message": "injected failure", "type": "server_error"}})
+    return JSONResponse({
+        "id": "chatcmpl-fake",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": "gpt-4o",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": "hello TERMINATE"}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 2, "total_tokens": 12},
+    })
+
+
+if __name__ == "__main__":
+    threading.Thread(target=uvicorn.run, args=(fake_upstream,), kwargs={"port": 8002}, daemon=True).start()
+
+    # no retries in the client, the guard sees every failure
+    client = OpenAIChatCompletionClient(model="gpt-4o", api_key="fake", base_url="http://127.0.0.1:8002/v1", max_retries=0)
+    server = Server(
+        upstream_guard=UpstreamGuard(
+            limiter=lambda: AdaptiveLimiter(initial_limit=4, max_limit=16, max_wait=5.0),
+            breaker=lambda: CircuitBreaker(failure_rate=0.5, window=10, min_calls=5, open_seconds=10.0),
+        ),
+    )
+    server.model.register(name="GUARDED")(lambda: AssistantAgent(name="writer", model_client=client))
+    server.run(port=8001)